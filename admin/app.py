@@ -510,7 +510,7 @@ def api_qr(token):
 # --- Startup ---
 
 def _init_app():
-    """Initialize DB pools and default admin. Called on import (for gunicorn) and __main__."""
+    """Initialize DB pools, Redis and default admin. Called on import (for gunicorn) and __main__."""
     admin_db.init_pool(
         host=os.getenv('DB_HOST', 'postgres'),
         port=int(os.getenv('DB_PORT', '5432')),
@@ -519,6 +519,7 @@ def _init_app():
         password=os.getenv('DB_PASSWORD', ''),
         database_url=os.getenv('DATABASE_URL', ''),
     )
+    admin_db.init_redis(os.getenv('REDIS_URL', ''))
     ensure_default_admin()
 
 
@@ -8,10 +8,20 @@ import psycopg2
 import psycopg2.pool
 import psycopg2.extras
 
+try:
+    import redis
+except ImportError:  # optional: bot cache invalidation is skipped without it
+    redis = None
+
 log = logging.getLogger('admin.db')
 
 _pool_primary = None   # Railway
 _pool_fallback = None  # Docker
+_redis = None          # Bot Redis, for cache invalidation broadcasts
+
+# Same channel as app.db.tenants.ACCOUNT_INVALIDATE_CHANNEL: the bot drops its
+# memoized instance -> account lookups when anything is published here
+ACCOUNT_INVALIDATE_CHANNEL = 'cache_invalidate:account'
 
 
 def init_pool(host, port, dbname, user, password, database_url=''):
@@ -38,6 +48,25 @@ def init_pool(host, port, dbname, user, password, database_url=''):
         log.warning(f'[DB] FALLBACK pool (Docker) failed: {e}')
 
 
+def init_redis(redis_url):
+    """Connect to the bot's Redis so account edits apply without waiting out its cache."""
+    global _redis
+    if not redis_url or redis is None:
+        log.info('[REDIS] Not configured — bot account cache expires on its own TTL')
+        return
+    _redis = redis.Redis.from_url(redis_url, socket_timeout=2, socket_connect_timeout=2)
+
+
+def _invalidate_bot_account_cache():
+    """Tell every bot process to drop its cached accounts (after the write committed)."""
+    if not _redis:
+        return
+    try:
+        _redis.publish(ACCOUNT_INVALIDATE_CHANNEL, '1')
+    except Exception as e:
+        log.warning(f'[REDIS] Account cache invalidation publish failed: {e}')
+
+
 def _ordered_pools():
     pools = []
     if _pool_primary:
@@ -168,10 +197,12 @@ def update_tenant(tenant_id, **fields):
         vals.append(v)
     sets.append("updated_at = CURRENT_TIMESTAMP")
     vals.append(str(tenant_id))
-    return _execute(
+    result = _execute(
         f"UPDATE tenants SET {', '.join(sets)} WHERE id = %s",
         tuple(vals),
     )
+    _invalidate_bot_account_cache()
+    return result
 
 
 # --- WhatsApp Accounts ---
@@ -229,10 +260,12 @@ def set_webhook_configured(account_id, configured):
 
 
 def deactivate_whatsapp_account(account_id):
-    return _execute(
+    result = _execute(
         "UPDATE whatsapp_accounts SET status = 'inactive' WHERE id = %s",
         (str(account_id),),
     )
+    _invalidate_bot_account_cache()
+    return result
 
 
 # --- Agent Configs ---
@@ -39,6 +39,10 @@ def create_app():
     from app.db.redis_client import init_redis
     init_redis()
 
+    # Fold legacy per-chat admin flag keys into hashes (idempotent)
+    from app.services.admin_control import migrate_legacy_chat_flags
+    migrate_legacy_chat_flags()
+
     # Start background workers
     from app.workers.manager import start_all_workers
     start_all_workers()
@@ -8,12 +8,23 @@ call_api() signature and receive responses in Anthropic format.
 import json
 import logging
 import requests
+from requests.adapters import HTTPAdapter
 
 from app.config import config
 
 log = logging.getLogger('ai.client')
 
 API_URL = 'https://api.openai.com/v1/chat/completions'
+CONNECT_TIMEOUT = 3  # Seconds to establish a connection to the API
+READ_TIMEOUT = 60  # Seconds to wait for a completion
+
+# Keep-alive session shared by replies, summaries and memory extraction:
+# every completion reuses a pooled TLS connection to OpenAI instead of a
+# fresh handshake. Sized for the reply pool plus the background workers.
+# No retries: completions are billed.
+_session = requests.Session()
+_session.mount('https://', HTTPAdapter(
+    pool_maxsize=config.MAX_WEBHOOK_WORKERS * 2 + config.SUMMARY_WORKERS))
 
 
 def _get_headers(api_key=None):
@@ -161,11 +172,11 @@ def call_api(model, max_tokens, system_prompt, messages, tools=None, api_key=Non
         body['tools'] = oai_tools
 
     try:
-        r = requests.post(
+        r = _session.post(
             API_URL,
             headers=_get_headers(api_key),
             json=body,
-            timeout=60,
+            timeout=(CONNECT_TIMEOUT, READ_TIMEOUT),
         )
         if r.status_code != 200:
             log.error(f'API error {r.status_code}: {r.text[:300]}')
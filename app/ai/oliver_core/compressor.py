@@ -8,9 +8,11 @@ v5.2: Enriched client context with memory fields (setor, localizacao,
 v5.3: Dynamic brand per tenant via get_dna()/get_expanders().
 """
 
+import json
 import logging
 from datetime import datetime, timezone, timedelta
 from app.ai.oliver_core.dna import get_dna, get_expanders
+from app.ai.prompts import is_real_name
 from app.config import config
 
 log = logging.getLogger('oliver.compressor')
@@ -233,7 +235,6 @@ def compress_lead_context(lead, conversation):
         empresa = lead.get('company', '') or ''
         meta = lead.get('metadata', {}) or {}
         if isinstance(meta, str):
-            import json
             try:
                 meta = json.loads(meta)
             except (ValueError, TypeError):
@@ -247,7 +248,6 @@ def compress_lead_context(lead, conversation):
 
     contact_name = conversation.get('contact_name', '')
     if not nome and contact_name:
-        from app.ai.prompts import is_real_name
         nome = contact_name if is_real_name(contact_name) else ''
 
     if not nome:
@@ -187,6 +187,7 @@ def process_v60(conversation, agent_config, language='pt', api_key=None,
 
     When ENGINE_V60_ENABLED=false (default), delegates directly to process_v51().
     Each sub-system (state machine, memory, reflection) has its own feature flag.
+    Adds agent_modifier/client_facts/state_node keys to `conversation` in place.
 
     Args: same as process_v51()
     Returns: same as process_v51() with engine_version='v6.0'
@@ -255,13 +256,13 @@ def process_v60(conversation, agent_config, language='pt', api_key=None,
             log.error(f'[V6.0] Memory load error: {e}')
 
     # --- 4. Enrich conversation and call v5.1 ---
-    enriched = dict(conversation)
-    enriched['agent_modifier'] = agent_modifier
-    enriched['client_facts'] = facts
+    # Enriched in place: the caller builds a per-message context dict
+    conversation['agent_modifier'] = agent_modifier
+    conversation['client_facts'] = facts
     if state:
-        enriched['state_node'] = state.get('current_node', 'ABERTURA')
+        conversation['state_node'] = state.get('current_node', 'ABERTURA')
 
-    result = process_v51(enriched, agent_config, language, api_key,
+    result = process_v51(conversation, agent_config, language, api_key,
                         source, tenant_settings)
 
     # --- 5. Reflection: validate response ---
@@ -274,11 +275,10 @@ def process_v60(conversation, agent_config, language='pt', api_key=None,
 
                 # Build correction guidance and retry once
                 correction = reflection.build_correction_guidance(issues, facts)
-                retry_conversation = dict(enriched)
-                retry_conversation['reflection_correction'] = correction
+                conversation['reflection_correction'] = correction
 
                 retry_result = process_v51(
-                    retry_conversation, agent_config, language, api_key,
+                    conversation, agent_config, language, api_key,
                     source, tenant_settings)
 
                 # Log reflection
@@ -11,9 +11,11 @@ Known fact keys (13):
 
 import json
 import logging
+import re
 
 from app.config import config
 from app.db import memory as memory_db
+from app.db import consumption_buffer
 
 log = logging.getLogger('oliver.memory')
 
@@ -41,6 +43,7 @@ _EXTRACTION_PROMPT = (
 # Model used for extraction (cheapest available)
 _EXTRACTION_MODEL = 'claude-3-haiku-20240307'
 _EXTRACTION_MAX_TOKENS = 300
+_JSON_OBJECT_PATTERN = re.compile(r'\{[^{}]*\}')  # Flat JSON object inside extra text
 
 
 def get_facts(lead_id):
@@ -127,8 +130,7 @@ def extract_and_save_facts(lead_id, tenant_id, messages, api_key=None):
 
         # Log consumption
         try:
-            from app.db import consumption as consumption_db
-            consumption_db.log_usage(
+            consumption_buffer.enqueue(
                 tenant_id=tenant_id,
                 model=_EXTRACTION_MODEL,
                 input_tokens=input_tokens,
@@ -157,8 +159,7 @@ def _parse_facts_json(text):
         pass
 
     # Try extracting JSON from markdown code block
-    import re
-    json_match = re.search(r'\{[^{}]*\}', text, re.DOTALL)
+    json_match = _JSON_OBJECT_PATTERN.search(text)
     if json_match:
         try:
             obj = json.loads(json_match.group())
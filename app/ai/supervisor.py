@@ -12,7 +12,9 @@ Flow:
 6. Extract final response -> return
 """
 
+import json
 import logging
+import time
 from app.config import config
 from app.ai.client import call_api, estimate_cost
 from app.ai.tools import execute_tool, get_tool_definitions
@@ -27,6 +29,11 @@ FALLBACK_RESPONSES = {
 }
 _fallback_idx = 0
 
+# Tools for tenants without an agent config (configs store tools_enabled as JSONB)
+DEFAULT_TOOLS = ('web_search', 'schedule_meeting', 'airtable_read', 'airtable_create',
+                 'airtable_update', 'google_calendar_list', 'google_calendar_check',
+                 'send_email')
+
 
 def process(conversation, agent_config, language='pt', api_key=None, source='text',
             system_prompt_override=None):
@@ -92,8 +99,10 @@ def process(conversation, agent_config, language='pt', api_key=None, source='tex
         history.pop(0)
 
     # Get enabled tools
-    import json
-    tools_enabled = agent_config.get('tools_enabled', '["web_search","schedule_meeting","airtable_read","airtable_create","airtable_update","google_calendar_list","google_calendar_check","send_email"]')
+    # An empty list means tools were turned off; only a missing value gets the defaults
+    tools_enabled = agent_config.get('tools_enabled')
+    if tools_enabled is None:
+        tools_enabled = DEFAULT_TOOLS
     if isinstance(tools_enabled, str):
         tools_enabled = json.loads(tools_enabled)
     tool_defs = get_tool_definitions(tools_enabled)
@@ -114,7 +123,6 @@ def process(conversation, agent_config, language='pt', api_key=None, source='tex
                        tools=tool_defs if tool_defs else None, api_key=api_key)
         if not data:
             log.warning('API returned None, retrying without tools...')
-            import time
             time.sleep(0.5)
             data = call_api(model, max_tokens, system_prompt, history,
                            tools=None, api_key=api_key)
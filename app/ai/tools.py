@@ -9,6 +9,9 @@ import requests
 
 log = logging.getLogger('ai.tools')
 
+# Reused across web searches so repeat DuckDuckGo queries skip the TLS handshake
+_search_session = requests.Session()
+
 # --- Tool Definitions (JSON Schema for Claude API) ---
 
 TOOL_DEFINITIONS = {
@@ -347,7 +350,7 @@ def _exec_web_search(inputs, ctx):
     log.info(f'Web search: "{query}"')
     try:
         from lxml import html
-        r = requests.get(
+        r = _search_session.get(
             'https://html.duckduckgo.com/html/',
             params={'q': query},
             headers={'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36'},
@@ -1,16 +1,21 @@
 """Webhook endpoint — receives Evolution API events.
 
 Uses ThreadPoolExecutor with bounded workers to prevent
-unbounded thread creation from burst messages.
+unbounded thread creation from burst messages. Events the handler ignores
+(delivery acks, presence, chat updates) and Evolution API retries of a
+message this process has already accepted are dropped before dispatch.
 """
 
 import logging
+import threading
+import time
+from collections import OrderedDict
 from concurrent.futures import ThreadPoolExecutor
 
 from flask import Blueprint, request, jsonify
 
 from app.config import config
-from app.services.message_handler import handle_webhook
+from app.services.message_handler import handle_webhook, HANDLED_EVENTS
 
 log = logging.getLogger('api.webhook')
 
@@ -21,6 +26,10 @@ _executor = ThreadPoolExecutor(
     thread_name_prefix='webhook',
 )
 
+EDGE_DEDUP_MAX = 10000  # Recent incoming message ids remembered per process
+_recent_ids = OrderedDict()  # (instance, message_id) -> monotonic ts of first delivery
+_recent_lock = threading.Lock()
+
 
 @webhook_bp.route('/webhook', methods=['POST'])
 def webhook():
@@ -28,6 +37,12 @@ def webhook():
     if not payload:
         return jsonify({'ok': False, 'error': 'empty payload'}), 400
 
+    if payload.get('event') not in HANDLED_EVENTS:
+        return jsonify({'ok': True, 'ignored': True}), 200
+
+    if _is_duplicate(payload):
+        return jsonify({'ok': True, 'duplicate': True}), 200
+
     _executor.submit(_safe_handle, payload)
     return jsonify({'ok': True}), 200
 
@@ -38,3 +53,30 @@ def _safe_handle(payload):
         handle_webhook(payload)
     except Exception as e:
         log.error(f'Unhandled webhook error: {e}', exc_info=True)
+
+
+def _is_duplicate(payload):
+    """In-process dedup of incoming message retries, before worker dispatch.
+
+    The Redis SET NX in the handler stays authoritative across processes;
+    this only spares the dispatch and Redis round-trip when a retry lands on
+    the process that already took the message.
+    """
+    if payload.get('event') != 'messages.upsert':
+        return False
+    key = (payload.get('data') or {}).get('key') or {}
+    message_id = key.get('id')
+    if not message_id or key.get('fromMe'):
+        return False
+
+    dedup_key = (payload.get('instance', ''), message_id)
+    now = time.monotonic()
+    with _recent_lock:
+        seen = _recent_ids.get(dedup_key)
+        if seen is not None and now - seen < config.DEDUP_TTL_SECONDS:
+            return True
+        _recent_ids[dedup_key] = now
+        _recent_ids.move_to_end(dedup_key)
+        if len(_recent_ids) > EDGE_DEDUP_MAX:
+            _recent_ids.popitem(last=False)
+    return False
@@ -15,9 +15,13 @@ from app.config import config
 from app.channels import whatsapp
 from app.channels import transcriber
 from app.db import queue as queue_db
+from app.services import delay_scheduler
+from app.services import health_service
 
 log = logging.getLogger('channels.sender')
 
+CHUNK_PAUSE_RANGE = (1.5, 3.5)  # Seconds between split chunks (reading before typing again)
+
 
 def split_message(text, max_chars=None):
     """Split long text into chunks at sentence boundaries.
@@ -109,50 +113,66 @@ def send_split_messages(instance_name, phone, text,
                         tenant_id=None, whatsapp_account_id=None, metadata=None):
     """Send message split into chunks with typing indicators.
 
-    If any chunk fails, remaining chunks are queued for retry.
-    Returns True if all chunks sent successfully.
+    The first chunk is sent inline. Later chunks are chained on the delay
+    scheduler (read pause, typing, send), so the calling worker is not held
+    for the whole sequence. If any chunk fails, remaining chunks are queued
+    for retry; a later chunk's failure is recorded in health_service here,
+    since the caller only sees the first chunk's result.
+    Returns True if the first chunk was sent immediately.
     """
     chunks = split_message(text)
 
-    if len(chunks) == 1:
-        delay = _typing_delay(len(text))
-        whatsapp.set_typing(instance_name, phone, True)
-        time.sleep(delay)
-        whatsapp.set_typing(instance_name, phone, False)
-        return send_with_retry(instance_name, phone, text, tenant_id,
-                              whatsapp_account_id, metadata)
-
-    all_sent = True
-    for i, chunk in enumerate(chunks):
-        delay = _typing_delay(len(chunk))
-        whatsapp.set_typing(instance_name, phone, True)
-        time.sleep(delay)
-        whatsapp.set_typing(instance_name, phone, False)
+    whatsapp.set_typing(instance_name, phone, True)
+    time.sleep(_typing_delay(len(chunks[0])))
+    whatsapp.set_typing(instance_name, phone, False)
+    return _send_chunk(instance_name, phone, chunks, tenant_id, whatsapp_account_id, metadata)
+
+
+def _send_chunk(instance_name, phone, chunks, tenant_id, whatsapp_account_id, metadata):
+    """Send chunks[0]; schedule the next chunk, or queue the rest on failure."""
+    sent = send_with_retry(instance_name, phone, chunks[0], tenant_id,
+                           whatsapp_account_id, metadata)
+    rest = chunks[1:]
+    if not sent:
+        remaining = ' '.join(rest)
+        if remaining and tenant_id and whatsapp_account_id:
+            try:
+                queue_db.enqueue(
+                    tenant_id=tenant_id,
+                    whatsapp_account_id=whatsapp_account_id,
+                    phone=phone,
+                    content=remaining,
+                    queue_type='failed',
+                    metadata=metadata or {},
+                )
+            except Exception:
+                pass
+        return False
+
+    if rest:
+        # Human-like pause between chunks (like reading before typing again)
+        delay_scheduler.schedule(random.uniform(*CHUNK_PAUSE_RANGE), _type_next_chunk,
+                                 instance_name, phone, rest, tenant_id,
+                                 whatsapp_account_id, metadata)
+    return True
+
+
+def _type_next_chunk(instance_name, phone, chunks, *send_args):
+    """Show typing for the next chunk, then send it after the typing delay."""
+    whatsapp.set_typing(instance_name, phone, True)
+    delay_scheduler.schedule(_typing_delay(len(chunks[0])), _finish_chunk,
+                             instance_name, phone, chunks, *send_args)
 
-        sent = send_with_retry(instance_name, phone, chunk, tenant_id,
-                              whatsapp_account_id, metadata)
-        if not sent:
-            remaining = ' '.join(chunks[i + 1:])
-            if remaining and tenant_id and whatsapp_account_id:
-                try:
-                    queue_db.enqueue(
-                        tenant_id=tenant_id,
-                        whatsapp_account_id=whatsapp_account_id,
-                        phone=phone,
-                        content=remaining,
-                        queue_type='failed',
-                        metadata=metadata or {},
-                    )
-                except Exception:
-                    pass
-            all_sent = False
-            break
-
-        # Human-like pause between chunks (1.5-3.5s — like reading before typing again)
-        if i < len(chunks) - 1:
-            time.sleep(random.uniform(1.5, 3.5))
-
-    return all_sent
+
+def _finish_chunk(instance_name, phone, chunks, tenant_id, *send_args):
+    try:
+        whatsapp.set_typing(instance_name, phone, False)
+        sent = _send_chunk(instance_name, phone, chunks, tenant_id, *send_args)
+    except Exception as e:
+        log.error(f'[SPLIT] Chunk send failed for {phone}: {e}')
+        sent = False
+    if not sent:
+        health_service.record_send_failure(tenant_id, instance_name)
 
 
 def send_audio_response(instance_name, phone, text, voice_config=None,
@@ -10,12 +10,17 @@ import base64
 import tempfile
 import logging
 import requests
+from requests.adapters import HTTPAdapter
 
 from app.config import config
 from app.channels import whatsapp
 
 log = logging.getLogger('channels.transcriber')
 
+# Keep-alive session for Whisper/TTS calls (reuses TLS to OpenAI/ElevenLabs)
+_session = requests.Session()
+_session.mount('https://', HTTPAdapter(pool_maxsize=config.MAX_WEBHOOK_WORKERS))
+
 
 def transcribe_audio(instance_name, message_data, language='pt'):
     """Download audio from WhatsApp and transcribe via Whisper API.
@@ -55,7 +60,7 @@ def transcribe_audio(instance_name, message_data, language='pt'):
 
         # Send to Whisper API
         with open(tmp_path, 'rb') as audio_file:
-            r = requests.post(
+            r = _session.post(
                 'https://api.openai.com/v1/audio/transcriptions',
                 headers={'Authorization': f'Bearer {config.OPENAI_API_KEY}'},
                 files={'file': ('audio.ogg', audio_file, 'audio/ogg')},
@@ -522,7 +527,7 @@ def _tts_elevenlabs(clean_text, voice_config, sentiment, language):
         if tenant_settings and isinstance(tenant_settings, dict):
             payload['voice_settings'].update(tenant_settings)
 
-        r = requests.post(
+        r = _session.post(
             f'https://api.elevenlabs.io/v1/text-to-speech/{voice_id}',
             headers={
                 'xi-api-key': api_key,
@@ -596,7 +601,7 @@ def _tts_openai(clean_text, voice_config, persona, sentiment, language):
             'instructions': instructions,
         }
 
-        r = requests.post(
+        r = _session.post(
             'https://api.openai.com/v1/audio/speech',
             headers={
                 'Authorization': f'Bearer {config.OPENAI_API_KEY}',
@@ -6,11 +6,27 @@ No other module should call Evolution API directly.
 
 import logging
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from app.config import config
 
 log = logging.getLogger('channels.whatsapp')
 
+CONNECT_TIMEOUT = 2  # Seconds to establish a connection; read timeouts are per call
+
+# Shared keep-alive session: every Evolution API call reuses pooled connections
+# instead of a new TCP(+TLS) handshake. Sized for webhook, reply and scheduler workers.
+# Only connection failures are retried (nothing was sent yet); sends are not
+# idempotent, so read errors and error statuses are never retried.
+_session = requests.Session()
+_adapter = HTTPAdapter(
+    pool_connections=4, pool_maxsize=config.MAX_WEBHOOK_WORKERS * 3,
+    max_retries=Retry(total=2, connect=2, read=0, status=0, backoff_factor=0.1),
+)
+_session.mount('http://', _adapter)
+_session.mount('https://', _adapter)
+
 
 def _headers():
     return {
@@ -24,21 +40,21 @@ def _headers():
 def send_message(instance_name, phone, text):
     """Send a text message. Returns True on success, False on failure."""
     try:
-        r = requests.post(
+        r = _session.post(
             f'{config.EVOLUTION_URL}/message/sendText/{instance_name}',
             headers=_headers(),
             json={'number': phone, 'text': text},
-            timeout=10,
+            timeout=(CONNECT_TIMEOUT, 10),
         )
         if r.status_code in (200, 201):
             return True
         log.warning(f'Send failed ({r.status_code}): {r.text[:200]}')
         # Fallback: textMessage wrapper format
-        r = requests.post(
+        r = _session.post(
             f'{config.EVOLUTION_URL}/message/sendText/{instance_name}',
             headers=_headers(),
             json={'number': phone, 'textMessage': {'text': text}},
-            timeout=10,
+            timeout=(CONNECT_TIMEOUT, 10),
         )
         if r.status_code in (200, 201):
             return True
@@ -52,11 +68,11 @@ def send_message(instance_name, phone, text):
 def set_typing(instance_name, phone, typing=True):
     """Set composing/paused presence indicator."""
     try:
-        requests.post(
+        _session.post(
             f'{config.EVOLUTION_URL}/chat/updatePresence/{instance_name}',
             headers=_headers(),
             json={'number': phone, 'presence': 'composing' if typing else 'paused'},
-            timeout=3,
+            timeout=(CONNECT_TIMEOUT, 3),
         )
     except Exception:
         pass
@@ -67,11 +83,11 @@ def set_typing(instance_name, phone, typing=True):
 def fetch_all_contacts(instance_name):
     """Fetch all contacts for an instance."""
     try:
-        r = requests.post(
+        r = _session.post(
             f'{config.EVOLUTION_URL}/chat/findContacts/{instance_name}',
             headers=_headers(),
             json={},
-            timeout=10,
+            timeout=(CONNECT_TIMEOUT, 10),
         )
         if r.status_code == 200:
             data = r.json()
@@ -86,11 +102,11 @@ def fetch_all_contacts(instance_name):
 def get_base64_media(instance_name, message_key):
     """Download media as base64 from Evolution API."""
     try:
-        r = requests.post(
+        r = _session.post(
             f'{config.EVOLUTION_URL}/chat/getBase64FromMediaMessage/{instance_name}',
             headers=_headers(),
             json={'message': {'key': message_key}},
-            timeout=30,
+            timeout=(CONNECT_TIMEOUT, 30),
         )
         if r.status_code in (200, 201):
             return r.json().get('base64', '')
@@ -112,11 +128,11 @@ def send_audio(instance_name, phone, base64_audio):
     Returns True on success, False on failure.
     """
     try:
-        r = requests.post(
+        r = _session.post(
             f'{config.EVOLUTION_URL}/message/sendWhatsAppAudio/{instance_name}',
             headers=_headers(),
             json={'number': phone, 'audio': base64_audio},
-            timeout=15,
+            timeout=(CONNECT_TIMEOUT, 15),
         )
         if r.status_code in (200, 201):
             return True
@@ -130,7 +146,7 @@ def send_audio(instance_name, phone, base64_audio):
 # --- Instance Management ---
 
 def create_instance(instance_name):
-    r = requests.post(
+    r = _session.post(
         f'{config.EVOLUTION_URL}/instance/create',
         headers=_headers(),
         json={
@@ -138,17 +154,17 @@ def create_instance(instance_name):
             'qrcode': True,
             'integration': 'WHATSAPP-BAILEYS',
         },
-        timeout=15,
+        timeout=(CONNECT_TIMEOUT, 15),
     )
     return r.json() if r.status_code in (200, 201) else {'error': r.text}
 
 
 def get_connection_state(instance_name):
     try:
-        r = requests.get(
+        r = _session.get(
             f'{config.EVOLUTION_URL}/instance/connectionState/{instance_name}',
             headers=_headers(),
-            timeout=5,
+            timeout=(CONNECT_TIMEOUT, 5),
         )
         return r.json().get('instance', {}).get('state', 'unknown')
     except Exception:
@@ -157,10 +173,10 @@ def get_connection_state(instance_name):
 
 def get_qr_code(instance_name):
     try:
-        r = requests.get(
+        r = _session.get(
             f'{config.EVOLUTION_URL}/instance/connect/{instance_name}',
             headers=_headers(),
-            timeout=10,
+            timeout=(CONNECT_TIMEOUT, 10),
         )
         return r.json() if r.status_code == 200 else {'error': r.text}
     except Exception as e:
@@ -169,10 +185,10 @@ def get_qr_code(instance_name):
 
 def fetch_all_instances():
     try:
-        r = requests.get(
+        r = _session.get(
             f'{config.EVOLUTION_URL}/instance/fetchInstances',
             headers=_headers(),
-            timeout=10,
+            timeout=(CONNECT_TIMEOUT, 10),
         )
         return r.json() if r.status_code == 200 else []
     except Exception:
@@ -181,10 +197,10 @@ def fetch_all_instances():
 
 def delete_instance(instance_name):
     try:
-        r = requests.delete(
+        r = _session.delete(
             f'{config.EVOLUTION_URL}/instance/delete/{instance_name}',
             headers=_headers(),
-            timeout=10,
+            timeout=(CONNECT_TIMEOUT, 10),
         )
         return r.json()
     except Exception as e:
@@ -193,10 +209,10 @@ def delete_instance(instance_name):
 
 def logout_instance(instance_name):
     try:
-        r = requests.delete(
+        r = _session.delete(
             f'{config.EVOLUTION_URL}/instance/logout/{instance_name}',
             headers=_headers(),
-            timeout=10,
+            timeout=(CONNECT_TIMEOUT, 10),
         )
         return r.json()
     except Exception as e:
@@ -205,7 +221,7 @@ def logout_instance(instance_name):
 
 def set_webhook(instance_name, webhook_url):
     try:
-        r = requests.post(
+        r = _session.post(
             f'{config.EVOLUTION_URL}/webhook/set/{instance_name}',
             headers=_headers(),
             json={
@@ -216,7 +232,7 @@ def set_webhook(instance_name, webhook_url):
                     'events': ['MESSAGES_UPSERT', 'CONTACTS_UPSERT', 'CONTACTS_UPDATE'],
                 }
             },
-            timeout=10,
+            timeout=(CONNECT_TIMEOUT, 10),
         )
         return r.status_code == 200
     except Exception:
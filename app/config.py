@@ -25,11 +25,14 @@ class Config:
     DB_NAME = os.getenv('DB_NAME', 'hub_database')
     DB_USER = os.getenv('DB_USER', 'hub_user')
     DB_PASSWORD = os.getenv('DB_PASSWORD', '')
+    DB_POOL_MAX = int(os.getenv('DB_POOL_MAX', '0'))  # 0 = size from MAX_WEBHOOK_WORKERS
+    DB_POOL_MIN = int(os.getenv('DB_POOL_MIN', '2'))  # Opened at startup per pool; grows on demand up to max
 
     # --- Application ---
     BOT_PORT = int(os.getenv('BOT_PORT', '3000'))
     LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
     MAX_WEBHOOK_WORKERS = int(os.getenv('MAX_WEBHOOK_WORKERS', '20'))
+    SUMMARY_WORKERS = int(os.getenv('SUMMARY_WORKERS', '2'))  # Concurrent background summary calls
     INTERNAL_API_KEY = os.getenv('INTERNAL_API_KEY', '')  # Secures /api/* endpoints
 
     # --- Retry / Workers ---
@@ -53,6 +56,7 @@ class Config:
 
     # --- Redis ---
     REDIS_URL = os.getenv('REDIS_URL', '')
+    REDIS_POOL_SIZE = int(os.getenv('REDIS_POOL_SIZE', '50'))  # Shared connections across all threads
     DEDUP_TTL_SECONDS = int(os.getenv('DEDUP_TTL_SECONDS', '86400'))  # 24h
 
     # --- Stripe (Metered Billing — structure only, no-op without key) ---
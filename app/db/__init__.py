@@ -8,6 +8,7 @@ Both pools (Docker + Railway) stay synchronized:
 This ensures zero data loss and zero downtime.
 """
 
+import json
 import logging
 import psycopg2
 import psycopg2.pool
@@ -15,12 +16,33 @@ import psycopg2.extras
 
 from app.config import config
 
+try:
+    import orjson
+except ImportError:  # optional: faster JSON for JSONB params and columns
+    orjson = None
+
 log = logging.getLogger('db')
 
 _pool_docker = None    # Docker (DB_HOST / DB_PORT / ...) — PRIMARY
 _pool_railway = None   # Railway (DATABASE_URL) — BACKUP
 
 
+def _pool_maxconn():
+    """Connections per pool: webhook, reply and scheduler workers can each
+    hold one at the same time, plus headroom for background workers."""
+    return config.DB_POOL_MAX or config.MAX_WEBHOOK_WORKERS * 3 + 10
+
+
+def _pool_minconn():
+    """Connections opened at startup and kept idle between uses.
+
+    Small by default: it applies per pool and per gunicorn process, so a
+    large value multiplies into Postgres max_connections. The pool grows
+    on demand up to _pool_maxconn(); raise DB_POOL_MIN to keep more warm.
+    """
+    return min(max(config.DB_POOL_MIN, 1), _pool_maxconn())
+
+
 def init_pool():
     """Initialize connection pools. Safe to call multiple times."""
     global _pool_docker, _pool_railway
@@ -30,7 +52,7 @@ def init_pool():
     # --- PRIMARY: Docker Postgres (local, fast, all data) ---
     try:
         _pool_docker = psycopg2.pool.ThreadedConnectionPool(
-            minconn=2, maxconn=20,
+            minconn=_pool_minconn(), maxconn=_pool_maxconn(),
             host=config.DB_HOST, port=config.DB_PORT,
             dbname=config.DB_NAME, user=config.DB_USER,
             password=config.DB_PASSWORD,
@@ -44,7 +66,7 @@ def init_pool():
     if config.DATABASE_URL:
         try:
             _pool_railway = psycopg2.pool.ThreadedConnectionPool(
-                minconn=2, maxconn=20, dsn=config.DATABASE_URL,
+                minconn=_pool_minconn(), maxconn=_pool_maxconn(), dsn=config.DATABASE_URL,
             )
             label = 'BACKUP' if _pool_docker else 'ONLY'
             log.info(f'[DB] {label} pool (Railway) initialized')
@@ -202,22 +224,43 @@ def _dual_write(operation, returning=False):
 
 # --- Public API (used by all app/db/* modules) ---
 
+def json_dumps(obj):
+    """Serialize a JSONB parameter to a str (orjson when installed)."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+    return json.dumps(obj)
+
+
+def json_loads(value):
+    """Parse a JSON column that came back as text (orjson when installed)."""
+    if orjson is not None:
+        return orjson.loads(value)
+    return json.loads(value)
+
+
 def query(sql, params=None, fetch='all'):
     """Execute a SELECT query with automatic failover.
 
     fetch: 'all' -> list of dicts, 'one' -> single dict or None, 'val' -> scalar
     """
     def _do(conn):
-        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-            cur.execute(sql, params)
-            if fetch == 'one':
-                row = cur.fetchone()
-                return dict(row) if row else None
-            elif fetch == 'val':
-                row = cur.fetchone()
-                return list(row.values())[0] if row else None
-            else:
-                return [dict(r) for r in cur.fetchall()]
+        # Autocommit for plain reads: no BEGIN before the query and no
+        # ROLLBACK from putconn() afterwards (2 fewer round-trips per read)
+        conn.autocommit = True
+        try:
+            with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+                cur.execute(sql, params)
+                if fetch == 'one':
+                    row = cur.fetchone()
+                    return dict(row) if row else None
+                elif fetch == 'val':
+                    row = cur.fetchone()
+                    return list(row.values())[0] if row else None
+                else:
+                    return [dict(r) for r in cur.fetchall()]
+        finally:
+            if not conn.closed:
+                conn.autocommit = False
     return _with_failover(_do)
 
 
@@ -239,11 +282,14 @@ def execute(sql, params=None, returning=False):
 
 
 def execute_many(sql, params_list):
-    """Execute a statement with multiple param sets, dual-write."""
+    """Execute a statement with multiple param sets, dual-write.
+
+    Uses execute_batch, so param sets go to the server in pages of 100
+    statements per round-trip instead of one each.
+    """
     def _do(conn):
         with conn.cursor() as cur:
-            for params in params_list:
-                cur.execute(sql, params)
+            psycopg2.extras.execute_batch(cur, sql, params_list)
             conn.commit()
     return _dual_write(_do)
 
@@ -1,8 +1,7 @@
 """Consumption logging for AI usage tracking."""
 
-import json
 import logging
-from app.db import query, execute
+from app.db import query, execute, json_dumps
 
 log = logging.getLogger('db.consumption')
 
@@ -10,7 +9,7 @@ log = logging.getLogger('db.consumption')
 def log_usage(tenant_id, model, input_tokens, output_tokens, cost,
               conversation_id=None, operation='chat', metadata=None):
     """Log AI consumption for a tenant."""
-    meta_json = json.dumps(metadata) if metadata else '{}'
+    meta_json = json_dumps(metadata) if metadata else '{}'
     return execute(
         """INSERT INTO consumption_logs
            (tenant_id, conversation_id, model, input_tokens, output_tokens, cost, operation, metadata)
@@ -0,0 +1,105 @@
+"""Buffered consumption logging — keeps usage inserts off the reply path.
+
+enqueue() takes the same arguments as consumption.log_usage() and returns
+immediately. A daemon thread bulk-inserts queued rows (up to FLUSH_BATCH
+per statement, at most FLUSH_INTERVAL after the first row arrives).
+Rows still queued at interpreter exit are flushed by an atexit hook; if
+the queue is full, the row is written synchronously instead of dropped.
+"""
+
+import atexit
+import logging
+import queue
+import threading
+import time
+
+from app.db import execute, json_dumps
+from app.db import consumption as consumption_db
+
+log = logging.getLogger('db.consumption_buffer')
+
+QUEUE_MAX = 10000
+FLUSH_BATCH = 100  # Rows per multi-row INSERT
+FLUSH_INTERVAL = 0.5  # Seconds to wait for more rows before flushing
+
+_COLUMNS = ('tenant_id, conversation_id, model, input_tokens, output_tokens, '
+            'cost, operation, metadata')
+_ROW_PLACEHOLDER = '(%s, %s, %s, %s, %s, %s, %s, %s)'
+
+_queue = queue.Queue(maxsize=QUEUE_MAX)
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def enqueue(tenant_id, model, input_tokens, output_tokens, cost,
+            conversation_id=None, operation='chat', metadata=None):
+    """Queue a consumption row (same arguments as consumption.log_usage)."""
+    row = (str(tenant_id), str(conversation_id) if conversation_id else None,
+           model, input_tokens, output_tokens, cost, operation,
+           json_dumps(metadata) if metadata else '{}')
+    _ensure_worker()
+    try:
+        _queue.put_nowait(row)
+    except queue.Full:
+        log.warning('[CONSUMPTION] Buffer full, writing row synchronously')
+        consumption_db.log_usage(tenant_id, model, input_tokens, output_tokens, cost,
+                                 conversation_id=conversation_id, operation=operation,
+                                 metadata=metadata)
+
+
+def _ensure_worker():
+    global _worker
+    if _worker is not None and _worker.is_alive():
+        return
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_run, name='consumption-flush', daemon=True)
+            _worker.start()
+
+
+def _insert_rows(rows):
+    """Write rows with one multi-row INSERT per FLUSH_BATCH."""
+    for i in range(0, len(rows), FLUSH_BATCH):
+        chunk = rows[i:i + FLUSH_BATCH]
+        try:
+            execute(
+                f"INSERT INTO consumption_logs ({_COLUMNS}) VALUES "
+                + ', '.join([_ROW_PLACEHOLDER] * len(chunk)),
+                tuple(v for row in chunk for v in row),
+            )
+        except Exception as e:
+            log.error(f'[CONSUMPTION] Failed to write {len(chunk)} rows: {e}')
+
+
+def _drain(rows, limit):
+    while len(rows) < limit:
+        try:
+            rows.append(_queue.get_nowait())
+        except queue.Empty:
+            break
+    return rows
+
+
+def _run():
+    while True:
+        rows = [_queue.get()]
+        deadline = time.monotonic() + FLUSH_INTERVAL
+        while len(rows) < FLUSH_BATCH:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                rows.append(_queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        _insert_rows(_drain(rows, FLUSH_BATCH))
+
+
+def flush():
+    """Synchronously write everything still queued."""
+    rows = _drain([], QUEUE_MAX)
+    if rows:
+        _insert_rows(rows)
+
+
+atexit.register(flush)
@@ -5,67 +5,11 @@ Each conversation is unique per (whatsapp_account_id, contact_phone).
 """
 
 import logging
-from app.db import query, execute
+from app.db import query, execute, json_dumps
 
 log = logging.getLogger('db.conversations')
 
 
-def get_or_create_conversation(tenant_id, whatsapp_account_id, contact_phone,
-                                contact_name=None):
-    """Get existing conversation or create a new one.
-
-    If conversation exists but contact_name changed, update it.
-    Returns conversation dict.
-    """
-    conv = query(
-        """SELECT * FROM conversations
-           WHERE tenant_id = %s AND whatsapp_account_id = %s AND contact_phone = %s""",
-        (str(tenant_id), str(whatsapp_account_id), contact_phone),
-        fetch='one',
-    )
-
-    if conv:
-        # Defensive: verify tenant isolation
-        if str(conv.get('tenant_id', '')) != str(tenant_id):
-            log.error(
-                f'TENANT MISMATCH: conversation {conv["id"]} belongs to '
-                f'{conv.get("tenant_id")} but requested by {tenant_id}'
-            )
-            conv = None  # Fall through to INSERT/upsert below
-        else:
-            # Update name if it changed and new name is non-empty
-            if contact_name and contact_name != conv.get('contact_name'):
-                execute(
-                    """UPDATE conversations
-                       SET contact_name = %s, updated_at = CURRENT_TIMESTAMP
-                       WHERE id = %s AND tenant_id = %s""",
-                    (contact_name, str(conv['id']), str(tenant_id)),
-                )
-                conv['contact_name'] = contact_name
-            # Touch last_message_at
-            execute(
-                """UPDATE conversations
-                   SET last_message_at = CURRENT_TIMESTAMP, updated_at = CURRENT_TIMESTAMP
-                   WHERE id = %s AND tenant_id = %s""",
-                (str(conv['id']), str(tenant_id)),
-            )
-            return conv
-
-    return execute(
-        """INSERT INTO conversations
-           (tenant_id, whatsapp_account_id, contact_phone, contact_name)
-           VALUES (%s, %s, %s, %s)
-           ON CONFLICT (whatsapp_account_id, contact_phone)
-           DO UPDATE SET
-               contact_name = COALESCE(EXCLUDED.contact_name, conversations.contact_name),
-               last_message_at = CURRENT_TIMESTAMP,
-               updated_at = CURRENT_TIMESTAMP
-           RETURNING *""",
-        (str(tenant_id), str(whatsapp_account_id), contact_phone, contact_name),
-        returning=True,
-    )
-
-
 def get_conversation(conversation_id, tenant_id=None):
     """Get a conversation by ID. If tenant_id is provided, enforces isolation."""
     if tenant_id:
@@ -102,8 +46,7 @@ def update_conversation(conversation_id, tenant_id=None, **fields):
 
 def save_message(conversation_id, role, content, metadata=None):
     """Save a message and return it."""
-    import json
-    meta_json = json.dumps(metadata) if metadata else '{}'
+    meta_json = json_dumps(metadata) if metadata else '{}'
     return execute(
         """INSERT INTO messages (conversation_id, role, content, metadata)
            VALUES (%s, %s, %s, %s)
@@ -113,6 +56,60 @@ def save_message(conversation_id, role, content, metadata=None):
     )
 
 
+def record_user_message(tenant_id, whatsapp_account_id, contact_phone, content,
+                        metadata=None, contact_name=None):
+    """Open the conversation and save an inbound user message in one round-trip.
+
+    One statement upserts the conversation (name kept unless a new one is
+    given, last_message_at touched), resets its reengagement counter (new
+    conversations start at 0; metadata is left untouched when it is already
+    0), upserts the lead (same semantics as leads.upsert_lead) and inserts
+    the message.
+
+    Returns the conversation row, or None if the (account, phone) pair
+    belongs to another tenant; nothing is written in that case.
+    """
+    meta_json = json_dumps(metadata) if metadata else '{}'
+    return execute(
+        """WITH conv AS (
+               INSERT INTO conversations
+               (tenant_id, whatsapp_account_id, contact_phone, contact_name, metadata)
+               VALUES (%s, %s, %s, %s, '{"reengagement_count": 0}')
+               ON CONFLICT (whatsapp_account_id, contact_phone)
+               DO UPDATE SET
+                   contact_name = COALESCE(EXCLUDED.contact_name, conversations.contact_name),
+                   metadata = CASE
+                       WHEN conversations.metadata->>'reengagement_count' = '0'
+                           THEN conversations.metadata
+                       ELSE jsonb_set(COALESCE(conversations.metadata, '{}'),
+                                      '{reengagement_count}', '0'::jsonb)
+                   END,
+                   last_message_at = CURRENT_TIMESTAMP,
+                   updated_at = CURRENT_TIMESTAMP
+               WHERE conversations.tenant_id = EXCLUDED.tenant_id
+               RETURNING *
+           ),
+           lead AS (
+               INSERT INTO leads_v2 (tenant_id, phone, name, conversation_id, stage, metadata)
+               SELECT tenant_id, contact_phone, %s, id, 'new', '{}' FROM conv
+               ON CONFLICT (tenant_id, phone)
+               DO UPDATE SET
+                   name = COALESCE(EXCLUDED.name, leads_v2.name),
+                   conversation_id = COALESCE(EXCLUDED.conversation_id, leads_v2.conversation_id),
+                   stage = COALESCE(EXCLUDED.stage, leads_v2.stage),
+                   updated_at = CURRENT_TIMESTAMP
+           ),
+           msg AS (
+               INSERT INTO messages (conversation_id, role, content, metadata)
+               SELECT id, 'user', %s, %s FROM conv
+           )
+           SELECT * FROM conv""",
+        (str(tenant_id), str(whatsapp_account_id), contact_phone, contact_name,
+         contact_name, content, meta_json),
+        returning=True,
+    )
+
+
 def get_message_history(conversation_id, limit=10):
     """Get the last N messages for a conversation, ordered oldest-first."""
     rows = query(
@@ -145,6 +142,46 @@ def get_conversation_with_context(conversation_id, tenant_id=None):
     return conv
 
 
+def get_message_context(conversation_id, tenant_id, phone, agent_name='default',
+                        count_limit=50):
+    """Load what the AI needs for a reply in one query.
+
+    Returns {'agent_config', 'lead', 'history', 'message_count'}. History
+    holds the last agent_config.max_history_messages messages (10 without
+    a config), oldest first. Rows come back through JSON, so timestamps are
+    ISO strings. message_count counts the conversation's messages up to
+    count_limit.
+    """
+    row = query(
+        """WITH agent AS (
+               SELECT * FROM agent_configs
+               WHERE tenant_id = %s AND name = %s AND active = TRUE
+           )
+           SELECT
+               (SELECT row_to_json(agent) FROM agent) AS agent_config,
+               (SELECT row_to_json(l) FROM leads_v2 l
+                WHERE l.tenant_id = %s AND l.phone = %s) AS lead,
+               (SELECT COALESCE(json_agg(m ORDER BY m.created_at), '[]'::json) FROM (
+                    SELECT role, content, metadata, created_at FROM messages
+                    WHERE conversation_id = %s
+                    ORDER BY created_at DESC
+                    LIMIT COALESCE((SELECT max_history_messages FROM agent), 10)
+                ) m) AS history,
+               (SELECT COUNT(*) FROM (
+                    SELECT 1 FROM messages WHERE conversation_id = %s LIMIT %s
+                ) c) AS message_count""",
+        (str(tenant_id), agent_name, str(tenant_id), phone, str(conversation_id),
+         str(conversation_id), count_limit),
+        fetch='one',
+    ) or {}
+    return {
+        'agent_config': row.get('agent_config'),
+        'lead': row.get('lead'),
+        'history': row.get('history') or [],
+        'message_count': row.get('message_count') or 0,
+    }
+
+
 def list_conversations(tenant_id, limit=50, offset=0):
     return query(
         """SELECT c.*, wa.instance_name
@@ -157,14 +194,38 @@ def list_conversations(tenant_id, limit=50, offset=0):
     )
 
 
-def get_stale_conversations(tenant_id, stale_minutes=25, max_reengagement=2):
-    """Find conversations where the client messaged but bot hasn't replied within N minutes."""
+def get_conversation_by_phone(tenant_id, phone):
+    """Find a tenant's conversation by contact phone or its trailing digits.
+
+    Exact matches win; otherwise the most recent conversation whose
+    contact_phone ends with the given digits (e.g. typed without the
+    country code) is returned. The suffix is matched as a prefix of the
+    reversed phone so idx_conversations_tenant_phone_rev (migration 008)
+    can serve it.
+    """
     return query(
         """SELECT c.*, wa.instance_name
+           FROM conversations c
+           JOIN whatsapp_accounts wa ON wa.id = c.whatsapp_account_id
+           WHERE c.tenant_id = %s AND reverse(c.contact_phone) LIKE %s
+           ORDER BY (c.contact_phone = %s) DESC, c.last_message_at DESC
+           LIMIT 1""",
+        (str(tenant_id), phone[::-1] + '%', phone),
+        fetch='one',
+    )
+
+
+def get_stale_conversations(tenant_id, stale_minutes=25, max_reengagement=2):
+    """Find conversations where the client messaged but bot hasn't replied within N minutes.
+
+    Each row carries the client's unanswered message as last_user_message.
+    """
+    return query(
+        """SELECT c.*, wa.instance_name, last_msg.content AS last_user_message
            FROM conversations c
            JOIN whatsapp_accounts wa ON wa.id = c.whatsapp_account_id
            LEFT JOIN LATERAL (
-               SELECT role, created_at FROM messages
+               SELECT role, content, created_at FROM messages
                WHERE conversation_id = c.id
                ORDER BY created_at DESC LIMIT 1
            ) last_msg ON TRUE
@@ -190,17 +251,3 @@ def increment_reengagement(conversation_id):
            WHERE id = %s""",
         (str(conversation_id),),
     )
-
-
-def reset_reengagement(conversation_id):
-    execute(
-        """UPDATE conversations
-           SET metadata = jsonb_set(
-               COALESCE(metadata, '{}'),
-               '{reengagement_count}',
-               '0'::jsonb
-           ),
-           updated_at = CURRENT_TIMESTAMP
-           WHERE id = %s""",
-        (str(conversation_id),),
-    )
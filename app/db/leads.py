@@ -1,8 +1,7 @@
 """Lead database operations."""
 
-import json
 import logging
-from app.db import query, execute
+from app.db import query, execute, json_dumps
 
 log = logging.getLogger('db.leads')
 
@@ -10,7 +9,7 @@ log = logging.getLogger('db.leads')
 def upsert_lead(tenant_id, phone, name=None, conversation_id=None,
                 company=None, stage=None, metadata=None):
     """Create or update a lead. Returns the lead dict."""
-    meta_json = json.dumps(metadata) if metadata else '{}'
+    meta_json = json_dumps(metadata) if metadata else '{}'
     return execute(
         """INSERT INTO leads_v2 (tenant_id, phone, name, conversation_id, company, stage, metadata)
            VALUES (%s, %s, %s, %s, %s, COALESCE(%s, 'new'), %s)
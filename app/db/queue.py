@@ -1,8 +1,7 @@
 """Message queue operations — unified retry, pending LID, and scheduled messages."""
 
-import json
 import logging
-from app.db import query, execute
+from app.db import query, execute, json_dumps
 
 log = logging.getLogger('db.queue')
 
@@ -10,7 +9,7 @@ log = logging.getLogger('db.queue')
 def enqueue(tenant_id, whatsapp_account_id, phone, content,
             queue_type='failed', metadata=None, max_attempts=5):
     """Add a message to the queue."""
-    meta_json = json.dumps(metadata) if metadata else '{}'
+    meta_json = json_dumps(metadata) if metadata else '{}'
     return execute(
         """INSERT INTO message_queue
            (tenant_id, whatsapp_account_id, phone, content, queue_type, metadata, max_attempts)
@@ -22,26 +21,53 @@ def enqueue(tenant_id, whatsapp_account_id, phone, content,
     )
 
 
-def get_pending(queue_type='failed', limit=50, tenant_id=None):
-    """Get pending messages ready for retry, scoped by tenant for isolation."""
-    base = """SELECT mq.*, wa.instance_name, t.anthropic_api_key AS tenant_api_key
-           FROM message_queue mq
-           JOIN whatsapp_accounts wa ON wa.id = mq.whatsapp_account_id
-           JOIN tenants t ON t.id = mq.tenant_id
-           WHERE mq.status = 'pending'
-             AND mq.queue_type = %s
-             AND mq.attempts < mq.max_attempts
-             AND mq.next_attempt_at <= CURRENT_TIMESTAMP"""
-    params = [queue_type]
+def get_pending_multi(queue_types=('failed', 'pending_lid'), limit=50):
+    """Due entries of several queue types in one query: {queue_type: rows}.
+
+    Up to `limit` rows per type (oldest first), so a backlog in one queue
+    never starves the others. Rows are message_queue entries plus the
+    account's instance_name and the tenant's API key (tenant_api_key).
+    """
+    rows = query(
+        """SELECT * FROM (
+               SELECT mq.*, wa.instance_name, t.anthropic_api_key AS tenant_api_key,
+                      ROW_NUMBER() OVER (PARTITION BY mq.queue_type
+                                         ORDER BY mq.created_at) AS type_rank
+               FROM message_queue mq
+               JOIN whatsapp_accounts wa ON wa.id = mq.whatsapp_account_id
+               JOIN tenants t ON t.id = mq.tenant_id
+               WHERE mq.status = 'pending'
+                 AND mq.queue_type = ANY(%s)
+                 AND mq.attempts < mq.max_attempts
+                 AND mq.next_attempt_at <= CURRENT_TIMESTAMP
+           ) due
+           WHERE type_rank <= %s
+           ORDER BY created_at ASC""",
+        (list(queue_types), limit),
+    )
+    pending = {queue_type: [] for queue_type in queue_types}
+    for row in rows:
+        pending[row['queue_type']].append(row)
+    return pending
 
-    if tenant_id:
-        base += " AND mq.tenant_id = %s"
-        params.append(str(tenant_id))
 
-    base += " ORDER BY mq.created_at ASC LIMIT %s"
-    params.append(limit)
+def get_pending_by_lid(tenant_id, lid_jid, limit=50):
+    """Pending pending_lid items of one LID, oldest first (idx_message_queue_pending_lid).
 
-    return query(base, tuple(params))
+    Used once the LID resolves, so retry backoff is ignored and no account
+    or tenant columns are joined in.
+    """
+    return query(
+        """SELECT id, content, metadata, created_at
+           FROM message_queue
+           WHERE tenant_id = %s
+             AND queue_type = 'pending_lid'
+             AND status = 'pending'
+             AND metadata->>'lid_jid' = %s
+           ORDER BY created_at ASC
+           LIMIT %s""",
+        (str(tenant_id), lid_jid, limit),
+    )
 
 
 def mark_delivered(queue_id, tenant_id=None):
@@ -60,13 +86,25 @@ def mark_delivered(queue_id, tenant_id=None):
     )
 
 
+def mark_delivered_many(queue_ids, tenant_id):
+    """Mark several queue entries delivered with one UPDATE."""
+    if not queue_ids:
+        return 0
+    return execute(
+        """UPDATE message_queue
+           SET status = 'delivered', updated_at = CURRENT_TIMESTAMP
+           WHERE id = ANY(%s) AND tenant_id = %s""",
+        (list(queue_ids), str(tenant_id)),
+    )
+
+
 def increment_attempt(queue_id, error=None):
     """Increment attempt count and set next retry time (exponential backoff)."""
     meta_update = ''
     params = [queue_id]
     if error:
         meta_update = ", metadata = jsonb_set(metadata, '{last_error}', %s::jsonb)"
-        params = [json.dumps(error), queue_id]
+        params = [json_dumps(error), queue_id]
 
     return execute(
         f"""UPDATE message_queue
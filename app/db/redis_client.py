@@ -1,6 +1,9 @@
 """Redis connection pool for deduplication and health tracking.
 
 Uses DB 1 to avoid collision with Evolution API (DB 0).
+One client over a blocking pool is shared by every thread: when all
+REDIS_POOL_SIZE connections are busy, callers wait up to POOL_TIMEOUT
+seconds for one instead of failing with "Too many connections".
 Graceful degradation: if Redis is unavailable, all operations
 return safe defaults and the system continues without Redis features.
 """
@@ -12,34 +15,34 @@ from app.config import config
 
 log = logging.getLogger('db.redis')
 
+POOL_TIMEOUT = 2  # Seconds to wait for a free pooled connection
+
 _pool = None
+_client = None
 
 
 def init_redis():
     """Initialize Redis connection pool. Safe to call multiple times."""
-    global _pool
+    global _pool, _client
     if not config.REDIS_URL:
         log.info('REDIS_URL not set — Redis features disabled')
         return
     try:
-        _pool = redis.ConnectionPool.from_url(
+        _pool = redis.BlockingConnectionPool.from_url(
             config.REDIS_URL,
             decode_responses=True,
-            max_connections=20,
+            max_connections=config.REDIS_POOL_SIZE,
+            timeout=POOL_TIMEOUT,
         )
-        r = redis.Redis(connection_pool=_pool)
-        r.ping()
+        _client = redis.Redis(connection_pool=_pool)
+        _client.ping()
         log.info(f'Redis connected: {config.REDIS_URL}')
     except Exception as e:
         log.warning(f'Redis unavailable ({e}) — Redis features disabled')
         _pool = None
+        _client = None
 
 
 def get_redis():
-    """Get a Redis client. Returns None if unavailable."""
-    if _pool is None:
-        return None
-    try:
-        return redis.Redis(connection_pool=_pool)
-    except Exception:
-        return None
+    """Get the shared Redis client. Returns None if unavailable."""
+    return _client
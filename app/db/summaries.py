@@ -1,8 +1,7 @@
 """Database operations for conversation_summaries table."""
 
-import json
 import logging
-from app.db import query, execute
+from app.db import query, execute, json_dumps
 
 log = logging.getLogger('db.summaries')
 
@@ -27,7 +26,7 @@ def save_summary(tenant_id, conversation_id, summary_json, message_count):
            (tenant_id, conversation_id, summary_json, message_count_at_summary)
            VALUES (%s, %s, %s, %s)""",
         (str(tenant_id), str(conversation_id),
-         json.dumps(summary_json, ensure_ascii=False), message_count),
+         json_dumps(summary_json), message_count),
     )
     log.info(f'[SUMMARY] Saved for conversation {conversation_id} (msgs={message_count})')
 
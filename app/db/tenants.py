@@ -1,10 +1,20 @@
 """Tenant, WhatsApp Account, and Agent Config database operations."""
 
 import logging
-from app.db import query, execute
+import threading
+import time
+from datetime import time as time_of_day
+from app.db import query, execute, json_loads
+from app.db.redis_client import get_redis
 
 log = logging.getLogger('db.tenants')
 
+ACCOUNT_CACHE_TTL = 60  # Seconds to reuse an instance -> account lookup
+_account_cache = {}  # instance_name -> (monotonic_ts, account)
+_account_load_locks = {}  # instance_name -> Lock while a cold entry is loading
+_account_load_guard = threading.Lock()
+ACCOUNT_INVALIDATE_CHANNEL = 'cache_invalidate:account'  # pub/sub: any message clears the cache
+
 
 # --- Tenants ---
 
@@ -51,10 +61,12 @@ def update_tenant(tenant_id, **fields):
         vals.append(v)
     sets.append("updated_at = CURRENT_TIMESTAMP")
     vals.append(tenant_id)
-    return execute(
+    result = execute(
         f"UPDATE tenants SET {', '.join(sets)} WHERE id = %s",
         tuple(vals),
     )
+    invalidate_account_cache()
+    return result
 
 
 # --- WhatsApp Accounts ---
@@ -80,9 +92,35 @@ def get_whatsapp_account(account_id):
 def get_whatsapp_account_by_instance(instance_name):
     """Critical query: returns account + tenant in a single JOIN.
 
-    Used on every webhook to resolve instance -> tenant context.
+    Used on every webhook to resolve instance -> tenant context, so the row
+    is memoized in-process for ACCOUNT_CACHE_TTL seconds with `config` and
+    `tenant_settings` already parsed to dicts, and `business_hours` as a
+    (start, end) pair of datetime.time (None when unset). Treat it as read-only.
+    Misses are single-flight: concurrent webhooks for a cold instance wait
+    for one query instead of each hitting Postgres.
     """
-    return query(
+    cached = _account_cache.get(instance_name)
+    if cached and time.monotonic() - cached[0] < ACCOUNT_CACHE_TTL:
+        return cached[1]
+
+    with _account_load_guard:
+        load_lock = _account_load_locks.setdefault(instance_name, threading.Lock())
+    try:
+        with load_lock:
+            cached = _account_cache.get(instance_name)
+            if cached and time.monotonic() - cached[0] < ACCOUNT_CACHE_TTL:
+                return cached[1]
+            return _load_account(instance_name)
+    finally:
+        # Drop the lock once loaded: misses are not cached, so keeping one
+        # per instance name ever seen would grow without bound
+        with _account_load_guard:
+            if _account_load_locks.get(instance_name) is load_lock:
+                del _account_load_locks[instance_name]
+
+
+def _load_account(instance_name):
+    account = query(
         """SELECT wa.*, t.name AS tenant_name, t.slug AS tenant_slug,
                   t.status AS tenant_status, t.settings AS tenant_settings,
                   t.anthropic_api_key AS tenant_anthropic_key
@@ -92,6 +130,49 @@ def get_whatsapp_account_by_instance(instance_name):
         (instance_name,),
         fetch='one',
     )
+    if account:
+        for field in ('config', 'tenant_settings'):
+            value = account.get(field)
+            if not isinstance(value, dict):
+                account[field] = json_loads(value) if value else {}
+        account['business_hours'] = _parse_business_hours(instance_name, account['config'])
+        _account_cache[instance_name] = (time.monotonic(), account)
+    return account
+
+
+def _parse_business_hours(instance_name, account_config):
+    """Parse 'HH:MM[:SS]' business hours from config; None if unset or invalid."""
+    bounds = []
+    for field in ('business_hours_start', 'business_hours_end'):
+        value = account_config.get(field)
+        if not value:
+            return None
+        if isinstance(value, time_of_day):
+            bounds.append(value)
+            continue
+        try:
+            bounds.append(time_of_day.fromisoformat(str(value)))
+        except ValueError:
+            log.warning(f'Invalid {field} for {instance_name}: {value!r}')
+            return None
+    return tuple(bounds)
+
+
+def invalidate_account_cache(broadcast=True):
+    """Drop memoized instance -> account lookups (after account/tenant edits commit).
+
+    broadcast also publishes on ACCOUNT_INVALIDATE_CHANNEL so the other
+    processes (workers/cache_worker.py) drop theirs.
+    """
+    _account_cache.clear()
+    if not broadcast:
+        return
+    r = get_redis()
+    if r:
+        try:
+            r.publish(ACCOUNT_INVALIDATE_CHANNEL, '1')
+        except Exception as e:
+            log.warning(f'Account cache invalidation publish failed: {e}')
 
 
 def list_whatsapp_accounts(tenant_id):
@@ -101,6 +182,13 @@ def list_whatsapp_accounts(tenant_id):
     )
 
 
+def list_all_whatsapp_accounts():
+    """List WhatsApp accounts of every tenant (for grouping in one round-trip)."""
+    return query(
+        "SELECT tenant_id, instance_name, status FROM whatsapp_accounts ORDER BY instance_name",
+    )
+
+
 def update_whatsapp_account(account_id, **fields):
     sets = []
     vals = []
@@ -109,17 +197,21 @@ def update_whatsapp_account(account_id, **fields):
         vals.append(v)
     sets.append("updated_at = CURRENT_TIMESTAMP")
     vals.append(account_id)
-    return execute(
+    result = execute(
         f"UPDATE whatsapp_accounts SET {', '.join(sets)} WHERE id = %s",
         tuple(vals),
     )
+    invalidate_account_cache()
+    return result
 
 
 def delete_whatsapp_account(account_id):
-    return execute(
+    result = execute(
         "DELETE FROM whatsapp_accounts WHERE id = %s",
         (account_id,),
     )
+    invalidate_account_cache()
+    return result
 
 
 # --- Agent Configs ---
@@ -0,0 +1,192 @@
+"""Coalescing writer for the Airtable Leads table.
+
+Lead syncs are queued per phone and flushed by a single daemon thread.
+Updates arriving within BATCH_MAX_WAIT of each other are merged, so a
+burst of messages from one contact becomes one write, and the flush
+uses Airtable's batch endpoints (10 records per request) for lookup,
+update and create. Known phone -> record id mappings are cached in
+process (warmed with the most recently active leads), so repeat
+contacts skip the lookup entirely.
+
+New leads are written with performUpsert on Telefone, so concurrent
+writers cannot create duplicates.
+
+Each queued item carries three field dicts:
+- update: written whenever the record exists (e.g. 'Ultima Interacao')
+- fill:   written only where the existing record has no value (e.g. 'Nome')
+- create: fields for a new record; None means "update only, never create"
+"""
+
+import logging
+import queue
+import threading
+import time
+from collections import OrderedDict
+
+from app.integrations import airtable_client
+
+log = logging.getLogger('integrations.airtable_batcher')
+
+LEADS_TABLE = 'Leads'
+PHONE_FIELD = 'Telefone'
+BATCH_MAX_WAIT = 0.5  # Seconds to keep merging after the first queued update
+RECORD_CACHE_MAX = 50000  # phone -> record id entries kept in memory
+RECORD_CACHE_TTL = 3600  # Seconds before a cached mapping is looked up again
+WARM_FIELDS = [PHONE_FIELD, 'Nome']  # Fields fetched by the startup scan
+WARM_SORT = [{'field': 'Ultima Interacao', 'direction': 'desc'}]  # Most recently active first
+WARM_MAX_PAGES = 5  # Startup scan pages (100 leads each); queued writes wait for it
+
+# phone -> (expires_at, record_id, names of non-empty fields). Only the
+# batcher thread touches it, so no lock is needed.
+_record_cache = OrderedDict()
+
+_queue = queue.Queue()
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def enqueue(phone, update=None, fill=None, create=None):
+    """Queue a lead sync for phone. Never blocks on Airtable."""
+    if not phone or not airtable_client.is_configured():
+        return
+    _ensure_worker()
+    _queue.put((phone, update or {}, fill or {}, create))
+
+
+def _ensure_worker():
+    global _worker
+    if _worker is not None and _worker.is_alive():
+        return
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_run, name='airtable-batcher', daemon=True)
+            _worker.start()
+
+
+def _cache_get(phone, now):
+    entry = _record_cache.get(phone)
+    if entry is None:
+        return None
+    if entry[0] <= now:
+        del _record_cache[phone]
+        return None
+    _record_cache.move_to_end(phone)
+    return entry[1], entry[2]
+
+
+def _cache_put(phone, record_id, filled, now):
+    _record_cache[phone] = (now + RECORD_CACHE_TTL, record_id, frozenset(filled))
+    _record_cache.move_to_end(phone)
+    while len(_record_cache) > RECORD_CACHE_MAX:
+        _record_cache.popitem(last=False)
+
+
+def _cache_record(rec, now):
+    phone = str(rec.get(PHONE_FIELD, ''))
+    if phone:
+        _cache_put(phone, rec['id'], (k for k, v in rec.items() if v and k != 'id'), now)
+    return phone
+
+
+def warm_cache():
+    """Load phone -> record id for the most recently active leads.
+
+    Runs on the batcher thread and shares the client's rate budget, so the
+    scan is capped at WARM_MAX_PAGES; older leads are looked up on demand.
+    """
+    now = time.monotonic()
+    count = 0
+    for rec in airtable_client.iter_records(LEADS_TABLE, fields=WARM_FIELDS,
+                                            sort=WARM_SORT,
+                                            max_pages=WARM_MAX_PAGES):
+        if _cache_record(rec, now):
+            count += 1
+    log.info(f'[AIRTABLE-SYNC] Lead cache warmed with {count} records')
+
+
+def _merge(pending, item):
+    """Fold one queued item into the per-phone pending map."""
+    phone, update, fill, create = item
+    entry = pending.setdefault(phone, {'update': {}, 'fill': {}, 'create': None})
+    entry['update'].update(update)
+    entry['fill'].update(fill)
+    if create is not None:
+        # Keep the first create's values (e.g. 'Data Entrada'), add any new keys
+        entry['create'] = {**create, **(entry['create'] or {})}
+
+
+def _run():
+    try:
+        warm_cache()
+    except Exception as e:
+        log.warning(f'[AIRTABLE-SYNC] Lead cache warm-up failed: {e}')
+    while True:
+        pending = {}
+        _merge(pending, _queue.get())
+        deadline = time.monotonic() + BATCH_MAX_WAIT
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                _merge(pending, _queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        try:
+            flush(pending)
+        except Exception as e:
+            log.warning(f'[AIRTABLE-SYNC] Batch flush failed ({len(pending)} leads): {e}')
+
+
+def flush(pending):
+    """Write merged lead syncs: cached or batched lookup, then batched update/create."""
+    now = time.monotonic()
+    existing = {}  # phone -> (record_id, non-empty field names)
+    misses = []
+    for phone in pending:
+        cached = _cache_get(phone, now)
+        if cached:
+            existing[phone] = cached
+        else:
+            misses.append(phone)
+
+    for i in range(0, len(misses), airtable_client.BATCH_SIZE):
+        chunk = misses[i:i + airtable_client.BATCH_SIZE]
+        records = airtable_client.search_records_in(LEADS_TABLE, PHONE_FIELD, chunk)
+        if records is None:
+            # Lookup failed: skip these phones rather than risk duplicate leads
+            log.warning(f'[AIRTABLE-SYNC] Lookup failed, skipping {len(chunk)} leads')
+            for phone in chunk:
+                pending.pop(phone, None)
+            continue
+        for rec in records:
+            phone = _cache_record(rec, now)
+            if phone and phone not in existing:
+                existing[phone] = _cache_get(phone, now)
+
+    updates, update_phones, creates = [], [], []
+    for phone, entry in pending.items():
+        if phone in existing:
+            record_id, filled = existing[phone]
+            fields = {k: v for k, v in entry['fill'].items() if v and k not in filled}
+            fields.update(entry['update'])
+            if fields:
+                updates.append({'id': record_id, 'fields': fields})
+                update_phones.append(phone)
+                _cache_put(phone, record_id, filled.union(fields), now)
+        elif entry['create'] is not None:
+            creates.append({**entry['create'], **entry['update']})
+
+    if updates:
+        if airtable_client.update_records(LEADS_TABLE, updates) is None:
+            # The record may have been deleted in Airtable; look it up again next time
+            for phone in update_phones:
+                _record_cache.pop(phone, None)
+    if creates:
+        # Upsert on Telefone: if another process created the lead since our
+        # lookup, this merges into it instead of adding a duplicate
+        created = airtable_client.upsert_records(LEADS_TABLE, creates, [PHONE_FIELD])
+        if created is not None:
+            for rec in created:
+                _cache_record(rec, now)
+            log.info(f'[AIRTABLE-SYNC] {len(creates)} new leads synced')
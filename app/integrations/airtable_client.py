@@ -16,14 +16,35 @@ Setup:
 """
 
 import os
+import time
 import logging
+import threading
+from collections import deque
+
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 log = logging.getLogger('integrations.airtable')
 
 _API_KEY = os.getenv('AIRTABLE_API_KEY', '')
 _BASE_ID = os.getenv('AIRTABLE_BASE_ID', '')
 _API_URL = 'https://api.airtable.com/v0'
+BATCH_SIZE = 10  # Airtable's max records per create/update request
+RATE_LIMIT_PER_SEC = 5  # Airtable allows 5 requests/second per base
+
+_request_times = deque()  # monotonic timestamps of requests in the last second
+_rate_lock = threading.Lock()
+
+# Shared keep-alive session: lead syncs reuse one pooled TLS connection.
+# Retries cover idempotent methods only (urllib3 default), honoring Retry-After.
+_session = requests.Session()
+_adapter = HTTPAdapter(
+    pool_connections=4, pool_maxsize=10,
+    max_retries=Retry(total=3, backoff_factor=0.5,
+                      status_forcelist=[429, 500, 502, 503, 504]),
+)
+_session.mount('https://', _adapter)
 
 
 def is_configured():
@@ -38,6 +59,25 @@ def _headers():
     }
 
 
+def _throttle():
+    """Block until another request fits in the 5 req/s budget (bursts up to 5)."""
+    with _rate_lock:
+        while True:
+            now = time.monotonic()
+            while _request_times and now - _request_times[0] >= 1.0:
+                _request_times.popleft()
+            if len(_request_times) < RATE_LIMIT_PER_SEC:
+                _request_times.append(now)
+                return
+            time.sleep(1.0 - (now - _request_times[0]))
+
+
+def _request(method, url, **kwargs):
+    """Rate-limited Airtable HTTP call."""
+    _throttle()
+    return _session.request(method, url, headers=_headers(), timeout=15, **kwargs)
+
+
 def list_records(table_name, max_records=100, filter_formula=None, sort=None):
     """List records from a table.
 
@@ -62,7 +102,7 @@ def list_records(table_name, max_records=100, filter_formula=None, sort=None):
             params[f'sort[{i}][direction]'] = s.get('direction', 'asc')
 
     try:
-        resp = requests.get(url, headers=_headers(), params=params, timeout=15)
+        resp = _request('GET', url, params=params)
         resp.raise_for_status()
         records = resp.json().get('records', [])
         log.info(f'[AIRTABLE] Listed {len(records)} records from {table_name}')
@@ -72,6 +112,42 @@ def list_records(table_name, max_records=100, filter_formula=None, sort=None):
         return None
 
 
+def iter_records(table_name, fields=None, page_size=100, sort=None, max_pages=None):
+    """Yield every record of a table, following Airtable's pagination offset.
+
+    fields: optional list of field names to fetch (smaller pages)
+    sort: optional list of sort dicts (same format as list_records)
+    max_pages: stop after this many requests (None = whole table)
+    Stops quietly on error.
+    """
+    if not is_configured():
+        return
+
+    url = f'{_API_URL}/{_BASE_ID}/{requests.utils.quote(table_name)}'
+    params = {'pageSize': page_size}
+    if fields:
+        params['fields[]'] = fields
+    if sort:
+        for i, s in enumerate(sort):
+            params[f'sort[{i}][field]'] = s['field']
+            params[f'sort[{i}][direction]'] = s.get('direction', 'asc')
+    pages = 0
+    while max_pages is None or pages < max_pages:
+        pages += 1
+        try:
+            resp = _request('GET', url, params=params)
+            resp.raise_for_status()
+            data = resp.json()
+        except Exception as e:
+            log.error(f'[AIRTABLE] Paginated list failed ({table_name}): {e}')
+            return
+        for r in data.get('records', []):
+            yield {'id': r['id'], **r.get('fields', {})}
+        if not data.get('offset'):
+            return
+        params['offset'] = data['offset']
+
+
 def get_record(table_name, record_id):
     """Get a single record by ID."""
     if not is_configured():
@@ -79,7 +155,7 @@ def get_record(table_name, record_id):
 
     url = f'{_API_URL}/{_BASE_ID}/{requests.utils.quote(table_name)}/{record_id}'
     try:
-        resp = requests.get(url, headers=_headers(), timeout=15)
+        resp = _request('GET', url)
         resp.raise_for_status()
         r = resp.json()
         return {'id': r['id'], **r.get('fields', {})}
@@ -100,7 +176,7 @@ def create_record(table_name, fields):
 
     url = f'{_API_URL}/{_BASE_ID}/{requests.utils.quote(table_name)}'
     try:
-        resp = requests.post(url, headers=_headers(), json={'fields': fields}, timeout=15)
+        resp = _request('POST', url, json={'fields': fields})
         resp.raise_for_status()
         r = resp.json()
         log.info(f'[AIRTABLE] Created record in {table_name}: {r["id"]}')
@@ -120,7 +196,7 @@ def update_record(table_name, record_id, fields):
 
     url = f'{_API_URL}/{_BASE_ID}/{requests.utils.quote(table_name)}/{record_id}'
     try:
-        resp = requests.patch(url, headers=_headers(), json={'fields': fields}, timeout=15)
+        resp = _request('PATCH', url, json={'fields': fields})
         resp.raise_for_status()
         r = resp.json()
         log.info(f'[AIRTABLE] Updated {record_id} in {table_name}')
@@ -130,6 +206,60 @@ def update_record(table_name, record_id, fields):
         return None
 
 
+def update_records(table_name, records):
+    """Partially update several records, BATCH_SIZE per request.
+
+    records: list of {'id': record_id, 'fields': {...}}
+    Returns the updated records, or None if any request failed.
+    """
+    if not is_configured():
+        return None
+
+    url = f'{_API_URL}/{_BASE_ID}/{requests.utils.quote(table_name)}'
+    updated = []
+    try:
+        for i in range(0, len(records), BATCH_SIZE):
+            chunk = records[i:i + BATCH_SIZE]
+            resp = _request('PATCH', url, json={'records': chunk})
+            resp.raise_for_status()
+            updated.extend({'id': r['id'], **r.get('fields', {})}
+                           for r in resp.json().get('records', []))
+        log.info(f'[AIRTABLE] Updated {len(updated)} records in {table_name}')
+        return updated
+    except Exception as e:
+        log.error(f'[AIRTABLE] Batch update failed ({table_name}): {e}')
+        return None
+
+
+def upsert_records(table_name, fields_list, merge_on):
+    """Create-or-update several records matched on merge_on fields (performUpsert).
+
+    Sent BATCH_SIZE per request. Returns the resulting records, or None if
+    any request failed.
+    """
+    if not is_configured():
+        log.warning('[AIRTABLE] Not configured')
+        return None
+
+    url = f'{_API_URL}/{_BASE_ID}/{requests.utils.quote(table_name)}'
+    upserted = []
+    try:
+        for i in range(0, len(fields_list), BATCH_SIZE):
+            chunk = fields_list[i:i + BATCH_SIZE]
+            resp = _request('PATCH', url, json={
+                'performUpsert': {'fieldsToMergeOn': list(merge_on)},
+                'records': [{'fields': f} for f in chunk],
+            })
+            resp.raise_for_status()
+            upserted.extend({'id': r['id'], **r.get('fields', {})}
+                            for r in resp.json().get('records', []))
+        log.info(f'[AIRTABLE] Upserted {len(upserted)} records in {table_name}')
+        return upserted
+    except Exception as e:
+        log.error(f'[AIRTABLE] Batch upsert failed ({table_name}): {e}')
+        return None
+
+
 def delete_record(table_name, record_id):
     """Delete a record. Returns True on success."""
     if not is_configured():
@@ -137,7 +267,7 @@ def delete_record(table_name, record_id):
 
     url = f'{_API_URL}/{_BASE_ID}/{requests.utils.quote(table_name)}/{record_id}'
     try:
-        resp = requests.delete(url, headers=_headers(), timeout=15)
+        resp = _request('DELETE', url)
         resp.raise_for_status()
         log.info(f'[AIRTABLE] Deleted {record_id} from {table_name}')
         return True
@@ -154,3 +284,18 @@ def search_records(table_name, field_name, search_value, max_records=10):
     escaped = str(search_value).replace("'", "\\'")
     formula = f"{{{field_name}}} = '{escaped}'"
     return list_records(table_name, max_records=max_records, filter_formula=formula)
+
+
+def search_records_in(table_name, field_name, values, max_records=100):
+    """Search records where a field matches any of several values (one request).
+
+    Uses Airtable formula: OR({field_name} = 'a', {field_name} = 'b', ...)
+    """
+    if not values:
+        return []
+    clauses = []
+    for value in values:
+        escaped = str(value).replace("'", "\\'")
+        clauses.append(f"{{{field_name}}} = '{escaped}'")
+    return list_records(table_name, max_records=max_records,
+                        filter_formula=f"OR({', '.join(clauses)})")
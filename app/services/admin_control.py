@@ -3,17 +3,66 @@
 Allows the admin to send /commands from their iPhone via WhatsApp
 to control the bot without opening a terminal.
 
-All mutable state lives in Redis. The module is stateless by design.
+All mutable state lives in Redis. The module is stateless by design
+(apart from a few-seconds in-process memo of the /errors list).
 """
 
+import io
+import os
+import re
+import mmap
+import shutil
+import tempfile
+import shlex
 import logging
 import json
-from datetime import datetime, timezone
+import subprocess
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone, timedelta
 
 from app.config import config
+from app.db import query as db_query, execute as db_execute
+from app.db import conversations as conv_db
+from app.db import tenants as tenants_db
+from app.db.redis_client import get_redis
+from app.channels import whatsapp
+from app.ai.client import call_api
 
 log = logging.getLogger('services.admin_control')
 
+ADMIN_CACHE_TTL = 60  # Cache tenant/conversation lookups for repeated admin commands
+
+ERRORS_CACHE_TTL = 3  # Seconds to reuse the last /errors read for rapid refreshes
+_errors_cache = {}  # instance_name -> (monotonic_ts, errors)
+
+PROJECT_DIR = '/root/hub-automacao-pro'  # cwd for admin shell commands
+EXEC_OUTPUT_MAX_CHARS = 2000  # WhatsApp-friendly reply size for shell/file output
+EXEC_READ_MAX_BYTES = 4096  # Stop reading command/file output past this
+EXEC_TIMEOUT_SECONDS = 30
+EDIT_COPY_CHUNK = 1024 * 1024  # Bytes copied per write when rewriting an edited file
+
+# Commands using any of these need /bin/sh; everything else is exec'd directly
+_SHELL_META_RE = re.compile(r'[|&;<>()$`\\*?\[\]{}~!\n]')
+_SHELL_BUILTINS = frozenset({
+    'cd', 'exit', 'export', 'source', '.', 'alias', 'set', 'unset', 'ulimit', 'umask',
+})
+
+# Per-chat flags live as fields of one hash: admin:chatflags:{instance}:{phone}.
+# 'paused' and 'block' are '1'; 'takeover' holds its expiry as an epoch second.
+CHAT_FLAG_PAUSED = 'paused'
+CHAT_FLAG_TAKEOVER = 'takeover'
+CHAT_FLAG_BLOCK = 'block'
+_LEGACY_FLAG_PREFIXES = {
+    'admin:pausedchat': CHAT_FLAG_PAUSED,
+    'admin:takeover': CHAT_FLAG_TAKEOVER,
+    'block': CHAT_FLAG_BLOCK,
+}
+
+_NON_DIGITS_RE = re.compile(r'\D+')
+_SEND_RE = re.compile(r'^(\d+)\s+(.+)$', re.DOTALL)
+
 
 # ---------------------------------------------------------------------------
 # Helper functions (module-level, used by message_handler.py)
@@ -31,10 +80,11 @@ def is_admin_command(data, instance_name):
     if not config.ADMIN_NUMBER:
         return False
 
-    if not data.get('key', {}).get('fromMe', False):
+    key = data.get('key') or {}
+    if not key.get('fromMe', False):
         return False
 
-    remote_jid = data.get('key', {}).get('remoteJid', '')
+    remote_jid = key.get('remoteJid') or ''
     if '@g.us' in remote_jid:
         return False
 
@@ -63,10 +113,11 @@ def is_admin_message(data, instance_name):
     if not config.ADMIN_NUMBER:
         return False
 
-    if not data.get('key', {}).get('fromMe', False):
+    key = data.get('key') or {}
+    if not key.get('fromMe', False):
         return False
 
-    remote_jid = data.get('key', {}).get('remoteJid', '')
+    remote_jid = key.get('remoteJid') or ''
     if '@g.us' in remote_jid:
         return False
 
@@ -88,37 +139,121 @@ def is_admin_message(data, instance_name):
     return True
 
 
+def global_pause_key(instance_name):
+    """Redis key set while the bot is globally paused for an instance."""
+    return f'admin:paused:{instance_name}'
+
+
 def is_globally_paused(instance_name):
     """Check if bot is globally paused for this instance."""
     r = _get_redis()
     if not r:
         return False
     try:
-        return bool(r.get(f'admin:paused:{instance_name}'))
+        return bool(r.get(global_pause_key(instance_name)))
     except Exception:
         return False
 
 
-def is_chat_paused(instance_name, phone):
-    """Check if a specific chat is paused."""
+def prompt_override_key(instance_name):
+    """Redis key holding the runtime system-prompt override for an instance."""
+    return f'admin:prompt_override:{instance_name}'
+
+
+def get_prompt_override(instance_name):
+    """Return the runtime system-prompt override for this instance, or None."""
     r = _get_redis()
     if not r:
-        return False
+        return None
     try:
-        return bool(r.get(f'admin:pausedchat:{instance_name}:{phone}'))
+        return r.get(prompt_override_key(instance_name))
     except Exception:
-        return False
+        return None
+
+
+def last_chat_key(instance_name):
+    """Redis key holding the phone of the last active chat (target of /reply and /correct)."""
+    return f'admin:last_chat:{instance_name}'
+
+
+def chat_flags_key(instance_name, phone):
+    """Redis hash holding the pause/takeover/block flags of one chat."""
+    return f'admin:chatflags:{instance_name}:{phone}'
+
+
+def parse_chat_flags(raw, now=None):
+    """Turn an HGETALL reply into the set of active flag names."""
+    flags = set(raw or ())
+    if CHAT_FLAG_TAKEOVER in flags:
+        try:
+            expired = int(raw[CHAT_FLAG_TAKEOVER]) <= (now or time.time())
+        except ValueError:
+            expired = True
+        if expired:
+            flags.discard(CHAT_FLAG_TAKEOVER)
+    return flags
+
+
+def get_chat_flags(instance_name, phone):
+    """Return the active flags of a chat ('paused', 'takeover', 'block') in one HGETALL."""
+    r = _get_redis()
+    if not r:
+        return set()
+    try:
+        return parse_chat_flags(r.hgetall(chat_flags_key(instance_name, phone)))
+    except Exception:
+        return set()
+
+
+def is_chat_paused(instance_name, phone):
+    """Check if a specific chat is paused."""
+    return CHAT_FLAG_PAUSED in get_chat_flags(instance_name, phone)
 
 
 def is_chat_taken_over(instance_name, phone):
     """Check if admin has taken over a specific chat."""
+    return CHAT_FLAG_TAKEOVER in get_chat_flags(instance_name, phone)
+
+
+def migrate_legacy_chat_flags():
+    """Fold old per-flag keys (admin:pausedchat:*, admin:takeover:*, block:*) into chat hashes.
+
+    Idempotent; run once at startup so blocks and pauses survive the key change.
+    """
     r = _get_redis()
     if not r:
-        return False
+        return 0
+    moved = 0
     try:
-        return bool(r.get(f'admin:takeover:{instance_name}:{phone}'))
-    except Exception:
-        return False
+        for prefix, flag in _LEGACY_FLAG_PREFIXES.items():
+            keys = list(r.scan_iter(match=f'{prefix}:*', count=500))
+            if not keys:
+                continue
+            ttls = []
+            if flag == CHAT_FLAG_TAKEOVER:
+                with r.pipeline(transaction=False) as p:
+                    for key in keys:
+                        p.ttl(key)
+                    ttls = p.execute()
+            now = int(time.time())
+            with r.pipeline(transaction=False) as p:
+                for i, key in enumerate(keys):
+                    instance_name, _, phone = key[len(prefix) + 1:].rpartition(':')
+                    if not instance_name:
+                        continue
+                    value = '1'
+                    if flag == CHAT_FLAG_TAKEOVER:
+                        ttl = ttls[i] if ttls[i] and ttls[i] > 0 else config.ADMIN_TAKEOVER_TTL
+                        value = str(now + ttl)
+                    p.hset(chat_flags_key(instance_name, phone), flag, value)
+                    p.delete(key)
+                    moved += 1
+                p.execute()
+        if moved:
+            log.info(f'[ADMIN] Migrated {moved} legacy chat flag keys')
+    except Exception as e:
+        log.warning(f'[ADMIN] Chat flag migration failed: {e}')
+    return moved
 
 
 def log_admin_error(instance_name, error_msg):
@@ -131,16 +266,38 @@ def log_admin_error(instance_name, error_msg):
     try:
         key = f'admin:errors:{instance_name}'
         ts = datetime.now(timezone.utc).strftime('%H:%M:%S')
-        r.lpush(key, f'[{ts}] {error_msg}')
-        r.ltrim(key, 0, config.ADMIN_ERROR_LOG_MAX - 1)
+        with r.pipeline(transaction=False) as p:
+            p.lpush(key, f'[{ts}] {error_msg}')
+            p.ltrim(key, 0, config.ADMIN_ERROR_LOG_MAX - 1)
+            p.execute()
+        _errors_cache.pop(instance_name, None)
     except Exception:
         pass
 
 
+def _truncate_output(text, truncated=False):
+    """Cap shell/file output for WhatsApp, marking when content was cut."""
+    if truncated or len(text) > EXEC_OUTPUT_MAX_CHARS:
+        return text[:EXEC_OUTPUT_MAX_CHARS] + '\n... (truncado)'
+    return text
+
+
+def _command_argv(command):
+    """Split a command into argv, or return None if it needs a real shell."""
+    if _SHELL_META_RE.search(command):
+        return None
+    try:
+        argv = shlex.split(command)
+    except ValueError:
+        return None
+    if not argv or argv[0] in _SHELL_BUILTINS or '=' in argv[0]:
+        return None
+    return argv
+
+
 def _get_redis():
     """Get Redis client. Returns None if unavailable."""
     try:
-        from app.db.redis_client import get_redis
         return get_redis()
     except Exception:
         return None
@@ -232,10 +389,6 @@ class AdminController:
 
     def _gather_system_context(self):
         """Collect live system state to give the AI full awareness."""
-        from app.db import conversations as conv_db
-        from app.db import tenants as tenants_db
-        from app.channels import whatsapp
-
         parts = []
 
         # Bot status
@@ -252,15 +405,16 @@ class AdminController:
             convs = conv_db.list_conversations(self.tenant_id, limit=20)
             if convs:
                 chat_lines = []
-                for c in convs:
+                all_flags = self._chat_flags_many([c.get('contact_phone', '?') for c in convs])
+                for c, chat_flags in zip(convs, all_flags):
                     phone = c.get('contact_phone', '?')
                     name = c.get('contact_name') or '?'
                     flags = []
-                    if self.r.get(f'admin:pausedchat:{self.instance_name}:{phone}'):
+                    if CHAT_FLAG_PAUSED in chat_flags:
                         flags.append('PAUSADO')
-                    if self.r.get(f'admin:takeover:{self.instance_name}:{phone}'):
+                    if CHAT_FLAG_TAKEOVER in chat_flags:
                         flags.append('TAKEOVER')
-                    if self.r.get(f'block:{self.instance_name}:{phone}'):
+                    if CHAT_FLAG_BLOCK in chat_flags:
                         flags.append('BLOQUEADO')
                     flag_str = f' [{",".join(flags)}]' if flags else ''
                     chat_lines.append(f'  {name} ({phone}){flag_str}')
@@ -272,7 +426,7 @@ class AdminController:
 
         # Tenants
         try:
-            tenants = tenants_db.list_tenants(status=None)
+            tenants = self._list_tenants()
             if tenants:
                 t_lines = []
                 for t in tenants:
@@ -284,14 +438,14 @@ class AdminController:
 
         # Recent errors
         try:
-            errors = self.r.lrange(f'admin:errors:{self.instance_name}', 0, 4)
+            errors = self._recent_errors()[:5]
             if errors:
                 parts.append(f'ERROS RECENTES ({len(errors)}):\n  ' + '\n  '.join(errors))
         except Exception:
             pass
 
         # Last chat (for /reply context)
-        last_chat = self.r.get(f'admin:last_chat:{self.instance_name}')
+        last_chat = self.r.get(last_chat_key(self.instance_name))
         if last_chat:
             parts.append(f'ULTIMO CHAT ATIVO: {last_chat}')
 
@@ -308,8 +462,6 @@ class AdminController:
               "response": "Resposta natural aqui"
             }
         """
-        from app.ai.client import call_api
-        from datetime import datetime, timezone, timedelta
 
         # Build conversation history from Redis (last 10 messages)
         history_key = f'admin:nlp_history:{self.instance_name}'
@@ -421,10 +573,12 @@ class AdminController:
             # Save conversation to Redis history (last 10 exchanges)
             try:
                 ai_response_text = parsed.get('response', '')
-                self.r.lpush(history_key, json.dumps({'role': 'user', 'content': text}))
-                self.r.lpush(history_key, json.dumps({'role': 'assistant', 'content': ai_response_text}))
-                self.r.ltrim(history_key, 0, 19)  # keep 20 entries (10 exchanges)
-                self.r.expire(history_key, 3600)  # expire after 1h of inactivity
+                with self.r.pipeline(transaction=False) as p:
+                    p.lpush(history_key, json.dumps({'role': 'user', 'content': text}))
+                    p.lpush(history_key, json.dumps({'role': 'assistant', 'content': ai_response_text}))
+                    p.ltrim(history_key, 0, 19)  # keep 20 entries (10 exchanges)
+                    p.expire(history_key, 3600)  # expire after 1h of inactivity
+                    p.execute()
             except Exception:
                 pass
 
@@ -455,9 +609,6 @@ class AdminController:
 
     def _execute_single_action(self, action):
         """Execute one action and return a result string (or None if silent)."""
-        from app.db import tenants as tenants_db
-        from app.channels import whatsapp
-
         atype = action.get('type', '')
 
         if atype == 'pause_bot':
@@ -469,13 +620,7 @@ class AdminController:
             return None
 
         if atype == 'restart':
-            self.r.delete(f'admin:paused:{self.instance_name}')
-            self.r.delete(f'admin:prompt_override:{self.instance_name}')
-            self.r.delete(f'admin:temp_override:{self.instance_name}')
-            for key in self.r.keys(f'admin:takeover:{self.instance_name}:*'):
-                self.r.delete(key)
-            for key in self.r.keys(f'admin:pausedchat:{self.instance_name}:*'):
-                self.r.delete(key)
+            self._clear_ephemeral_state()
             return None
 
         if atype == 'view_chat':
@@ -484,27 +629,25 @@ class AdminController:
         if atype == 'takeover':
             phone = self._clean_phone(action.get('phone', ''))
             if phone:
-                self.r.set(f'admin:takeover:{self.instance_name}:{phone}',
-                           '1', ex=config.ADMIN_TAKEOVER_TTL)
-                self.r.set(f'admin:last_chat:{self.instance_name}', phone, ex=3600)
+                self._set_takeover(phone)
             return None
 
         if atype == 'release':
             phone = self._clean_phone(action.get('phone', ''))
             if phone:
-                self.r.delete(f'admin:takeover:{self.instance_name}:{phone}')
+                self._clear_chat_flag(phone, CHAT_FLAG_TAKEOVER)
             return None
 
         if atype == 'pause_chat':
             phone = self._clean_phone(action.get('phone', ''))
             if phone:
-                self.r.set(f'admin:pausedchat:{self.instance_name}:{phone}', '1')
+                self._set_chat_flag(phone, CHAT_FLAG_PAUSED)
             return None
 
         if atype == 'resume_chat':
             phone = self._clean_phone(action.get('phone', ''))
             if phone:
-                self.r.delete(f'admin:pausedchat:{self.instance_name}:{phone}')
+                self._clear_chat_flag(phone, CHAT_FLAG_PAUSED)
             return None
 
         if atype == 'send_message':
@@ -514,13 +657,13 @@ class AdminController:
                 sent = whatsapp.send_message(self.instance_name, phone, text)
                 if sent:
                     self._save_admin_message(phone, text)
-                    self.r.set(f'admin:last_chat:{self.instance_name}', phone, ex=3600)
+                    self.r.set(last_chat_key(self.instance_name), phone, ex=3600)
                     return f'Msg enviada para {phone}'
                 return f'Falha ao enviar para {phone}'
             return None
 
         if atype == 'reply':
-            last_chat = self.r.get(f'admin:last_chat:{self.instance_name}')
+            last_chat = self.r.get(last_chat_key(self.instance_name))
             text = action.get('text', '')
             if last_chat and text:
                 sent = whatsapp.send_message(self.instance_name, last_chat, text)
@@ -532,7 +675,7 @@ class AdminController:
         if atype == 'set_prompt':
             text = action.get('text', '')
             if text:
-                self.r.set(f'admin:prompt_override:{self.instance_name}', text)
+                self.r.set(prompt_override_key(self.instance_name), text)
             return None
 
         if atype == 'save_prompt':
@@ -540,7 +683,7 @@ class AdminController:
             slug = action.get('tenant_slug', '')
             if text:
                 if slug:
-                    tenant = tenants_db.get_tenant_by_slug(slug)
+                    tenant = self._get_tenant_by_slug(slug)
                     if tenant:
                         tenants_db.upsert_agent_config(str(tenant['id']), system_prompt=text)
                     else:
@@ -552,7 +695,7 @@ class AdminController:
         if atype == 'get_prompt':
             slug = action.get('tenant_slug', '')
             if slug:
-                tenant = tenants_db.get_tenant_by_slug(slug)
+                tenant = self._get_tenant_by_slug(slug)
                 if tenant:
                     agent = tenants_db.get_active_agent_config(str(tenant['id']))
                     prompt = (agent or {}).get('system_prompt', '(nenhum)')
@@ -571,13 +714,13 @@ class AdminController:
         if atype == 'block':
             phone = self._clean_phone(action.get('phone', ''))
             if phone:
-                self.r.set(f'block:{self.instance_name}:{phone}', '1')
+                self._set_chat_flag(phone, CHAT_FLAG_BLOCK)
             return None
 
         if atype == 'unblock':
             phone = self._clean_phone(action.get('phone', ''))
             if phone:
-                self.r.delete(f'block:{self.instance_name}:{phone}')
+                self._clear_chat_flag(phone, CHAT_FLAG_BLOCK)
             return None
 
         if atype == 'list_tenants':
@@ -590,7 +733,7 @@ class AdminController:
             return self._cmd_errors('')
 
         if atype == 'clear_errors':
-            self.r.delete(f'admin:errors:{self.instance_name}')
+            self._clear_errors()
             return None
 
         if atype == 'status':
@@ -662,9 +805,6 @@ class AdminController:
         )
 
     def _cmd_status(self, args):
-        from app.channels import whatsapp
-        from app.db import conversations as conv_db
-
         # Connection state
         conn_state = whatsapp.get_connection_state(self.instance_name)
 
@@ -672,10 +812,11 @@ class AdminController:
         is_paused = bool(self.r.get(f'admin:paused:{self.instance_name}'))
         status_label = 'PAUSADO' if is_paused else 'ATIVO'
 
-        # Counts
-        takeover_keys = self.r.keys(f'admin:takeover:{self.instance_name}:*')
-        paused_keys = self.r.keys(f'admin:pausedchat:{self.instance_name}:*')
-        block_keys = self.r.keys(f'block:{self.instance_name}:*')
+        # Counts (one HGETALL per flagged chat, pipelined; expired takeovers pruned)
+        flag_counts = defaultdict(int)
+        for flags in self._chat_flags_by_key(self._scan_chat_flag_keys()):
+            for flag in flags:
+                flag_counts[flag] += 1
 
         # Active chats from DB
         try:
@@ -693,9 +834,9 @@ class AdminController:
             f'Status: {status_label}\n'
             f'Conexao: {conn_state}\n'
             f'Chats ativos: {active_count}\n'
-            f'Chats em takeover: {len(takeover_keys)}\n'
-            f'Chats pausados: {len(paused_keys)}\n'
-            f'Contatos bloqueados: {len(block_keys)}\n'
+            f'Chats em takeover: {flag_counts[CHAT_FLAG_TAKEOVER]}\n'
+            f'Chats pausados: {flag_counts[CHAT_FLAG_PAUSED]}\n'
+            f'Contatos bloqueados: {flag_counts[CHAT_FLAG_BLOCK]}\n'
             f'Erros recentes: {error_count}\n\n'
             f'Instancia: {self.instance_name}\n'
             f'Atualizado: {datetime.now(timezone.utc).strftime("%H:%M:%S UTC")}'
@@ -713,15 +854,7 @@ class AdminController:
                 'O bot voltou a responder mensagens automaticamente.')
 
     def _cmd_restart(self, args):
-        # Clear ephemeral state
-        self.r.delete(f'admin:paused:{self.instance_name}')
-        self.r.delete(f'admin:prompt_override:{self.instance_name}')
-        self.r.delete(f'admin:temp_override:{self.instance_name}')
-        # Clear takeovers
-        for key in self.r.keys(f'admin:takeover:{self.instance_name}:*'):
-            self.r.delete(key)
-        for key in self.r.keys(f'admin:pausedchat:{self.instance_name}:*'):
-            self.r.delete(key)
+        self._clear_ephemeral_state()
         return ('AGENTE REINICIADO\n\n'
                 'Estado limpo: pause, takeovers, prompts e chats pausados resetados.')
 
@@ -730,8 +863,6 @@ class AdminController:
     # -----------------------------------------------------------------------
 
     def _cmd_chats(self, args):
-        from app.db import conversations as conv_db
-
         try:
             convs = conv_db.list_conversations(self.tenant_id, limit=15)
         except Exception as e:
@@ -740,43 +871,36 @@ class AdminController:
         if not convs:
             return 'Nenhum chat ativo no momento.'
 
-        lines = [f'CHATS ATIVOS ({len(convs)})', '========================', '']
-        for i, c in enumerate(convs, 1):
-            phone = c.get('contact_phone', '?')
-            name = c.get('contact_name') or 'Desconhecido'
-            last_msg = c.get('last_message_at', '')
-            if hasattr(last_msg, 'strftime'):
-                last_msg = last_msg.strftime('%d/%m %H:%M')
-
-            flags = ''
-            if self.r.get(f'admin:pausedchat:{self.instance_name}:{phone}'):
-                flags += ' [PAUSADO]'
-            if self.r.get(f'admin:takeover:{self.instance_name}:{phone}'):
-                flags += ' [TAKEOVER]'
-            if self.r.get(f'block:{self.instance_name}:{phone}'):
-                flags += ' [BLOQUEADO]'
-
-            lines.append(f'{i}. {name}{flags}')
-            lines.append(f'   {phone}')
-            lines.append(f'   Ultima msg: {last_msg}')
-            lines.append('')
-
-        return '\n'.join(lines)
+        all_flags = self._chat_flags_many([c.get('contact_phone', '?') for c in convs])
+        return (f'CHATS ATIVOS ({len(convs)})\n========================\n\n'
+                + '\n'.join(self._format_chat_entry(i, c, flags)
+                             for i, (c, flags) in enumerate(zip(convs, all_flags), 1)))
+
+    @staticmethod
+    def _format_chat_entry(i, c, chat_flags):
+        phone = c.get('contact_phone', '?')
+        name = c.get('contact_name') or 'Desconhecido'
+        last_msg = c.get('last_message_at', '')
+        if hasattr(last_msg, 'strftime'):
+            last_msg = last_msg.strftime('%d/%m %H:%M')
+
+        flags = ''
+        if CHAT_FLAG_PAUSED in chat_flags:
+            flags += ' [PAUSADO]'
+        if CHAT_FLAG_TAKEOVER in chat_flags:
+            flags += ' [TAKEOVER]'
+        if CHAT_FLAG_BLOCK in chat_flags:
+            flags += ' [BLOQUEADO]'
+
+        return f'{i}. {name}{flags}\n   {phone}\n   Ultima msg: {last_msg}\n'
 
     def _cmd_chat(self, args):
         phone = self._clean_phone(args)
         if not phone:
             return 'Formato: /chat 5511999999999'
 
-        from app.db import conversations as conv_db
-
         try:
-            convs = conv_db.list_conversations(self.tenant_id, limit=100)
-            conv = None
-            for c in (convs or []):
-                if c.get('contact_phone', '').endswith(phone) or phone in c.get('contact_phone', ''):
-                    conv = c
-                    break
+            conv = self._get_conversation_by_phone(phone)
             if not conv:
                 return f'Chat nao encontrado: {phone}'
 
@@ -785,30 +909,26 @@ class AdminController:
             return f'Erro ao buscar chat: {e}'
 
         name = conv.get('contact_name') or 'Desconhecido'
-        lines = [f'CHAT: {name} ({conv.get("contact_phone", "")})',
-                 '========================', '']
-
-        for msg in history:
-            role = 'VOCE' if msg.get('role') == 'assistant' else 'CLIENTE'
-            content = msg.get('content', '')[:200]
-            ts = msg.get('created_at', '')
-            if hasattr(ts, 'strftime'):
-                ts = ts.strftime('%H:%M')
-            lines.append(f'[{ts}] {role}: {content}')
-
+        header = f'CHAT: {name} ({conv.get("contact_phone", "")})\n========================\n\n'
         if not history:
-            lines.append('(sem mensagens)')
-
-        return '\n'.join(lines)
+            return header + '(sem mensagens)'
+        return header + '\n'.join(self._format_history_line(msg) for msg in history)
+
+    @staticmethod
+    def _format_history_line(msg):
+        role = 'VOCE' if msg.get('role') == 'assistant' else 'CLIENTE'
+        content = msg.get('content', '')[:200]
+        ts = msg.get('created_at', '')
+        if hasattr(ts, 'strftime'):
+            ts = ts.strftime('%H:%M')
+        return f'[{ts}] {role}: {content}'
 
     def _cmd_takeover(self, args):
         phone = self._clean_phone(args)
         if not phone:
             return 'Formato: /takeover 5511999999999'
 
-        self.r.set(f'admin:takeover:{self.instance_name}:{phone}',
-                   '1', ex=config.ADMIN_TAKEOVER_TTL)
-        self.r.set(f'admin:last_chat:{self.instance_name}', phone, ex=3600)
+        self._set_takeover(phone)
 
         hours = config.ADMIN_TAKEOVER_TTL // 3600
         return (f'TAKEOVER ATIVADO\n\n'
@@ -822,7 +942,7 @@ class AdminController:
         if not phone:
             return 'Formato: /release 5511999999999'
 
-        self.r.delete(f'admin:takeover:{self.instance_name}:{phone}')
+        self._clear_chat_flag(phone, CHAT_FLAG_TAKEOVER)
         return (f'CHAT LIBERADO\n\n'
                 f'Chat {phone} devolvido ao bot.\n'
                 f'O bot voltara a responder automaticamente.')
@@ -832,7 +952,7 @@ class AdminController:
         if not phone:
             return 'Formato: /pausechat 5511999999999'
 
-        self.r.set(f'admin:pausedchat:{self.instance_name}:{phone}', '1')
+        self._set_chat_flag(phone, CHAT_FLAG_PAUSED)
         return f'Chat {phone} pausado.\nUse /resumechat {phone} para retomar.'
 
     def _cmd_resumechat(self, args):
@@ -840,7 +960,7 @@ class AdminController:
         if not phone:
             return 'Formato: /resumechat 5511999999999'
 
-        self.r.delete(f'admin:pausedchat:{self.instance_name}:{phone}')
+        self._clear_chat_flag(phone, CHAT_FLAG_PAUSED)
         return f'Chat {phone} retomado. Bot voltara a responder.'
 
     # -----------------------------------------------------------------------
@@ -848,21 +968,19 @@ class AdminController:
     # -----------------------------------------------------------------------
 
     def _cmd_send(self, args):
-        import re
-        match = re.match(r'^(\d+)\s+(.+)$', args, re.DOTALL)
+        match = _SEND_RE.match(args)
         if not match:
             return 'Formato: /send 5511999999999 Sua mensagem aqui'
 
         phone = match.group(1)
         message = match.group(2)
 
-        from app.channels import whatsapp
         sent = whatsapp.send_message(self.instance_name, phone, message)
 
         if sent:
             # Save to conversation history for AI context coherence
             self._save_admin_message(phone, message)
-            self.r.set(f'admin:last_chat:{self.instance_name}', phone, ex=3600)
+            self.r.set(last_chat_key(self.instance_name), phone, ex=3600)
             return f'Mensagem enviada para {phone}:\n"{message[:200]}"'
         return f'Falha ao enviar para {phone}. Verifique o numero.'
 
@@ -870,11 +988,10 @@ class AdminController:
         if not args:
             return 'Formato: /reply Sua resposta aqui'
 
-        last_chat = self.r.get(f'admin:last_chat:{self.instance_name}')
+        last_chat = self.r.get(last_chat_key(self.instance_name))
         if not last_chat:
             return 'Nenhum chat ativo para responder. Use /send NUMERO MSG.'
 
-        from app.channels import whatsapp
         sent = whatsapp.send_message(self.instance_name, last_chat, args)
 
         if sent:
@@ -886,13 +1003,12 @@ class AdminController:
         if not args:
             return 'Formato: /correct Nova resposta correta'
 
-        last_chat = self.r.get(f'admin:last_chat:{self.instance_name}')
+        last_chat = self.r.get(last_chat_key(self.instance_name))
         if not last_chat:
             return 'Nenhum chat para corrigir.'
 
         correction = f'Correcao: {args}'
 
-        from app.channels import whatsapp
         sent = whatsapp.send_message(self.instance_name, last_chat, correction)
 
         if sent:
@@ -908,19 +1024,17 @@ class AdminController:
         if not args:
             return 'Formato: /setprompt Seu novo prompt aqui'
 
-        self.r.set(f'admin:prompt_override:{self.instance_name}', args)
+        self.r.set(prompt_override_key(self.instance_name), args)
         preview = args[:150] + ('...' if len(args) > 150 else '')
         return f'Prompt atualizado (Redis override)!\n\nNovo prompt:\n"{preview}"'
 
     def _cmd_getprompt(self, args):
-        from app.db import tenants as tenants_db
-
         # If args provided, try to find tenant by slug
         target_tenant_id = self.tenant_id
         target_label = 'ATUAL'
         if args and args.strip():
             slug = args.strip().split()[0]
-            tenant = tenants_db.get_tenant_by_slug(slug)
+            tenant = self._get_tenant_by_slug(slug)
             if tenant:
                 target_tenant_id = str(tenant['id'])
                 target_label = slug
@@ -928,7 +1042,7 @@ class AdminController:
                 return f'Tenant nao encontrado: {slug}\nUse /tenants para listar.'
 
         # Check for runtime override first
-        override = self.r.get(f'admin:prompt_override:{self.instance_name}')
+        override = self.r.get(prompt_override_key(self.instance_name))
         if override and target_tenant_id == self.tenant_id:
             source = 'OVERRIDE (Redis)'
             prompt = override
@@ -945,8 +1059,6 @@ class AdminController:
 
     def _cmd_saveprompt(self, args):
         """Persist prompt directly to database (not just Redis override)."""
-        from app.db import tenants as tenants_db
-
         if not args:
             return 'Formato: /saveprompt [SLUG] Seu prompt aqui\nSem slug = tenant atual.'
 
@@ -955,7 +1067,7 @@ class AdminController:
         rest = parts[1] if len(parts) > 1 else ''
 
         # Check if first word is a tenant slug
-        tenant = tenants_db.get_tenant_by_slug(first_word)
+        tenant = self._get_tenant_by_slug(first_word)
         if tenant and rest:
             target_id = str(tenant['id'])
             target_label = first_word
@@ -991,8 +1103,7 @@ class AdminController:
         if not phone:
             return 'Formato: /addblock 5511999999999'
 
-        # Reuses the EXISTING block key pattern from message_handler.py
-        self.r.set(f'block:{self.instance_name}:{phone}', '1')
+        self._set_chat_flag(phone, CHAT_FLAG_BLOCK)
         return f'Numero {phone} bloqueado.\nO bot nao respondera mais este contato.'
 
     def _cmd_removeblock(self, args):
@@ -1000,7 +1111,7 @@ class AdminController:
         if not phone:
             return 'Formato: /removeblock 5511999999999'
 
-        self.r.delete(f'block:{self.instance_name}:{phone}')
+        self._clear_chat_flag(phone, CHAT_FLAG_BLOCK)
         return f'Numero {phone} desbloqueado.'
 
     # -----------------------------------------------------------------------
@@ -1009,47 +1120,42 @@ class AdminController:
 
     def _cmd_tenants(self, args):
         """List all tenants."""
-        from app.db import tenants as tenants_db
-
         try:
-            tenants = tenants_db.list_tenants(status=None)
+            tenants = self._list_tenants()
         except Exception as e:
             return f'Erro ao listar tenants: {e}'
 
         if not tenants:
             return 'Nenhum tenant cadastrado.'
 
-        lines = [f'TENANTS ({len(tenants)})', '========================', '']
-        for t in tenants:
-            status_icon = 'ON' if t.get('status') == 'active' else 'OFF'
-            slug = t.get('slug', '?')
-            name = t.get('name', '?')
-            tid = t.get('id', '?')
-
-            # Check accounts for this tenant
-            try:
-                accounts = tenants_db.list_whatsapp_accounts(str(tid))
-                instances = [a.get('instance_name', '') for a in (accounts or [])]
-            except Exception:
-                instances = []
+        # All accounts in one query, grouped by tenant
+        instances_by_tenant = defaultdict(list)
+        try:
+            for a in tenants_db.list_all_whatsapp_accounts() or []:
+                instances_by_tenant[str(a['tenant_id'])].append(a.get('instance_name', ''))
+        except Exception:
+            pass
 
-            lines.append(f'[{status_icon}] {name}')
-            lines.append(f'   slug: {slug} | id: {tid}')
-            if instances:
-                lines.append(f'   instancias: {", ".join(instances)}')
-            lines.append('')
+        return (f'TENANTS ({len(tenants)})\n========================\n\n'
+                + '\n'.join(self._format_tenant_entry(t, instances_by_tenant[str(t.get('id'))])
+                            for t in tenants))
 
-        return '\n'.join(lines)
+    @staticmethod
+    def _format_tenant_entry(t, instances):
+        status_icon = 'ON' if t.get('status') == 'active' else 'OFF'
+        tid = t.get('id', '?')
+        entry = f'[{status_icon}] {t.get("name", "?")}\n   slug: {t.get("slug", "?")} | id: {tid}\n'
+        if instances:
+            entry += f'   instancias: {", ".join(instances)}\n'
+        return entry
 
     def _cmd_tenant_info(self, args):
         """Show detailed info for a tenant."""
-        from app.db import tenants as tenants_db
-
         if not args or not args.strip():
             return 'Formato: /tenant SLUG\nUse /tenants para listar.'
 
         slug = args.strip().split()[0]
-        tenant = tenants_db.get_tenant_by_slug(slug)
+        tenant = self._get_tenant_by_slug(slug)
         if not tenant:
             return f'Tenant nao encontrado: {slug}\nUse /tenants para listar.'
 
@@ -1066,9 +1172,11 @@ class AdminController:
         try:
             agent = tenants_db.get_active_agent_config(tid)
             if agent:
-                prompt = (agent.get('system_prompt', '') or '')[:200]
-                lines.append(f'\nPrompt ({len(agent.get("system_prompt", "") or "")} chars):')
-                lines.append(f'"{prompt}..."' if len(agent.get('system_prompt', '') or '') > 200 else f'"{prompt}"')
+                prompt = agent.get('system_prompt') or ''
+                prompt_len = len(prompt)
+                preview = prompt[:200]
+                lines.append(f'\nPrompt ({prompt_len} chars):')
+                lines.append(f'"{preview}..."' if prompt_len > 200 else f'"{preview}"')
                 lines.append(f'Modelo: {agent.get("model", "default")}')
                 lines.append(f'Temperatura: {agent.get("temperature", "default")}')
             else:
@@ -1096,20 +1204,16 @@ class AdminController:
         return self._cmd_errors(args)
 
     def _cmd_errors(self, args):
-        key = f'admin:errors:{self.instance_name}'
-        errors = self.r.lrange(key, 0, 19)  # Last 20
+        errors = self._recent_errors()
 
         if not errors:
             return 'Nenhum erro registrado.'
 
-        lines = [f'ERROS RECENTES ({len(errors)})', '========================', '']
-        for err in errors:
-            lines.append(err)
-
-        return '\n'.join(lines)
+        header = f'ERROS RECENTES ({len(errors)})\n========================\n\n'
+        return header + '\n'.join(errors)
 
     def _cmd_clearerrors(self, args):
-        self.r.delete(f'admin:errors:{self.instance_name}')
+        self._clear_errors()
         return 'Erros limpos.'
 
     # -----------------------------------------------------------------------
@@ -1117,29 +1221,49 @@ class AdminController:
     # -----------------------------------------------------------------------
 
     def _exec_shell(self, command):
-        """Execute a shell command on the server. Returns output truncated for WhatsApp."""
-        import subprocess
+        """Execute a shell command on the server. Returns output truncated for WhatsApp.
+
+        Plain commands are exec'd directly; only commands with shell syntax
+        (pipes, redirects, globs, builtins...) go through /bin/sh. Output is
+        read incrementally and the process is killed once EXEC_READ_MAX_BYTES
+        have been collected, so runaway commands never buffer more than a few KB.
+        """
         if not command:
             return 'Nenhum comando fornecido.'
 
         log.info(f'[ADMIN SHELL] {command}')
         try:
-            result = subprocess.run(
-                command, shell=True, capture_output=True, text=True,
-                timeout=30, cwd='/root/hub-automacao-pro',
+            argv = _command_argv(command)
+            proc = subprocess.Popen(
+                argv if argv else command, shell=argv is None,
+                stdout=subprocess.PIPE, stderr=subprocess.STDOUT, cwd=PROJECT_DIR,
             )
-            output = result.stdout or ''
-            if result.stderr:
-                output += '\n' + result.stderr
-            output = output.strip()
+            timed_out = threading.Event()
+
+            def _on_timeout():
+                if proc.poll() is None:
+                    timed_out.set()
+                    proc.kill()
+
+            # Own timer thread: the kill must not queue behind jobs on a shared pool
+            timer = threading.Timer(EXEC_TIMEOUT_SECONDS, _on_timeout)
+            timer.start()
+            try:
+                raw = proc.stdout.read(EXEC_READ_MAX_BYTES + 1)
+                if len(raw) > EXEC_READ_MAX_BYTES:
+                    proc.kill()
+                proc.stdout.close()
+                proc.wait()
+            finally:
+                timer.cancel()
+
+            if timed_out.is_set():
+                return f'Comando excedeu timeout de {EXEC_TIMEOUT_SECONDS}s.'
+
+            output = raw[:EXEC_READ_MAX_BYTES].decode('utf-8', errors='replace').strip()
             if not output:
-                output = f'(exit code: {result.returncode})'
-            # Truncate for WhatsApp
-            if len(output) > 2000:
-                output = output[:2000] + '\n... (truncado)'
-            return output
-        except subprocess.TimeoutExpired:
-            return 'Comando excedeu timeout de 30s.'
+                output = f'(exit code: {proc.returncode})'
+            return _truncate_output(output, truncated=len(raw) > EXEC_READ_MAX_BYTES)
         except Exception as e:
             return f'Erro: {str(e)[:200]}'
 
@@ -1150,8 +1274,6 @@ class AdminController:
 
         log.info(f'[ADMIN SQL] {sql[:100]}')
         try:
-            from app.db import query as db_query, execute as db_execute
-
             sql_stripped = sql.strip().rstrip(';')
             upper = sql_stripped.upper().lstrip()
 
@@ -1159,19 +1281,18 @@ class AdminController:
                 rows = db_query(sql_stripped)
                 if not rows:
                     return '(nenhum resultado)'
-                # Format as text table
-                lines = []
-                for i, row in enumerate(rows[:20]):
-                    if i == 0:
-                        lines.append(' | '.join(str(k) for k in row.keys()))
-                        lines.append('-' * 40)
-                    lines.append(' | '.join(str(v)[:50] for v in row.values()))
+                # Format as text table, stopping once the WhatsApp budget is spent
+                buf = io.StringIO()
+                buf.write(' | '.join(str(k) for k in rows[0].keys()))
+                buf.write('\n' + '-' * 40)
+                for row in rows[:20]:
+                    if buf.tell() > EXEC_OUTPUT_MAX_CHARS:
+                        break
+                    buf.write('\n')
+                    buf.write(' | '.join(str(v)[:50] for v in row.values()))
                 if len(rows) > 20:
-                    lines.append(f'... (+{len(rows)-20} linhas)')
-                output = '\n'.join(lines)
-                if len(output) > 2000:
-                    output = output[:2000] + '\n... (truncado)'
-                return output
+                    buf.write(f'\n... (+{len(rows)-20} linhas)')
+                return _truncate_output(buf.getvalue())
             else:
                 db_execute(sql_stripped)
                 return f'Query executada: {sql_stripped[:100]}'
@@ -1185,33 +1306,52 @@ class AdminController:
 
         log.info(f'[ADMIN FILE] Read: {path}')
         try:
-            with open(path, 'r') as f:
-                content = f.read()
-            if len(content) > 2000:
-                content = content[:2000] + '\n... (truncado)'
-            return content or '(arquivo vazio)'
+            with open(path, 'rb') as f:
+                raw = f.read(EXEC_READ_MAX_BYTES + 1)
+            content = raw[:EXEC_READ_MAX_BYTES].decode('utf-8', errors='replace')
+            if not content:
+                return '(arquivo vazio)'
+            return _truncate_output(content, truncated=len(raw) > EXEC_READ_MAX_BYTES)
         except FileNotFoundError:
             return f'Arquivo nao encontrado: {path}'
         except Exception as e:
             return f'Erro ao ler: {str(e)[:200]}'
 
     def _exec_edit_file(self, path, old, new):
-        """Replace text in a file (exact string match)."""
+        """Replace text in a file (exact string match, first occurrence).
+
+        The match is located through a read-only mmap and the result is
+        streamed to a temp file (head + new + tail) that atomically replaces
+        the original, so large files are never held in memory twice.
+        """
         if not path or not old:
             return 'Parametros incompletos para editar arquivo.'
 
         log.info(f'[ADMIN FILE] Edit: {path} — replacing {len(old)} chars')
         try:
-            with open(path, 'r') as f:
-                content = f.read()
-
-            if old not in content:
-                return f'Texto nao encontrado no arquivo {path}'
-
-            new_content = content.replace(old, new, 1)
-
-            with open(path, 'w') as f:
-                f.write(new_content)
+            old_bytes = old.encode('utf-8')
+            with open(path, 'rb') as src:
+                if os.fstat(src.fileno()).st_size == 0:
+                    return f'Texto nao encontrado no arquivo {path}'
+                with mmap.mmap(src.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                    idx = m.find(old_bytes)
+                    if idx < 0:
+                        return f'Texto nao encontrado no arquivo {path}'
+
+                    fd, tmp_path = tempfile.mkstemp(
+                        dir=os.path.dirname(os.path.abspath(path)), prefix='.edit-')
+                    try:
+                        with os.fdopen(fd, 'wb') as dst:
+                            for start in range(0, idx, EDIT_COPY_CHUNK):
+                                dst.write(m[start:min(start + EDIT_COPY_CHUNK, idx)])
+                            dst.write(new.encode('utf-8'))
+                            src.seek(idx + len(old_bytes))
+                            shutil.copyfileobj(src, dst, EDIT_COPY_CHUNK)
+                        shutil.copymode(path, tmp_path)
+                        os.replace(tmp_path, path)
+                    except BaseException:
+                        os.unlink(tmp_path)
+                        raise
 
             return f'Arquivo editado: {path}'
         except FileNotFoundError:
@@ -1223,22 +1363,144 @@ class AdminController:
     # Helpers
     # -----------------------------------------------------------------------
 
+    def _cached(self, key, loader):
+        """Read-through Redis cache for admin lookups (ADMIN_CACHE_TTL seconds).
+
+        Falls back to the loader on any Redis error. Values are JSON-encoded,
+        so UUIDs and timestamps come back as strings.
+        """
+        try:
+            raw = self.r.get(key)
+            if raw:
+                return json.loads(raw)
+        except Exception:
+            pass
+        value = loader()
+        if value:
+            try:
+                self.r.set(key, json.dumps(value, default=str), ex=ADMIN_CACHE_TTL)
+            except Exception:
+                pass
+        return value
+
+    def _get_tenant_by_slug(self, slug):
+        return self._cached(f'cache:tenant_slug:{slug}',
+                            lambda: tenants_db.get_tenant_by_slug(slug))
+
+    def _list_tenants(self):
+        return self._cached('cache:tenants:all',
+                            lambda: tenants_db.list_tenants(status=None))
+
+    def _get_conversation_by_phone(self, phone):
+        return self._cached(
+            f'cache:conv_phone:{self.tenant_id}:{phone}',
+            lambda: conv_db.get_conversation_by_phone(self.tenant_id, phone),
+        )
+
+    def _recent_errors(self):
+        """Last 20 admin errors, memoized in-process for ERRORS_CACHE_TTL seconds."""
+        cached = _errors_cache.get(self.instance_name)
+        if cached and time.monotonic() - cached[0] < ERRORS_CACHE_TTL:
+            return cached[1]
+        errors = self.r.lrange(f'admin:errors:{self.instance_name}', 0, 19)
+        _errors_cache[self.instance_name] = (time.monotonic(), errors)
+        return errors
+
+    def _clear_errors(self):
+        self.r.delete(f'admin:errors:{self.instance_name}')
+        _errors_cache.pop(self.instance_name, None)
+
+    def _set_chat_flag(self, phone, flag, value='1'):
+        """Set a pause/block flag; those never expire, so the hash loses any TTL."""
+        key = chat_flags_key(self.instance_name, phone)
+        with self.r.pipeline(transaction=False) as p:
+            p.hset(key, flag, value)
+            p.persist(key)
+            p.execute()
+
+    def _clear_chat_flag(self, phone, flag):
+        key = chat_flags_key(self.instance_name, phone)
+        with self.r.pipeline(transaction=False) as p:
+            p.hdel(key, flag)
+            p.hgetall(key)
+            _, raw = p.execute()
+        self._expire_with_takeover(key, raw)
+
+    def _expire_with_takeover(self, key, raw):
+        """Let a hash whose only field is a takeover expire together with it."""
+        if not raw or set(raw) != {CHAT_FLAG_TAKEOVER}:
+            return
+        try:
+            self.r.expireat(key, int(raw[CHAT_FLAG_TAKEOVER]))
+        except ValueError:
+            self.r.delete(key)
+
+    def _scan_chat_flag_keys(self):
+        """This instance's chat flag hashes, via SCAN (KEYS blocks Redis)."""
+        return list(self.r.scan_iter(match=chat_flags_key(self.instance_name, '*'), count=500))
+
+    def _chat_flags_by_key(self, keys):
+        """HGETALL several chat flag hashes in one pipeline; returns active flag sets.
+
+        Takeover fields found past their expiry are deleted in a second pipeline.
+        """
+        if not keys:
+            return []
+        with self.r.pipeline(transaction=False) as p:
+            for key in keys:
+                p.hgetall(key)
+            replies = p.execute()
+        now = time.time()
+        all_flags = [parse_chat_flags(raw, now) for raw in replies]
+        expired = [key for key, raw, flags in zip(keys, replies, all_flags)
+                   if raw and CHAT_FLAG_TAKEOVER in raw and CHAT_FLAG_TAKEOVER not in flags]
+        if expired:
+            with self.r.pipeline(transaction=False) as p:
+                for key in expired:
+                    p.hdel(key, CHAT_FLAG_TAKEOVER)
+                p.execute()
+        return all_flags
+
+    def _chat_flags_many(self, phones):
+        return self._chat_flags_by_key([chat_flags_key(self.instance_name, p) for p in phones])
+
+    def _set_takeover(self, phone):
+        """Mark a chat as taken over and make it the last active chat (1 RTT).
+
+        The takeover field stores its own expiry since hash fields share the
+        key's TTL and the block/pause flags must not expire with it; a hash
+        holding nothing else gets that expiry as its TTL.
+        """
+        key = chat_flags_key(self.instance_name, phone)
+        expires_at = int(time.time()) + config.ADMIN_TAKEOVER_TTL
+        with self.r.pipeline(transaction=False) as p:
+            p.hset(key, CHAT_FLAG_TAKEOVER, str(expires_at))
+            p.hgetall(key)
+            p.set(last_chat_key(self.instance_name), phone, ex=3600)
+            _, raw, _ = p.execute()
+        self._expire_with_takeover(key, raw)
+
+    def _clear_ephemeral_state(self):
+        """Clear pause, overrides, takeovers and paused chats (blocks are kept)."""
+        with self.r.pipeline(transaction=False) as p:
+            p.delete(
+                f'admin:paused:{self.instance_name}',
+                prompt_override_key(self.instance_name),
+                f'admin:temp_override:{self.instance_name}',
+            )
+            for key in self._scan_chat_flag_keys():
+                p.hdel(key, CHAT_FLAG_TAKEOVER, CHAT_FLAG_PAUSED)
+            p.execute()
+
     def _clean_phone(self, text):
         """Extract phone number from text, keeping only digits."""
-        import re
-        digits = re.sub(r'[^\d]', '', text.strip())
+        digits = _NON_DIGITS_RE.sub('', text.strip())
         return digits if len(digits) >= 8 else ''
 
     def _save_admin_message(self, phone, message):
         """Save an admin-sent message to conversation history for AI context."""
         try:
-            from app.db import conversations as conv_db
-            convs = conv_db.list_conversations(self.tenant_id, limit=100)
-            conv = None
-            for c in (convs or []):
-                if c.get('contact_phone', '').endswith(phone) or phone in c.get('contact_phone', ''):
-                    conv = c
-                    break
+            conv = self._get_conversation_by_phone(phone)
             if conv:
                 conv_db.save_message(
                     str(conv['id']), 'assistant', message,
@@ -2,39 +2,62 @@
 
 import time
 import logging
+from concurrent.futures import ThreadPoolExecutor
 
 from app.db import conversations as conv_db
 from app.channels import whatsapp, sender
 from app.ai.prompts import is_real_name, detect_language
 from app.config import config
+from app.db.redis_client import get_redis
 
 log = logging.getLogger('services.automation')
 
 # --- Reengagement messages ---
 
 _REENGAGE_PT = [
-    'Oi{nome}! Fiquei pensando sobre o que conversamos. Se tiver alguma duvida, to por aqui.',
-    'E ai{nome}, tudo certo? Fico a disposicao se precisar de algo.',
-    '{nome_ou_oi}, se quiser continuar de onde paramos, e so me chamar.',
+    'Oi%(nome)s! Fiquei pensando sobre o que conversamos. Se tiver alguma duvida, to por aqui.',
+    'E ai%(nome)s, tudo certo? Fico a disposicao se precisar de algo.',
+    '%(nome_ou_oi)s, se quiser continuar de onde paramos, e so me chamar.',
 ]
 _REENGAGE_EN = [
-    'Hey{nome}! Just checking in. Let me know if you have any questions.',
-    'Hi{nome}, still here if you need anything!',
-    '{nome_ou_oi}, feel free to reach out whenever you are ready.',
+    'Hey%(nome)s! Just checking in. Let me know if you have any questions.',
+    'Hi%(nome)s, still here if you need anything!',
+    '%(nome_ou_oi)s, feel free to reach out whenever you are ready.',
 ]
 _REENGAGE_ES = [
-    'Hola{nome}! Quedo a tu disposicion si tienes alguna duda.',
-    '{nome_ou_oi}, si necesitas algo, aqui estoy.',
-    'Hola{nome}, seguimos cuando quieras!',
+    'Hola%(nome)s! Quedo a tu disposicion si tienes alguna duda.',
+    '%(nome_ou_oi)s, si necesitas algo, aqui estoy.',
+    'Hola%(nome)s, seguimos cuando quieras!',
 ]
 
-_reengage_idx = 0
+_reengage_idx = 0  # Local fallback when Redis is unavailable
+REENGAGE_IDX_TTL = 365 * 86400
 
+REENGAGE_MAX_WORKERS = 8  # Stale conversations reengaged in parallel per tenant
 
-def get_reengage_message(push_name='', language='pt'):
-    """Get a varied reengagement message."""
+
+def _next_reengage_idx():
+    """Round-robin template index shared by all workers (Redis INCR).
+
+    Falls back to a per-process counter when Redis is unavailable.
+    """
     global _reengage_idx
+    r = get_redis()
+    if r:
+        try:
+            with r.pipeline(transaction=False) as p:
+                p.incr('reengage:idx')
+                p.expire('reengage:idx', REENGAGE_IDX_TTL)
+                idx, _ = p.execute()
+            return int(idx)
+        except Exception:
+            pass
+    _reengage_idx += 1
+    return _reengage_idx
+
 
+def get_reengage_message(push_name='', language='pt'):
+    """Get a varied reengagement message."""
     nome = ''
     nome_ou_oi = 'Oi'
     if push_name and is_real_name(push_name):
@@ -53,15 +76,16 @@ def get_reengage_message(push_name='', language='pt'):
     else:
         msgs = _REENGAGE_PT
 
-    msg = msgs[_reengage_idx % len(msgs)]
-    _reengage_idx += 1
-    return msg.format(nome=nome, nome_ou_oi=nome_ou_oi)
+    msg = msgs[_next_reengage_idx() % len(msgs)]
+    return msg % {'nome': nome, 'nome_ou_oi': nome_ou_oi}
 
 
 def run_reengagement(tenant_id):
     """Check for stale conversations and send reengagement messages.
 
-    Called periodically by the reengagement worker.
+    Called periodically by the reengagement worker. Conversations are
+    processed concurrently (REENGAGE_MAX_WORKERS), each keeping its own
+    typing delay and post-send pacing.
     """
     stale = conv_db.get_stale_conversations(
         tenant_id,
@@ -72,23 +96,25 @@ def run_reengagement(tenant_id):
         return 0
 
     log.info(f'[REENGAGE] Found {len(stale)} stale conversations for tenant {tenant_id}')
-    sent_count = 0
 
-    for conv in stale:
-        instance_name = conv.get('instance_name', '')
-        phone = conv.get('contact_phone', '')
-        contact_name = conv.get('contact_name', '')
-        conversation_id = str(conv['id'])
+    workers = min(REENGAGE_MAX_WORKERS, len(stale))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='reengage') as pool:
+        results = pool.map(_reengage_conversation, stale)
+        return sum(1 for sent in results if sent)
 
-        # Detect language from last messages
-        language = conv.get('language', 'pt')
-        try:
-            history = conv_db.get_message_history(conversation_id, limit=3)
-            user_msgs = [m for m in history if m['role'] == 'user']
-            if user_msgs:
-                language = detect_language(user_msgs[-1]['content'])
-        except Exception:
-            pass
+
+def _reengage_conversation(conv):
+    """Send one reengagement message. Returns True if sent."""
+    instance_name = conv.get('instance_name', '')
+    phone = conv.get('contact_phone', '')
+    contact_name = conv.get('contact_name', '')
+    conversation_id = str(conv['id'])
+
+    try:
+        # Language of the client's unanswered message (fetched with the stale query)
+        last_message = conv.get('last_user_message')
+        language = (detect_language(last_message) if last_message
+                    else conv.get('language') or 'pt')
 
         msg = get_reengage_message(contact_name, language)
 
@@ -100,11 +126,12 @@ def run_reengagement(tenant_id):
         if sent:
             conv_db.increment_reengagement(conversation_id)
             conv_db.save_message(conversation_id, 'assistant', msg, {'source': 'reengagement'})
-            sent_count += 1
             log.info(f'[REENGAGE] Sent to {phone} ({instance_name})')
         else:
             log.warning(f'[REENGAGE] Failed to send to {phone} ({instance_name})')
 
         time.sleep(3)
-
-    return sent_count
+        return sent
+    except Exception as e:
+        log.error(f'[REENGAGE] Error for {phone} ({instance_name}): {e}')
+        return False
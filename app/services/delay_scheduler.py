@@ -0,0 +1,52 @@
+"""Run callables after a delay without holding a thread while waiting.
+
+One daemon timer thread keeps a heap of due times; when a job is due it
+is handed to a bounded worker pool. Used for short timed jobs (typing
+presence, the deferred reply send, the pauses between split message
+chunks), so workers are freed immediately instead of sleeping. Keep slow
+work such as AI calls off this pool.
+"""
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.config import config
+
+log = logging.getLogger('services.delay_scheduler')
+
+_executor = ThreadPoolExecutor(
+    max_workers=config.MAX_WEBHOOK_WORKERS,
+    thread_name_prefix='delayed',
+)
+
+_heap = []  # (due_monotonic, seq, fn, args)
+_seq = itertools.count()
+_cond = threading.Condition()
+_timer = None
+
+
+def schedule(delay, fn, *args):
+    """Run fn(*args) on the worker pool after `delay` seconds."""
+    global _timer
+    with _cond:
+        heapq.heappush(_heap, (time.monotonic() + delay, next(_seq), fn, args))
+        if _timer is None or not _timer.is_alive():
+            _timer = threading.Thread(target=_run, name='delay-timer', daemon=True)
+            _timer.start()
+        _cond.notify()
+
+
+def _run():
+    while True:
+        with _cond:
+            while not _heap or _heap[0][0] > time.monotonic():
+                _cond.wait(_heap[0][0] - time.monotonic() if _heap else None)
+            _, _, fn, args = heapq.heappop(_heap)
+        try:
+            _executor.submit(fn, *args)
+        except Exception as e:
+            log.error(f'[DELAY] Failed to dispatch {getattr(fn, "__name__", fn)}: {e}')
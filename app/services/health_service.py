@@ -6,7 +6,12 @@ health cache to avoid overwhelming the Evolution API.
 """
 
 import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from app.config import config
 from app.db.redis_client import get_redis
@@ -15,25 +20,27 @@ from app.db import queue as queue_db
 log = logging.getLogger('services.health')
 
 HEALTH_CACHE_TTL = 60  # Cache health check result for 60 seconds
+HEALTH_CHECK_WORKERS = 16  # Max concurrent Evolution API checks per sweep
+HEALTH_HASH_KEY = 'health:instances'  # field per instance, value '<1|0>:<checked_at>'
 
+# Shared keep-alive session: health sweeps and alerts reuse pooled connections
+_session = requests.Session()
+_adapter = HTTPAdapter(
+    pool_connections=32, pool_maxsize=64,
+    max_retries=Retry(total=1, backoff_factor=0.1),
+)
+_session.mount('http://', _adapter)
+_session.mount('https://', _adapter)
 
-def check_webhook_health(instance_name):
-    """Check if a WhatsApp instance is connected and responding.
 
-    Uses cached result (60s TTL) to avoid overwhelming Evolution API.
-    Returns True if healthy or check unavailable (graceful degradation).
-    """
-    r = get_redis()
-    if r:
-        cache_key = f'health:{instance_name}'
-        cached = r.get(cache_key)
-        if cached is not None:
-            return cached == '1'
+def _fetch_instance_health(instance_name):
+    """Query Evolution API for an instance's connection state.
 
-    # Query Evolution API for connection state
+    Returns True if connected, or if the check itself fails (don't block).
+    """
     try:
         url = f'{config.EVOLUTION_URL}/instance/connectionState/{instance_name}'
-        resp = requests.get(
+        resp = _session.get(
             url,
             headers={'apikey': config.EVOLUTION_API_KEY},
             timeout=5,
@@ -42,21 +49,89 @@ def check_webhook_health(instance_name):
             data = resp.json()
             # Evolution API returns state: 'open', 'close', 'connecting'
             state = data.get('instance', {}).get('state', '')
-            is_healthy = state == 'open'
-        else:
-            is_healthy = True  # Assume healthy on API error (don't block)
+            return state == 'open'
+        return True  # Assume healthy on API error (don't block)
     except Exception as e:
         log.debug(f'[HEALTH] Check failed for {instance_name}: {e}')
-        is_healthy = True  # Assume healthy on network error
+        return True  # Assume healthy on network error
+
+
+def _parse_cached_health(value, now):
+    """Decode a cached '<1|0>:<checked_at>' field. None if missing or stale."""
+    if not value:
+        return None
+    state, _, checked_at = value.partition(':')
+    try:
+        if now - float(checked_at) >= HEALTH_CACHE_TTL:
+            return None
+    except ValueError:
+        return None
+    return state == '1'
+
+
+def check_instances_health(instance_names):
+    """Check several instances at once. Returns {instance_name: is_healthy}.
 
-    # Cache result
+    Cached results (60s TTL) live in one Redis hash and are read with a
+    single HMGET; cache misses are queried concurrently and written back
+    with one HSET.
+    """
+    instance_names = list(dict.fromkeys(i for i in instance_names if i))
+    if not instance_names:
+        return {}
+
+    results = {}
+    r = get_redis()
     if r:
-        r.set(cache_key, '1' if is_healthy else '0', ex=HEALTH_CACHE_TTL)
+        now = time.time()
+        cached = r.hmget(HEALTH_HASH_KEY, instance_names)
+        for instance, value in zip(instance_names, cached):
+            is_healthy = _parse_cached_health(value, now)
+            if is_healthy is not None:
+                results[instance] = is_healthy
+
+    misses = [i for i in instance_names if i not in results]
+    if misses:
+        workers = min(HEALTH_CHECK_WORKERS, len(misses))
+        with ThreadPoolExecutor(max_workers=workers,
+                                thread_name_prefix='health-check') as pool:
+            fresh = dict(zip(misses, pool.map(_fetch_instance_health, misses)))
+        results.update(fresh)
+
+        # Cache results; the hash itself expires once sweeps stop refreshing it
+        if r:
+            checked_at = int(time.time())
+            with r.pipeline(transaction=False) as p:
+                p.hset(HEALTH_HASH_KEY, mapping={
+                    instance: f'{1 if is_healthy else 0}:{checked_at}'
+                    for instance, is_healthy in fresh.items()
+                })
+                p.expire(HEALTH_HASH_KEY, HEALTH_CACHE_TTL * 2)
+                p.execute()
+
+        for instance, is_healthy in fresh.items():
+            if not is_healthy:
+                log.warning(f'[HEALTH] Instance {instance} is NOT connected')
+
+    return results
+
+
+def check_webhook_health(instance_name, health=None):
+    """Check if a WhatsApp instance is connected and responding.
 
-    if not is_healthy:
-        log.warning(f'[HEALTH] Instance {instance_name} is NOT connected')
+    Uses cached result (60s TTL) to avoid overwhelming Evolution API.
+    Pass ``health`` (a dict from check_instances_health) to reuse results
+    already fetched for a batch. Returns True if healthy or check
+    unavailable (graceful degradation).
+    """
+    if health is not None and instance_name in health:
+        return health[instance_name]
+    return check_instances_health([instance_name]).get(instance_name, True)
 
-    return is_healthy
+
+def failures_key(instance_name):
+    """Redis counter of consecutive send failures (1 hour auto-reset)."""
+    return f'webhook_failures:{instance_name}'
 
 
 def record_failure(instance_name):
@@ -68,10 +143,12 @@ def record_failure(instance_name):
     if not r:
         return 0
 
-    key = f'webhook_failures:{instance_name}'
-    count = r.incr(key)
-    # Expire after 1 hour to auto-reset
-    r.expire(key, 3600)
+    key = failures_key(instance_name)
+    # INCR + EXPIRE (1 hour auto-reset) in a single round-trip
+    with r.pipeline(transaction=False) as p:
+        p.incr(key)
+        p.expire(key, 3600)
+        count, _ = p.execute()
 
     log.warning(f'[HEALTH] Failure #{count} for {instance_name}')
 
@@ -81,11 +158,12 @@ def record_failure(instance_name):
     return count
 
 
-def reset_failures(instance_name):
-    """Reset failure counter after successful send."""
-    r = get_redis()
-    if r:
-        r.delete(f'webhook_failures:{instance_name}')
+def record_send_failure(tenant_id, instance_name):
+    """Record a failed reply send and alert admin once the threshold is hit."""
+    failures = record_failure(instance_name)
+    if failures >= config.WEBHOOK_MAX_FAILURES:
+        alert_admin(tenant_id, instance_name, 'send_failed')
+    return failures
 
 
 def get_failure_count(instance_name):
@@ -93,7 +171,7 @@ def get_failure_count(instance_name):
     r = get_redis()
     if not r:
         return 0
-    count = r.get(f'webhook_failures:{instance_name}')
+    count = r.get(failures_key(instance_name))
     return int(count) if count else 0
 
 
@@ -107,18 +185,17 @@ def alert_admin(tenant_id, instance_name, error_type):
 
     # Save admin alert to queue
     try:
-        import json
         queue_db.enqueue(
             tenant_id=tenant_id,
             whatsapp_account_id='',
             phone='admin',
             content=f'ALERT: {error_type} on instance {instance_name}',
             queue_type='admin_alert',
-            metadata=json.dumps({
+            metadata={
                 'instance': instance_name,
                 'error_type': error_type,
                 'tenant_id': tenant_id,
-            }),
+            },
         )
     except Exception as e:
         log.error(f'[HEALTH] Failed to queue admin alert: {e}')
@@ -126,7 +203,7 @@ def alert_admin(tenant_id, instance_name, error_type):
     # Send to backup webhook if configured
     if config.WEBHOOK_BACKUP_URL:
         try:
-            requests.post(
+            _session.post(
                 config.WEBHOOK_BACKUP_URL,
                 json={
                     'type': 'health_alert',
@@ -151,20 +228,36 @@ def check_all_instances():
         if not accounts:
             return
 
-        unhealthy = 0
-        for acc in accounts:
-            instance = acc.get('instance_name', '')
-            if instance and not check_webhook_health(instance):
-                unhealthy += 1
-                record_failure(instance)
-                if get_failure_count(instance) >= config.WEBHOOK_MAX_FAILURES:
-                    alert_admin(
-                        str(acc.get('tenant_id', '')),
-                        instance,
-                        'instance_disconnected',
-                    )
-
-        if unhealthy:
-            log.warning(f'[HEALTH] {unhealthy} unhealthy instances detected')
+        health = check_instances_health(acc.get('instance_name', '') for acc in accounts)
+        unhealthy = [acc for acc in accounts
+                     if not health.get(acc.get('instance_name', ''), True)]
+        if not unhealthy:
+            return
+
+        # One pipeline for all failure counters (INCR + EXPIRE per instance)
+        counts = {}
+        r = get_redis()
+        if r:
+            instances = list(dict.fromkeys(acc['instance_name'] for acc in unhealthy))
+            with r.pipeline(transaction=False) as p:
+                for instance in instances:
+                    key = failures_key(instance)
+                    p.incr(key)
+                    p.expire(key, 3600)
+                replies = p.execute()
+            counts = dict(zip(instances, replies[::2]))
+
+        for acc in unhealthy:
+            instance = acc['instance_name']
+            count = counts.get(instance, 0)
+            log.warning(f'[HEALTH] Failure #{count} for {instance}')
+            if count >= config.WEBHOOK_MAX_FAILURES:
+                alert_admin(
+                    str(acc.get('tenant_id', '')),
+                    instance,
+                    'instance_disconnected',
+                )
+
+        log.warning(f'[HEALTH] {len(unhealthy)} unhealthy instances detected')
     except Exception as e:
         log.error(f'[HEALTH] Check all instances error: {e}')
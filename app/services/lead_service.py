@@ -2,8 +2,11 @@
 
 import logging
 import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timezone
 from app.db import leads as leads_db
+from app.integrations import airtable_batcher, airtable_client
 from app.ai.prompts import is_real_name
 
 log = logging.getLogger('services.lead')
@@ -13,91 +16,87 @@ _STAGE_MAP = {
     'closing': 'Fechando', 'support': 'Suporte', 'closed': 'Fechado',
     'lost': 'Perdido',
 }
+VALID_STAGES = frozenset({'new', 'qualifying', 'nurturing', 'closing', 'support', 'closed'})
+
+# Credentials are read once at import, so the sync path checks a plain bool
+_AIRTABLE_ENABLED = airtable_client.is_configured()
+
+AIRTABLE_TOUCH_INTERVAL = 60  # Min seconds between 'Ultima Interacao' syncs per phone
+TOUCH_CACHE_MAX = 50000  # Phones remembered for the touch throttle (LRU)
+_last_touch = OrderedDict()  # phone -> (monotonic_ts, name last synced)
+_touch_lock = threading.Lock()
+
+
+def _airtable_now():
+    """UTC timestamp in Airtable's ISO format, e.g. 2024-01-31T12:00:00.123Z."""
+    return datetime.now(timezone.utc).isoformat(timespec='milliseconds')[:-6] + 'Z'
+
+
+def _should_touch(phone, name):
+    """True at most once per AIRTABLE_TOUCH_INTERVAL per phone, or when a new name shows up."""
+    now = time.monotonic()
+    with _touch_lock:
+        prev = _last_touch.get(phone)
+        if prev and now - prev[0] < AIRTABLE_TOUCH_INTERVAL and (not name or name == prev[1]):
+            return False
+        _last_touch[phone] = (now, name or (prev[1] if prev else None))
+        _last_touch.move_to_end(phone)
+        if len(_last_touch) > TOUCH_CACHE_MAX:
+            _last_touch.popitem(last=False)
+        return True
 
 
 def _sync_to_airtable(phone, name, stage='new'):
-    """Sync lead to Airtable in background (non-blocking)."""
-    try:
-        from app.integrations import airtable_client
-        if not airtable_client.is_configured():
-            return
-
-        # Check if lead already exists in Airtable
-        existing = airtable_client.search_records('Leads', 'Telefone', phone, max_records=1)
-        if existing:
-            # Update name/stage if changed
-            rec_id = existing[0].get('id')
-            updates = {}
-            if name and not existing[0].get('Nome'):
-                updates['Nome'] = name
-            updates['Ultima Interacao'] = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.000Z')
-            if updates:
-                airtable_client.update_record('Leads', rec_id, updates)
-            return
-
-        # Create new lead
-        fields = {
-            'Telefone': phone,
-            'Status': _STAGE_MAP.get(stage, 'Novo'),
-            'Origem': 'WhatsApp',
-            'Data Entrada': datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.000Z'),
-            'Ultima Interacao': datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.000Z'),
-        }
-        if name:
-            fields['Nome'] = name
-        airtable_client.create_record('Leads', fields)
-        log.info(f'[AIRTABLE-SYNC] New lead synced: {phone} ({name or "unnamed"})')
-    except Exception as e:
-        log.warning(f'[AIRTABLE-SYNC] Failed for {phone}: {e}')
-
-
-def upsert_lead(tenant_id, phone, push_name='', conversation_id=None,
-                language='pt', company=None):
-    """Create or update a lead with name cleaning + auto Airtable sync."""
-    name = push_name.strip() if push_name and is_real_name(push_name) else None
-    result = leads_db.upsert_lead(
-        tenant_id=tenant_id,
-        phone=phone,
-        name=name,
-        conversation_id=conversation_id,
-        company=company,
+    """Queue a lead sync to Airtable (coalesced and batched in background)."""
+    if not _AIRTABLE_ENABLED or not _should_touch(phone, name):
+        return
+    now = _airtable_now()
+    create = {
+        'Telefone': phone,
+        'Status': _STAGE_MAP.get(stage, 'Novo'),
+        'Origem': 'WhatsApp',
+        'Data Entrada': now,
+    }
+    if name:
+        create['Nome'] = name
+    airtable_batcher.enqueue(
+        phone,
+        update={'Ultima Interacao': now},
+        fill={'Nome': name} if name else None,
+        create=create,
     )
-    # Sync to Airtable in background (never blocks WhatsApp response)
-    threading.Thread(
-        target=_sync_to_airtable,
-        args=(phone, name),
-        daemon=True,
-    ).start()
-    return result
+
+
+def clean_push_name(push_name):
+    """Return the stripped push_name if it looks like a real name, else None."""
+    return push_name.strip() if push_name and is_real_name(push_name) else None
+
+
+def sync_lead(phone, name=None):
+    """Queue the Airtable sync for a lead already upserted in Postgres.
+
+    Used by the message pipeline, which upserts the lead in the same
+    statement as the user message (conversations.record_user_message).
+    """
+    _sync_to_airtable(phone, name)
 
 
 def update_stage(tenant_id, phone, stage):
     """Update lead stage in the funnel + sync to Airtable."""
-    valid_stages = {'new', 'qualifying', 'nurturing', 'closing', 'support', 'closed'}
-    if stage not in valid_stages:
+    if stage not in VALID_STAGES:
         log.warning(f'Invalid stage: {stage}')
         return
     result = leads_db.update_lead_stage(tenant_id, phone, stage)
-    # Sync stage to Airtable
-    threading.Thread(
-        target=_sync_stage_to_airtable,
-        args=(phone, stage),
-        daemon=True,
-    ).start()
+    # Sync stage to Airtable (stage is validated, so it is always mapped)
+    _sync_stage_to_airtable(phone, _STAGE_MAP[stage])
     return result
 
 
-def _sync_stage_to_airtable(phone, stage):
-    """Update lead stage in Airtable."""
-    try:
-        from app.integrations import airtable_client
-        if not airtable_client.is_configured():
-            return
-        existing = airtable_client.search_records('Leads', 'Telefone', phone, max_records=1)
-        if existing:
-            airtable_client.update_record('Leads', existing[0]['id'], {
-                'Status': _STAGE_MAP.get(stage, 'Novo'),
-                'Ultima Interacao': datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.000Z'),
-            })
-    except Exception as e:
-        log.warning(f'[AIRTABLE-SYNC] Stage update failed for {phone}: {e}')
+def _sync_stage_to_airtable(phone, status):
+    """Queue a Status update (Airtable label, e.g. 'Qualificando') for an existing lead."""
+    if not _AIRTABLE_ENABLED:
+        return
+    airtable_batcher.enqueue(phone, update={
+        'Status': status,
+        'Ultima Interacao': _airtable_now(),
+    })
@@ -3,65 +3,123 @@
 Webhook -> parse -> resolve tenant -> resolve LID -> get/create conversation
 -> detect language -> AI supervisor -> send response.
 
+Text replies are held for a short human-like read delay. The AI call
+starts right away and overlaps it, so the send only waits for whatever
+part of the delay the model did not already take. Voice notes skip it:
+transcription and TTS already make the reply feel asynchronous, so an
+extra pause only adds latency.
+
 RULE: No client goes without a response. No new lead is lost.
 """
 
-import json
-import time
+import random
 import logging
-import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 
 from app.config import config
+from app.db.redis_client import get_redis
 from app.db import tenants as tenants_db
 from app.db import conversations as conv_db
-from app.db import leads as leads_db
 from app.db import queue as queue_db
-from app.db import consumption as consumption_db
+from app.db import consumption_buffer
 from app.ai import supervisor
 from app.ai.oliver_core.engine import process_v60
 from app.ai.prompts import detect_language, is_real_name
 from app.channels import whatsapp, lid_resolver, sender, transcriber
 from app.services import lead_service
 from app.services import admin_control
+from app.services import delay_scheduler
+from app.services import health_service
+from app.services import stripe_service
+from app.services import summary_service
 
 log = logging.getLogger('services.handler')
 
+# Whisper runs here so voice-note downloads overlap the tenant/LID lookups
+_transcribe_executor = ThreadPoolExecutor(
+    max_workers=config.MAX_WEBHOOK_WORKERS,
+    thread_name_prefix='transcribe',
+)
+
+# AI replies run here, off the scheduler pool, so a slow model call never
+# holds up the short timed jobs (typing presence, deferred and chunk sends)
+_reply_executor = ThreadPoolExecutor(
+    max_workers=config.MAX_WEBHOOK_WORKERS,
+    thread_name_prefix='reply',
+)
+
 PENDING_MAX_AGE_SECONDS = 600
+_USER_JID_SUFFIX = '@s.whatsapp.net'
+_USER_JID_SUFFIX_LEN = len(_USER_JID_SUFFIX)
+_LID_SUFFIX = '@lid'
+WHISPER_COST_PER_MIN = 0.006  # Whisper transcription price (USD per minute)
+WHISPER_MIN_SECONDS = 5  # Minimum billed estimate for short voice notes
+READ_DELAY_RANGE = (1.5, 3.5)  # Seconds a person takes to read a text before typing
+
+# Used when a tenant has no active agent config; tools_enabled is left to
+# supervisor.DEFAULT_TOOLS. Copied before any per-message change.
+_DEFAULT_AGENT_CONFIG = {
+    'system_prompt': '',
+    'model': 'claude-sonnet-4-20250514',
+    'max_tokens': 150,
+    'max_history_messages': 10,
+    'persona': {},
+}
+
+# TTS speed per detected sentiment, for more natural delivery
+_SENTIMENT_SPEEDS = {
+    'frustrated': 0.88,   # Slower = empathetic, calm, acolhedor
+    'happy': 1.08,        # Slightly faster = energetic but not rushed
+    'confused': 0.92,     # Slower = patient, clear, didatic
+    'urgent': 1.12,       # Faster = direct, efficient, confident
+    'neutral': 1.0,       # Natural baseline
+}
 
 
 # --- Payload parsing ---
 
 def _get_phone(data):
     """Extract phone from Evolution API v2 payload."""
-    remote_jid = data.get('key', {}).get('remoteJid', '')
-    if '@s.whatsapp.net' in remote_jid:
-        return remote_jid.split('@')[0]
-    if '@lid' in remote_jid:
-        participant = data.get('key', {}).get('participant', '')
-        if participant and '@s.whatsapp.net' in participant:
-            return participant.split('@')[0]
+    key = data.get('key') or {}
+    remote_jid = key.get('remoteJid') or ''
+    # Fast path: plain user JID (the vast majority of messages)
+    if remote_jid.endswith(_USER_JID_SUFFIX):
+        return remote_jid[:-_USER_JID_SUFFIX_LEN]
+    if _USER_JID_SUFFIX in remote_jid:
+        return remote_jid.partition('@')[0]
+    participant = key.get('participant') or ''
+    if _LID_SUFFIX in remote_jid:
+        if _USER_JID_SUFFIX in participant:
+            return participant.partition('@')[0]
         return remote_jid
-    participant = data.get('key', {}).get('participant', '')
     if participant:
-        return participant.split('@')[0]
+        return participant.partition('@')[0]
     return None
 
 
-def _extract_content(data, instance_name):
+def _extract_content(data, instance_name, transcription=None):
     """Extract text from payload. If audio, transcribe it.
 
+    `transcription` is the Future from _start_transcription(), if Whisper
+    was already started for this message.
+
     Returns (text, source) where source is 'text', 'audio', 'audio_failed', or 'unsupported'.
     """
     msg = data.get('message', {})
 
     # Text message
-    text = msg.get('conversation') or msg.get('extendedTextMessage', {}).get('text')
+    text = msg.get('conversation') or (msg.get('extendedTextMessage') or {}).get('text')
     if text:
         return text, 'text'
 
     # Audio message
     if msg.get('audioMessage'):
-        transcription = transcriber.transcribe_audio(instance_name, data)
+        if transcription is not None:
+            transcription = transcription.result()
+        else:
+            transcription = transcriber.transcribe_audio(instance_name, data)
         if transcription:
             return transcription, 'audio'
         return None, 'audio_failed'
@@ -69,39 +127,49 @@ def _extract_content(data, instance_name):
     return None, 'unsupported'
 
 
+def _start_transcription(instance_name, data):
+    """Start transcribing a voice note in the background.
+
+    Returns a Future for the transcription, or None if the message is not audio.
+    """
+    msg = data.get('message') or {}
+    if not msg.get('audioMessage') or msg.get('conversation'):
+        return None
+    return _transcribe_executor.submit(transcriber.transcribe_audio, instance_name, data)
+
+
 def _is_forwarded(data):
     """Detect if a message is forwarded from WhatsApp contextInfo.
 
-    Evolution API v2 forwards contextInfo inside each message type.
-    Returns True if isForwarded is set or forwardingScore >= 1.
+    Evolution API v2 forwards contextInfo inside each message type (some
+    versions also at the top level). Returns True if isForwarded is set or
+    forwardingScore >= 1.
     """
-    msg = data.get('message', {})
-
-    # Check all possible message types for contextInfo
-    for key in ('extendedTextMessage', 'conversation', 'audioMessage',
-                'imageMessage', 'videoMessage', 'documentMessage'):
-        sub = msg.get(key)
-        if isinstance(sub, dict):
-            ctx = sub.get('contextInfo', {})
-            if ctx.get('isForwarded') or (ctx.get('forwardingScore', 0) >= 1):
-                return True
-
-    # Top-level contextInfo (some Evolution API versions)
-    ctx_top = msg.get('contextInfo', {})
-    if ctx_top.get('isForwarded') or (ctx_top.get('forwardingScore', 0) >= 1):
+    msg = data.get('message') or {}
+    if _context_forwarded(msg.get('contextInfo')):
         return True
-
+    # One pass over the message types actually present
+    for sub in msg.values():
+        if isinstance(sub, dict) and _context_forwarded(sub.get('contextInfo')):
+            return True
     return False
 
 
-def _is_within_business_hours(account_config):
-    """Check if current time is within business hours."""
-    from datetime import datetime, timezone
-    start = account_config.get('business_hours_start')
-    end = account_config.get('business_hours_end')
-    if not start or not end:
+def _context_forwarded(ctx):
+    return bool(ctx) and bool(ctx.get('isForwarded') or (ctx.get('forwardingScore') or 0) >= 1)
+
+
+def _is_within_business_hours(business_hours, now=None):
+    """Check if current time (UTC) is within business hours.
+
+    business_hours is the account's pre-parsed (start, end) pair; None means
+    always open. Windows with start > end wrap past midnight.
+    """
+    if not business_hours:
         return True
-    now = datetime.now(timezone.utc).time()
+    start, end = business_hours
+    if now is None:
+        now = datetime.now(timezone.utc).time()
     if start <= end:
         return start <= now <= end
     return now >= start or now <= end
@@ -109,24 +177,30 @@ def _is_within_business_hours(account_config):
 
 # --- Main processing ---
 
+_CONTACT_EVENTS = frozenset({'contacts.upsert', 'contacts.update'})
+# Events handle_webhook acts on; the webhook endpoint drops the rest
+# (acks, presence, chat updates) before dispatching to a worker
+HANDLED_EVENTS = _CONTACT_EVENTS | {'messages.upsert'}
+
+
 def handle_webhook(payload):
     """Main entry point for webhook payloads. Runs in thread pool."""
+    instance_name = payload.get('instance', '')
     try:
         event = payload.get('event', '')
 
         # Route contacts events
-        if event in ('contacts.upsert', 'contacts.update'):
+        if event in _CONTACT_EVENTS:
             _handle_contacts_event(payload)
             return
 
         if event != 'messages.upsert':
             return
 
-        instance_name = payload.get('instance', '')
         data = payload.get('data', {})
 
         # Skip outgoing messages (but learn LID mappings from them)
-        if data.get('key', {}).get('fromMe', False):
+        if (data.get('key') or {}).get('fromMe', False):
             # Check for admin slash commands FIRST (retrocompatible)
             if admin_control.is_admin_command(data, instance_name):
                 _handle_admin_command(instance_name, data)
@@ -142,9 +216,7 @@ def handle_webhook(payload):
 
     except Exception as e:
         log.error(f'Webhook handler error: {e}', exc_info=True)
-        admin_control.log_admin_error(
-            payload.get('instance', ''), f'{type(e).__name__}: {str(e)[:200]}'
-        )
+        admin_control.log_admin_error(instance_name, f'{type(e).__name__}: {str(e)[:200]}')
 
 
 def _handle_contacts_event(payload):
@@ -175,7 +247,6 @@ def _handle_sent_message(instance_name, data):
 def _handle_admin_command(instance_name, data):
     """Process an admin command received via WhatsApp."""
     try:
-        from app.db.redis_client import get_redis
         r = get_redis()
         if not r:
             log.warning('[ADMIN] Redis unavailable, cannot process admin command')
@@ -187,7 +258,7 @@ def _handle_admin_command(instance_name, data):
 
         msg = data.get('message', {})
         text = (msg.get('conversation')
-                or msg.get('extendedTextMessage', {}).get('text', ''))
+                or (msg.get('extendedTextMessage') or {}).get('text', ''))
         if not text:
             return
 
@@ -198,7 +269,7 @@ def _handle_admin_command(instance_name, data):
 
         if response:
             # Reply to the chat where the admin typed the command
-            remote_jid = data.get('key', {}).get('remoteJid', '')
+            remote_jid = (data.get('key') or {}).get('remoteJid', '')
             reply_phone = remote_jid.split('@')[0] if '@' in remote_jid else ''
             if reply_phone:
                 whatsapp.send_message(instance_name, reply_phone, response)
@@ -212,7 +283,6 @@ def _handle_admin_natural(instance_name, data):
     Response always goes back to admin's own number (self-chat).
     """
     try:
-        from app.db.redis_client import get_redis
         r = get_redis()
         if not r:
             log.warning('[ADMIN NLP] Redis unavailable')
@@ -224,7 +294,7 @@ def _handle_admin_natural(instance_name, data):
 
         msg = data.get('message', {})
         text = (msg.get('conversation')
-                or msg.get('extendedTextMessage', {}).get('text', ''))
+                or (msg.get('extendedTextMessage') or {}).get('text', ''))
         if not text:
             return
 
@@ -244,75 +314,94 @@ def _handle_admin_natural(instance_name, data):
 
 def _process_incoming(instance_name, data):
     """Process an incoming message through the full pipeline."""
+    phone = _get_phone(data)
+    if not phone:
+        return
+
     # --- DEDUPLICATION: check if message_id already processed ---
-    message_id = data.get('key', {}).get('id', '')
+    message_id = (data.get('key') or {}).get('id', '')
+    chat_flags = None  # per-chat admin flags, fetched once (one HGETALL)
+    globally_paused = None
+    prompt_override = None
     if message_id:
-        from app.db.redis_client import get_redis
         r = get_redis()
         if r:
+            # Dedup claim, global pause, prompt override and chat flags in one round-trip
             dedup_key = f'dedup:{instance_name}:{message_id}'
-            if not r.set(dedup_key, '1', nx=True, ex=config.DEDUP_TTL_SECONDS):
-                log.debug(f'[DEDUP] Duplicate message ignored: {message_id}')
-                return
+            try:
+                with r.pipeline(transaction=False) as p:
+                    p.set(dedup_key, '1', nx=True, ex=config.DEDUP_TTL_SECONDS)
+                    p.get(admin_control.global_pause_key(instance_name))
+                    p.get(admin_control.prompt_override_key(instance_name))
+                    p.hgetall(admin_control.chat_flags_key(instance_name, phone))
+                    replies = p.execute()
+            except Exception as e:
+                log.warning(f'[DEDUP] Redis pipeline failed, proceeding without dedup: {e}')
+                replies = None
+
+            if replies:
+                if not replies[0]:
+                    log.debug(f'[DEDUP] Duplicate message ignored: {message_id}')
+                    return
+                globally_paused = bool(replies[1])
+                prompt_override = replies[2]
 
-            # --- CONTACT BLOCK: skip auto-reply if contact is blocked ---
-            phone_check = _get_phone(data)
-            if phone_check:
-                block_key = f'block:{instance_name}:{phone_check}'
-                if r.get(block_key):
-                    log.info(f'[BLOCK] Contact {phone_check} is blocked, skipping auto-reply')
+                # --- CONTACT BLOCK: skip auto-reply if contact is blocked ---
+                chat_flags = admin_control.parse_chat_flags(replies[3])
+                if admin_control.CHAT_FLAG_BLOCK in chat_flags:
+                    log.info(f'[BLOCK] Contact {phone} is blocked, skipping auto-reply')
                     return
         # If Redis unavailable, proceed without dedup (graceful degradation)
 
     # --- ADMIN: Global pause check ---
-    if admin_control.is_globally_paused(instance_name):
+    if globally_paused is None:
+        globally_paused = admin_control.is_globally_paused(instance_name)
+        prompt_override = admin_control.get_prompt_override(instance_name)
+    if globally_paused:
         log.info(f'[ADMIN] Bot paused globally, skipping: {instance_name}')
         return
 
-    # Extract content (text or transcribed audio)
-    text, source = _extract_content(data, instance_name)
-    if not text:
-        if source == 'audio_failed':
-            log.warning(f'[{instance_name}] Audio transcription failed')
-        return
-
-    phone = _get_phone(data)
-    if not phone:
-        return
-
     # --- ADMIN: Per-chat pause/takeover check ---
-    if admin_control.is_chat_paused(instance_name, phone):
+    if chat_flags is None:
+        chat_flags = admin_control.get_chat_flags(instance_name, phone)
+    if admin_control.CHAT_FLAG_PAUSED in chat_flags:
         log.info(f'[ADMIN] Chat paused for {phone}')
         return
-    if admin_control.is_chat_taken_over(instance_name, phone):
+    if admin_control.CHAT_FLAG_TAKEOVER in chat_flags:
         log.info(f'[ADMIN] Chat in takeover for {phone}')
-        from app.db.redis_client import get_redis as _get_redis_adm
-        _r_adm = _get_redis_adm()
+        _r_adm = get_redis()
         if _r_adm:
-            _r_adm.set(f'admin:last_chat:{instance_name}', phone, ex=3600)
+            try:
+                _r_adm.set(admin_control.last_chat_key(instance_name), phone, ex=3600)
+            except Exception as e:
+                log.warning(f'[{instance_name}] Redis tracking failed: {e}')
         return
 
-    push_name = data.get('pushName', '')
-    detected_language = detect_language(text)
-
-    # --- Resolve tenant ---
+    # --- Resolve tenant (memoized, so checked before paying for Whisper) ---
     account = tenants_db.get_whatsapp_account_by_instance(instance_name)
     if not account:
         log.warning(f'Unknown or inactive instance: {instance_name}')
         return
 
+    # Voice notes: start Whisper now so the download and transcription
+    # overlap the billing and LID lookups below
+    transcription = _start_transcription(instance_name, data)
+    if transcription is None:
+        text, source = _extract_content(data, instance_name)
+        if not text:
+            return
+
+    push_name = data.get('pushName', '')
+
     tenant_id = str(account['tenant_id'])
     account_id = str(account['id'])
 
     # --- Billing check (Stripe) ---
-    from app.services import stripe_service
     if not stripe_service.check_tenant_billing(tenant_id):
         log.warning(f'[BILLING] Tenant {tenant_id} blocked — billing issue')
         return
 
-    account_config = account.get('config', {})
-    if isinstance(account_config, str):
-        account_config = json.loads(account_config) if account_config else {}
+    account_config = account.get('config') or {}
 
     # --- Resolve LID ---
     send_phone = phone
@@ -329,48 +418,52 @@ def _process_incoming(instance_name, data):
 
     db_phone = send_phone if not lid_unresolved else phone
 
-    # --- Get or create conversation ---
-    contact_name = push_name if is_real_name(push_name) else None
-    conversation = conv_db.get_or_create_conversation(
-        tenant_id=tenant_id,
-        whatsapp_account_id=account_id,
-        contact_phone=db_phone,
-        contact_name=contact_name,
-    )
-    conversation_id = str(conversation['id'])
-
-    # --- Persist language (lock on first message — never change after) ---
-    stored_lang = conversation.get('language')
-    if stored_lang:
-        # Language already set: use it (never override, even if client sends
-        # a message in another language — prevents accidental language flips)
-        language = stored_lang
-    else:
-        # First message: detect and lock
-        language = detected_language
-        try:
-            conv_db.update_conversation(conversation_id, tenant_id=tenant_id, language=detected_language)
-        except Exception:
-            pass
+    if transcription is not None:
+        text, source = _extract_content(data, instance_name, transcription)
+        if not text:
+            log.warning(f'[{instance_name}] Audio transcription failed')
+            return
 
     # --- Detect forwarded messages ---
     forwarded = _is_forwarded(data)
     if forwarded:
         log.info(f'[{instance_name}] Forwarded message detected from {db_phone}')
 
-    # --- Save user message ---
     msg_metadata = {'push_name': push_name, 'source': source, 'forwarded': forwarded}
     if source == 'audio':
         audio_meta = transcriber.get_audio_metadata(data)
         msg_metadata.update(audio_meta)
-        # Log Whisper transcription cost ($0.006/min)
+
+    # --- Conversation, user message and lead in one write ---
+    # Name validated once here, reused for the conversation and the lead.
+    contact_name = lead_service.clean_push_name(push_name)
+    conversation = conv_db.record_user_message(
+        tenant_id, account_id, db_phone, text, msg_metadata,
+        contact_name=contact_name,
+    )
+    if not conversation:
+        log.error(f'TENANT MISMATCH: conversation for {db_phone} on {instance_name} '
+                  f'belongs to another tenant than {tenant_id}')
+        return
+    conversation_id = str(conversation['id'])
+
+    # Language locks on first message and never changes after, which
+    # prevents accidental language flips; detection only runs while the
+    # conversation has none stored
+    language = conversation.get('language')
+    if not language:
+        language = detect_language(text)
+        conv_db.update_conversation(conversation_id, tenant_id=tenant_id, language=language)
+        conversation['language'] = language
+
+    # Log Whisper transcription cost
+    if source == 'audio':
         duration_sec = audio_meta.get('duration_seconds', 0)
         if duration_sec <= 0:
-            duration_sec = 5  # Minimum estimate for short voice notes
-        duration_min = duration_sec / 60.0
-        whisper_cost = round(duration_min * 0.006, 6)
+            duration_sec = WHISPER_MIN_SECONDS
+        whisper_cost = round(duration_sec / 60.0 * WHISPER_COST_PER_MIN, 6)
         try:
-            consumption_db.log_usage(
+            consumption_buffer.enqueue(
                 tenant_id=tenant_id, model='whisper-1',
                 input_tokens=0, output_tokens=0, cost=whisper_cost,
                 conversation_id=conversation_id, operation='transcription',
@@ -379,27 +472,17 @@ def _process_incoming(instance_name, data):
             log.info(f'[COST] Whisper: {duration_sec}s = ${whisper_cost}')
         except Exception as e:
             log.error(f'[COST] Failed to log Whisper cost: {e}')
-    conv_db.save_message(conversation_id, 'user', text, msg_metadata)
 
-    # --- Auto-save lead ---
+    # --- Auto-save lead (Airtable side) ---
     try:
-        lead_service.upsert_lead(
-            tenant_id=tenant_id,
-            phone=db_phone,
-            push_name=push_name,
-            conversation_id=conversation_id,
-            language=language,
-        )
+        lead_service.sync_lead(db_phone, contact_name)
         log.info(f'[LEAD] Captured | TenantID:{tenant_id} | Phone:{db_phone} | '
                  f'Name:{push_name} | Source:{source} | Status:OK')
     except Exception as e:
         log.error(f'[LEAD] Failed | TenantID:{tenant_id} | Phone:{db_phone} | Error:{e}')
 
-    # Reset reengagement count on new user message
-    conv_db.reset_reengagement(conversation_id)
-
     # --- Business hours check ---
-    if not _is_within_business_hours(account_config):
+    if not _is_within_business_hours(account.get('business_hours')):
         outside_msg = account_config.get('outside_hours_message')
         if outside_msg:
             if lid_unresolved:
@@ -411,139 +494,121 @@ def _process_incoming(instance_name, data):
         return
 
     # --- Human-like read delay (people read the message before typing) ---
-    import random
-    read_delay = random.uniform(1.5, 3.5)
-    time.sleep(read_delay)
+    # The AI call starts now and the send waits out only what is left of
+    # the delay; dispatched to the reply pool so this webhook worker is
+    # released now
+    reply_at = time.monotonic() + _read_delay(source)
+    _reply_executor.submit(
+        _safe_reply, _reply_to_message,
+        instance_name, account, conversation, text, source, language,
+        forwarded, phone, send_phone, db_phone, lid_unresolved, push_name,
+        prompt_override, reply_at,
+    )
+
+
+def _read_delay(source):
+    """Seconds to wait before replying; none for audio (Whisper is already slow)."""
+    if source == 'audio':
+        return 0
+    return random.uniform(*READ_DELAY_RANGE)
+
+
+def _safe_reply(fn, instance_name, *args):
+    """Entry point for the reply pool and the scheduled send steps."""
+    try:
+        fn(instance_name, *args)
+    except Exception as e:
+        log.error(f'Reply handler error: {e}', exc_info=True)
+        admin_control.log_admin_error(instance_name, f'{type(e).__name__}: {str(e)[:200]}')
+
+
+def _reply_to_message(instance_name, account, conversation, text, source, language,
+                      forwarded, phone, send_phone, db_phone, lid_unresolved, push_name,
+                      prompt_override=None, reply_at=None):
+    """Second half of the pipeline: AI call, then the send.
+
+    prompt_override is the admin's runtime system prompt, read in the
+    incoming gate pipeline. reply_at is the monotonic time the read delay
+    ends; if the AI returns earlier, the send is scheduled for then.
+    """
+    tenant_id = str(account['tenant_id'])
+    account_id = str(account['id'])
+    conversation_id = str(conversation['id'])
 
-    # --- Typing indicator ---
+    # --- Typing indicator (dispatched, overlaps the read delay, context query and AI call) ---
     can_send = not lid_unresolved
     if can_send:
-        whatsapp.set_typing(instance_name, send_phone, True)
+        delay_scheduler.schedule(0, whatsapp.set_typing, instance_name, send_phone, True)
 
-    # --- Get agent config FIRST (needed for history limit) ---
-    agent_config = tenants_db.get_active_agent_config(tenant_id)
+    # --- Agent config, lead and history in one round-trip ---
+    message_ctx = conv_db.get_message_context(conversation_id, tenant_id, db_phone)
+    agent_config = message_ctx['agent_config']
     if not agent_config:
-        agent_config = {
-            'system_prompt': '',
-            'model': 'claude-sonnet-4-20250514',
-            'max_tokens': 150,
-            'max_history_messages': 10,
-            'persona': {},
-            'tools_enabled': '["web_search","schedule_meeting","airtable_read","airtable_create","airtable_update","google_calendar_list","google_calendar_check","send_email"]',
-        }
+        agent_config = _DEFAULT_AGENT_CONFIG
 
     # --- ADMIN: Runtime prompt override ---
-    from app.db.redis_client import get_redis as _get_redis_prompt
-    _r_prompt = _get_redis_prompt()
-    if _r_prompt:
-        _prompt_override = _r_prompt.get(f'admin:prompt_override:{instance_name}')
-        if _prompt_override:
-            agent_config = dict(agent_config)
-            agent_config['system_prompt'] = _prompt_override
+    if prompt_override:
+        agent_config = dict(agent_config)
+        agent_config['system_prompt'] = prompt_override
 
     # --- Load conversation context for AI ---
-    max_history = agent_config.get('max_history_messages', 10)
-    history = conv_db.get_message_history(conversation_id, limit=max_history)
-    lead = leads_db.get_lead(tenant_id, db_phone)
+    history = message_ctx['history']
+    lead = message_ctx['lead']
 
-    conversation_ctx = dict(conversation)
-    conversation_ctx['messages'] = history
-    conversation_ctx['lead'] = lead
-    conversation_ctx['tenant_name'] = account.get('tenant_name', '')
+    # The conversation row is fetched per message, so enrich it in place
+    conversation['messages'] = history
+    conversation['lead'] = lead
+    conversation['tenant_name'] = account.get('tenant_name', '')
 
     # Detect if this is a brand new lead (first interaction)
     is_new_lead = (not lead or lead.get('stage') == 'new') and len(history) <= 2
-    conversation_ctx['is_new_lead'] = is_new_lead
+    conversation['is_new_lead'] = is_new_lead
 
     # Pass forwarded flag so AI knows not to respond as if message was directed at it
     if forwarded:
-        conversation_ctx['is_forwarded'] = True
+        conversation['is_forwarded'] = True
 
     # Per-tenant API key
     api_key = account.get('tenant_anthropic_key')
 
     # --- Resolve tenant settings for v5.1 engine ---
-    tenant_settings = account.get('tenant_settings', {})
-    if isinstance(tenant_settings, str):
-        tenant_settings = json.loads(tenant_settings) if tenant_settings else {}
-
-    # --- Slow response acknowledgment (disabled — clean UX for clients) ---
-    ack_sent = threading.Event()
-    ack_timer = None
+    tenant_settings = account.get('tenant_settings') or {}
 
     # --- Call AI (v6.0 engine wraps v5.1 with state machine + memory + reflection) ---
-    try:
-        result = process_v60(
-            conversation=conversation_ctx,
-            agent_config=agent_config,
-            language=language,
-            api_key=api_key,
-            source=source,
-            tenant_settings=tenant_settings,
-        )
-    finally:
-        if ack_timer:
-            ack_timer.cancel()
-        ack_sent.set()  # Prevent late ack
+    result = process_v60(
+        conversation=conversation,
+        agent_config=agent_config,
+        language=language,
+        api_key=api_key,
+        source=source,
+        tenant_settings=tenant_settings,
+    )
 
     response_text = result['text']
 
-    # Save assistant response (skip fallback responses to avoid polluting history)
-    if not result.get('is_fallback'):
-        conv_db.save_message(conversation_id, 'assistant', response_text, {
+    # Count from the context query, plus the assistant message saved below
+    is_fallback = result.get('is_fallback')
+    message_count = min(message_ctx['message_count'] + (0 if is_fallback else 1),
+                        summary_service.SUMMARY_WINDOW)
+
+    # Save assistant response (skip fallback responses to avoid polluting history).
+    # Kept synchronous so the next message's context query sees this reply,
+    # in order; the summary trigger runs after the save for the same reason.
+    if not is_fallback:
+        _save_reply(conversation_id, tenant_id, response_text, {
             'model': result['model'],
             'input_tokens': result['input_tokens'],
             'output_tokens': result['output_tokens'],
             'cost': result['cost'],
             'tool_calls': result.get('tool_calls', []),
             'source': source,
-        })
+        }, message_count, api_key)
     else:
         log.warning(f'[FALLBACK] Not saving fallback response to history: "{response_text}"')
-
-    # Log consumption (with v5.1 engine metadata)
-    chat_operation = 'engine_v51_cache' if result.get('cache_hit') else 'chat'
-    consumption_db.log_usage(
-        tenant_id=tenant_id,
-        model=result['model'],
-        input_tokens=result['input_tokens'],
-        output_tokens=result['output_tokens'],
-        cost=result['cost'],
-        conversation_id=conversation_id,
-        operation=chat_operation,
-        metadata={
-            'tool_calls': len(result.get('tool_calls', [])),
-            'cache_hit': result.get('cache_hit', False),
-            'engine_version': result.get('engine_version', 'v5.0'),
-            'intent': result.get('intent', ''),
-        },
-    )
-
-    # --- Report usage to Stripe (no-op without Stripe key) ---
-    try:
-        stripe_service.report_usage(tenant_id, quantity=1)
-    except Exception as e:
-        log.error(f'Stripe usage report error: {e}')
-
-    # --- Generate conversation summary (async, non-blocking) ---
-    try:
-        from app.services import summary_service
-        all_messages = conv_db.get_message_history(conversation_id, limit=50)
-        if summary_service.should_generate_summary(conversation_id, len(all_messages)):
-            threading.Thread(
-                target=summary_service.generate_summary,
-                args=(conversation_id, tenant_id, all_messages, api_key),
-                name=f'summary-{conversation_id[:8]}',
-                daemon=True,
-            ).start()
-    except Exception as e:
-        log.error(f'Summary trigger error: {e}')
+        _maybe_summarize(conversation_id, tenant_id, message_count, api_key)
 
     # --- Extract voice persona config (with sensible defaults) ---
-    persona = agent_config.get('persona', {})
-    if isinstance(persona, str):
-        import json as _json
-        persona = _json.loads(persona) if persona else {}
+    persona = agent_config.get('persona') or {}
     voice_config = persona.get('voice')
 
     # If persona has gender but no voice config, create a default
@@ -557,8 +622,6 @@ def _process_incoming(instance_name, data):
         }
         log.info(f'[VOICE] Created default voice config: {voice_config["tts_voice"]} for {gender}')
 
-    sentiment = result.get('sentiment', 'neutral')
-
     # --- Send response ---
     if lid_unresolved:
         queue_db.enqueue(
@@ -567,28 +630,35 @@ def _process_incoming(instance_name, data):
             metadata={'lid_jid': phone, 'push_name': push_name},
         )
         log.info(f'[{instance_name}] Response PENDING for LID {phone}')
+        _record_chat_usage(tenant_id, conversation_id, result)
 
-        # Late resolution attempt
-        time.sleep(2)
-        resolved_late = lid_resolver.resolve(account_id, instance_name, phone)
-        if resolved_late:
-            log.info(f'[{instance_name}] Late LID resolution: {phone} -> {resolved_late}')
-            _deliver_pending_lid_responses(account, instance_name, phone, resolved_late)
+        # Late resolution attempt (scheduled, so this worker is released now)
+        delay_scheduler.schedule(2, _retry_lid_resolution, account, instance_name, phone)
+        return
+
+    # --- Read delay: hold the send only for what the AI call did not cover ---
+    send_args = (instance_name, account, conversation_id, send_phone, text, response_text,
+                 result, source, is_new_lead, voice_config, persona, push_name)
+    remaining = reply_at - time.monotonic() if reply_at else 0
+    if remaining > 0:
+        delay_scheduler.schedule(remaining, _safe_reply, _send_reply, *send_args)
         return
+    _send_reply(*send_args)
+
+
+def _send_reply(instance_name, account, conversation_id, send_phone, text, response_text,
+                result, source, is_new_lead, voice_config, persona, push_name):
+    """Send the AI reply (audio or split text), then record usage and send health."""
+    tenant_id = str(account['tenant_id'])
+    account_id = str(account['id'])
+    sentiment = result.get('sentiment', 'neutral')
 
     # Adjust TTS speed based on detected sentiment for more natural delivery
     if source == 'audio' and voice_config and voice_config.get('enabled'):
-        _sentiment_speeds = {
-            'frustrated': 0.88,   # Slower = empathetic, calm, acolhedor
-            'happy': 1.08,        # Slightly faster = energetic but not rushed
-            'confused': 0.92,     # Slower = patient, clear, didatic
-            'urgent': 1.12,       # Faster = direct, efficient, confident
-            'neutral': 1.0,       # Natural baseline
-        }
         # Only override if no custom speed was set by tenant
         base_speed = voice_config.get('speed', 1.0)
         if base_speed == 1.0:
-            voice_config['speed'] = _sentiment_speeds.get(sentiment, 1.0)
+            voice_config['speed'] = _SENTIMENT_SPEEDS.get(sentiment, 1.0)
 
     # Send response — audio for: incoming audio OR new leads (first contact)
     # New leads get audio greeting to create personal connection
@@ -610,20 +680,16 @@ def _process_incoming(instance_name, data):
         )
         reply_type = 'audio' if source == 'audio' else 'audio_new_lead'
         # Log TTS cost — provider-aware (ElevenLabs vs OpenAI)
-        from app.channels.transcriber import (
-            TTS_MODEL, TTS_COST_PER_1K_CHARS,
-            ELEVENLABS_MODEL, ELEVENLABS_COST_PER_1K_CHARS,
-        )
         tts_chars = len(response_text)
         tts_provider = sent.get('provider', 'openai') if isinstance(sent, dict) else 'openai'
         if tts_provider == 'elevenlabs':
-            tts_model = ELEVENLABS_MODEL
-            tts_cost = round((tts_chars / 1000.0) * ELEVENLABS_COST_PER_1K_CHARS, 6)
+            tts_model = transcriber.ELEVENLABS_MODEL
+            tts_cost = round((tts_chars / 1000.0) * transcriber.ELEVENLABS_COST_PER_1K_CHARS, 6)
         else:
-            tts_model = TTS_MODEL
-            tts_cost = round((tts_chars / 1000.0) * TTS_COST_PER_1K_CHARS, 6)
+            tts_model = transcriber.TTS_MODEL
+            tts_cost = round((tts_chars / 1000.0) * transcriber.TTS_COST_PER_1K_CHARS, 6)
         try:
-            consumption_db.log_usage(
+            consumption_buffer.enqueue(
                 tenant_id=tenant_id, model=tts_model,
                 input_tokens=tts_chars, output_tokens=0, cost=tts_cost,
                 conversation_id=conversation_id, operation='tts',
@@ -645,75 +711,129 @@ def _process_incoming(instance_name, data):
             metadata={'push_name': push_name},
         )
 
-    # --- Track for admin /reply and /correct ---
-    from app.db.redis_client import get_redis as _get_redis_track
-    _r_track = _get_redis_track()
+    # Usage bookkeeping after the send, so a full buffer's synchronous
+    # fallback write never delays the reply
+    _record_chat_usage(tenant_id, conversation_id, result)
+
+    # --- Track for admin /reply and /correct, and reset send health, in one round-trip ---
+    _r_track = get_redis()
     if _r_track:
-        _r_track.set(f'admin:last_chat:{instance_name}', send_phone, ex=3600)
-        _r_track.set(f'admin:last_bot_msg:{instance_name}:{send_phone}',
-                     response_text[:2000], ex=3600)
+        try:
+            with _r_track.pipeline(transaction=False) as p:
+                p.set(admin_control.last_chat_key(instance_name), send_phone, ex=3600)
+                if sent:
+                    p.delete(health_service.failures_key(instance_name))
+                p.execute()
+        except Exception as e:
+            log.warning(f'[{instance_name}] Redis tracking failed: {e}')
 
     # --- Track send health ---
-    from app.services import health_service
     if sent:
-        health_service.reset_failures(instance_name)
         log.info(f'[{instance_name}] {send_phone}: "{text[:40]}" -> [{reply_type}] "{response_text[:40]}"')
     else:
-        failures = health_service.record_failure(instance_name)
-        if failures >= config.WEBHOOK_MAX_FAILURES:
-            health_service.alert_admin(tenant_id, instance_name, 'send_failed')
+        health_service.record_send_failure(tenant_id, instance_name)
         log.warning(f'[{instance_name}] Send failed, queued for retry: {send_phone}')
 
 
+def _record_chat_usage(tenant_id, conversation_id, result):
+    """Log the AI call's consumption (with v5.1 engine metadata) and report usage to Stripe."""
+    chat_operation = 'engine_v51_cache' if result.get('cache_hit') else 'chat'
+    consumption_buffer.enqueue(
+        tenant_id=tenant_id,
+        model=result['model'],
+        input_tokens=result['input_tokens'],
+        output_tokens=result['output_tokens'],
+        cost=result['cost'],
+        conversation_id=conversation_id,
+        operation=chat_operation,
+        metadata={
+            'tool_calls': len(result.get('tool_calls', [])),
+            'cache_hit': result.get('cache_hit', False),
+            'engine_version': result.get('engine_version', 'v5.0'),
+            'intent': result.get('intent', ''),
+        },
+    )
+    # No-op without Stripe key; buffered and sent in batches
+    stripe_service.record_usage(tenant_id)
+
+
+def _save_reply(conversation_id, tenant_id, response_text, metadata, message_count, api_key):
+    """Persist the assistant reply, then trigger the summary."""
+    try:
+        conv_db.save_message(conversation_id, 'assistant', response_text, metadata)
+    except Exception as e:
+        log.error(f'Failed to save assistant reply for {conversation_id}: {e}')
+        return
+    _maybe_summarize(conversation_id, tenant_id, message_count, api_key)
+
+
+def _maybe_summarize(conversation_id, tenant_id, message_count, api_key):
+    """Queue a conversation summary (async, non-blocking) every SUMMARY_INTERVAL messages."""
+    try:
+        if message_count >= summary_service.SUMMARY_INTERVAL:
+            summary_service.submit(conversation_id, tenant_id, message_count, api_key)
+    except Exception as e:
+        log.error(f'Summary trigger error: {e}')
+
+
+def _retry_lid_resolution(account, instance_name, lid_jid):
+    """Try once more to resolve a LID and deliver its pending responses."""
+    try:
+        resolved_late = lid_resolver.resolve(str(account['id']), instance_name, lid_jid)
+        if resolved_late:
+            log.info(f'[{instance_name}] Late LID resolution: {lid_jid} -> {resolved_late}')
+            _deliver_pending_lid_responses(account, instance_name, lid_jid, resolved_late)
+    except Exception as e:
+        log.error(f'[{instance_name}] Late LID resolution error: {e}')
+
+
 def _deliver_pending_lid_responses(account, instance_name, lid_jid, phone):
     """Deliver pending LID responses now that LID is resolved."""
     try:
         tenant_id = str(account['tenant_id'])
-        pending = queue_db.get_pending(queue_type='pending_lid', tenant_id=tenant_id)
-        matched = [p for p in pending if p.get('metadata', {}).get('lid_jid') == lid_jid]
+        matched = queue_db.get_pending_by_lid(tenant_id, lid_jid)
         if not matched:
             return
 
-        oldest_created = matched[0].get('created_at')
-        push_name = matched[0].get('metadata', {}).get('push_name', '')
+        first = matched[0]
+        first_meta = first.get('metadata') or {}
+        oldest_created = first.get('created_at')
+        push_name = first_meta.get('push_name') or ''
         nome = push_name.split()[0] if push_name and is_real_name(push_name) else ''
 
         # Check age
-        import datetime
-        now = datetime.datetime.now(datetime.timezone.utc)
+        now = datetime.now(timezone.utc)
         if oldest_created and hasattr(oldest_created, 'timestamp'):
             age_seconds = (now - oldest_created).total_seconds()
         else:
             age_seconds = 0
 
+        # Claim first so a concurrent resolution of the same LID can't resend
+        queue_db.mark_delivered_many([m['id'] for m in matched], tenant_id)
+
+        # Typing pauses are scheduled, not slept, so this thread returns now
         if age_seconds > PENDING_MAX_AGE_SECONDS:
             # Old messages: send resumption message
             if nome:
                 msg = f'Oi {nome}! Tive um atraso tecnico aqui, desculpa. Ja estou de volta, como posso te ajudar?'
             else:
                 msg = 'Oi! Desculpa a demora, tive um problema tecnico. Ja to de volta, no que posso ajudar?'
-            whatsapp.set_typing(instance_name, phone, True)
-            time.sleep(2.5)
-            whatsapp.send_message(instance_name, phone, msg)
+            steps = [(2.5, whatsapp.send_message, msg)]
         elif len(matched) == 1:
-            whatsapp.set_typing(instance_name, phone, True)
-            time.sleep(2.0)
-            whatsapp.send_message(instance_name, phone, matched[0]['content'])
+            steps = [(2.0, whatsapp.send_message, matched[0]['content'])]
         else:
             # Multiple pending: send explanation + last response
-            whatsapp.set_typing(instance_name, phone, True)
-            time.sleep(2.0)
             explanation = f'{nome}, desculpa o atraso tecnico! Ja normalizou.' if nome else 'Desculpa o atraso tecnico! Ja normalizou.'
-            whatsapp.send_message(instance_name, phone, explanation)
-            time.sleep(1.5)
-            whatsapp.set_typing(instance_name, phone, True)
-            time.sleep(2.0)
-            whatsapp.send_message(instance_name, phone, matched[-1]['content'])
-
-        # Mark all as delivered (tenant-scoped)
-        for m in matched:
-            queue_db.mark_delivered(m['id'], tenant_id=tenant_id)
-        log.info(f'Delivered {len(matched)} pending LID responses to {phone}')
+            steps = [
+                (2.0, whatsapp.send_message, explanation),
+                (3.5, whatsapp.set_typing, True),
+                (5.5, whatsapp.send_message, matched[-1]['content']),
+            ]
+
+        whatsapp.set_typing(instance_name, phone, True)
+        for delay, fn, arg in steps:
+            delay_scheduler.schedule(delay, fn, instance_name, phone, arg)
+        log.info(f'Scheduled {len(matched)} pending LID responses to {phone}')
 
     except Exception as e:
         log.error(f'Error delivering pending LID responses: {e}')
@@ -5,17 +5,40 @@ This allows deployment without Stripe integration.
 
 Flow:
 1. Tenant creation -> create_customer() + create_subscription()
-2. Each AI response -> report_usage() (metered billing)
+2. Each AI response -> record_usage() (buffered, reported in per-tenant
+   batches every USAGE_FLUSH_INTERVAL by report_usage())
 3. Before processing -> check_tenant_billing() (suspend if past_due)
 """
 
+import atexit
 import logging
+import threading
+import time
+from collections import defaultdict
+
+import requests
+from requests.adapters import HTTPAdapter
+
 from app.config import config
 from app.db import query, execute
 
 log = logging.getLogger('services.stripe')
 
+USAGE_FLUSH_INTERVAL = 10  # Seconds between batched usage reports
+USAGE_FLUSH_THRESHOLD = 100  # Units buffered for one tenant that trigger an early flush
+STRIPE_TIMEOUT = (2, 20)  # (connect, read) seconds per Stripe API call
+STRIPE_MAX_RETRIES = 2  # Network retries per call (POSTs carry an idempotency key)
+SUBSCRIPTION_ITEM_TTL = 600  # Seconds to reuse a tenant's metered subscription item id
+BILLING_STATUS_TTL = 60  # Seconds to reuse a tenant's billing_status lookup
+
 _stripe = None
+_pending_usage = defaultdict(int)  # tenant_id -> units not yet reported
+_usage_lock = threading.Lock()
+_flush_now = threading.Event()
+_usage_worker = None
+_usage_worker_lock = threading.Lock()
+_subscription_items = {}  # tenant_id -> (monotonic_ts, subscription item id or None)
+_billing_status_cache = {}  # tenant_id -> (monotonic_ts, tenants row or None)
 
 
 def _get_stripe():
@@ -27,6 +50,16 @@ def _get_stripe():
         try:
             import stripe
             stripe.api_key = config.STRIPE_API_KEY
+            # One keep-alive session shared by all threads (the default client
+            # keeps one per thread) and a bounded wait instead of 80s
+            session = requests.Session()
+            session.mount('https://', HTTPAdapter(pool_maxsize=4))
+            stripe.default_http_client = stripe.RequestsClient(
+                timeout=STRIPE_TIMEOUT, session=session)
+            # A usage record now carries a whole flush interval of units, so
+            # retry network errors rather than lose the batch; the library
+            # reuses one idempotency key across retries, so none double-count
+            stripe.max_network_retries = STRIPE_MAX_RETRIES
             _stripe = stripe
         except ImportError:
             log.warning('stripe package not installed')
@@ -82,6 +115,7 @@ def create_subscription(tenant_id):
             "UPDATE tenants SET stripe_subscription_id = %s WHERE id = %s",
             (subscription.id, str(tenant_id)),
         )
+        _subscription_items.pop(str(tenant_id), None)
         log.info(f'Stripe subscription created: {subscription.id}')
         return subscription.id
     except Exception as e:
@@ -92,49 +126,135 @@ def create_subscription(tenant_id):
 def report_usage(tenant_id, quantity=1):
     """Report metered usage to Stripe. No-op without Stripe key.
 
-    Called after each AI response. Quantity = 1 message unit.
+    Quantity = number of message units (batched by flush_usage()).
+    Returns False if the report failed and should be retried.
     """
     stripe = _get_stripe()
     if not stripe:
-        return
+        return True
+
+    tenant_id = str(tenant_id)
+    try:
+        item_id = _get_subscription_item(stripe, tenant_id)
+        if item_id:
+            stripe.SubscriptionItem.create_usage_record(
+                item_id,
+                quantity=quantity,
+                action='increment',
+            )
+        return True
+    except Exception as e:
+        # The subscription may have changed; look it up again next time
+        _subscription_items.pop(tenant_id, None)
+        log.error(f'Stripe report_usage error: {e}')
+        return False
+
+
+def _get_subscription_item(stripe, tenant_id):
+    """Return the tenant's metered subscription item id (None if unsubscribed).
+
+    Memoized for SUBSCRIPTION_ITEM_TTL, so a usage flush costs one Stripe
+    call instead of a tenants query plus two Stripe calls.
+    """
+    cached = _subscription_items.get(tenant_id)
+    if cached and time.monotonic() - cached[0] < SUBSCRIPTION_ITEM_TTL:
+        return cached[1]
 
     tenant = query(
         "SELECT stripe_subscription_id FROM tenants WHERE id = %s",
-        (str(tenant_id),),
+        (tenant_id,),
         fetch='one',
     )
-    if not tenant or not tenant.get('stripe_subscription_id'):
-        return
-
-    try:
+    item_id = None
+    if tenant and tenant.get('stripe_subscription_id'):
         subscription = stripe.Subscription.retrieve(
             tenant['stripe_subscription_id']
         )
         items = subscription.get('items', {}).get('data', [])
         if items:
-            stripe.SubscriptionItem.create_usage_record(
-                items[0]['id'],
-                quantity=quantity,
-                action='increment',
-            )
-    except Exception as e:
-        log.error(f'Stripe report_usage error: {e}')
+            item_id = items[0]['id']
+    _subscription_items[tenant_id] = (time.monotonic(), item_id)
+    return item_id
+
+
+def record_usage(tenant_id, quantity=1):
+    """Buffer metered usage; a daemon thread reports it per tenant in batches.
+
+    Called after each AI response. No-op without Stripe key.
+    """
+    if not config.STRIPE_API_KEY:
+        return
+    tenant_id = str(tenant_id)
+    with _usage_lock:
+        _pending_usage[tenant_id] += quantity
+        due = _pending_usage[tenant_id] >= USAGE_FLUSH_THRESHOLD
+    _ensure_usage_worker()
+    if due:
+        _flush_now.set()
+
+
+def _ensure_usage_worker():
+    global _usage_worker
+    if _usage_worker is not None and _usage_worker.is_alive():
+        return
+    with _usage_worker_lock:
+        if _usage_worker is None or not _usage_worker.is_alive():
+            _usage_worker = threading.Thread(target=_run_usage_flush,
+                                             name='stripe-usage', daemon=True)
+            _usage_worker.start()
+
+
+def _run_usage_flush():
+    while True:
+        _flush_now.wait(USAGE_FLUSH_INTERVAL)
+        _flush_now.clear()
+        flush_usage()
+
+
+def flush_usage():
+    """Report all buffered usage now, one usage record per tenant.
+
+    Units whose report fails go back into the buffer for the next flush.
+    """
+    global _pending_usage
+    with _usage_lock:
+        pending, _pending_usage = _pending_usage, defaultdict(int)
+    for tenant_id, quantity in pending.items():
+        try:
+            reported = report_usage(tenant_id, quantity=quantity)
+        except Exception as e:
+            log.error(f'Stripe usage flush error for {tenant_id} ({quantity} units): {e}')
+            reported = False
+        if not reported:
+            with _usage_lock:
+                _pending_usage[tenant_id] += quantity
+
+
+atexit.register(flush_usage)
 
 
 def check_tenant_billing(tenant_id):
     """Check if tenant is in good billing standing.
 
     Returns True if OK to process, False if should be blocked.
-    No-op (returns True) without Stripe key.
+    No-op (returns True) without Stripe key. The status is memoized for
+    BILLING_STATUS_TTL, so status changes made by another process take
+    effect within that window.
     """
     if not config.STRIPE_API_KEY:
         return True
 
-    tenant = query(
-        "SELECT billing_status FROM tenants WHERE id = %s",
-        (str(tenant_id),),
-        fetch='one',
-    )
+    tenant_id = str(tenant_id)
+    cached = _billing_status_cache.get(tenant_id)
+    if cached and time.monotonic() - cached[0] < BILLING_STATUS_TTL:
+        tenant = cached[1]
+    else:
+        tenant = query(
+            "SELECT billing_status FROM tenants WHERE id = %s",
+            (tenant_id,),
+            fetch='one',
+        )
+        _billing_status_cache[tenant_id] = (time.monotonic(), tenant)
     if not tenant:
         return False
 
@@ -156,4 +276,10 @@ def suspend_tenant(tenant_id):
         "UPDATE tenants SET billing_status = 'suspended', status = 'suspended' WHERE id = %s",
         (str(tenant_id),),
     )
+    invalidate_billing_status(tenant_id)
     log.warning(f'Tenant {tenant_id} suspended for billing')
+
+
+def invalidate_billing_status(tenant_id):
+    """Drop the memoized billing status of a tenant (after a billing_status write)."""
+    _billing_status_cache.pop(str(tenant_id), None)
@@ -2,20 +2,41 @@
 
 After every 3 user-assistant exchanges (6 messages), generates a structured
 summary using a lightweight Claude call and stores it in conversation_summaries.
-Runs in background threads to never block user responses.
+Runs on a small pool of background workers to never block user responses.
 """
 
 import json
 import logging
+import queue
+import re
+import threading
+from collections import OrderedDict
 
+from app.db import json_dumps, json_loads
 from app.db import summaries as summaries_db
-from app.db import consumption as consumption_db
+from app.db import conversations as conv_db
+from app.db import consumption_buffer
 from app.ai.client import call_api, estimate_cost
+from app.config import config
 
 log = logging.getLogger('services.summary')
 
 SUMMARY_INTERVAL = 6  # messages (3 exchanges = 6 messages: 3 user + 3 assistant)
 SUMMARY_MODEL = 'claude-3-haiku-20240307'
+SUMMARY_WINDOW = 50  # Latest messages summarized (message counts are capped here too)
+SUMMARY_WORKERS = max(1, config.SUMMARY_WORKERS)  # Concurrent summary jobs
+SUMMARY_QUEUE_MAX = 256  # Pending jobs; beyond this new ones are dropped
+LAST_COUNT_CACHE_MAX = 10000  # Conversations whose last summarized count is remembered
+
+_FENCED_JSON = re.compile(r'^```[a-zA-Z]*\s*(.*?)\s*(?:```)?$', re.S)  # Fenced reply; closing fence optional
+
+_queue = queue.Queue(maxsize=SUMMARY_QUEUE_MAX)
+_in_flight = set()  # conversation_ids queued or being summarized
+_in_flight_lock = threading.Lock()
+_last_counts = OrderedDict()  # conversation_id -> message count at its last summary (LRU)
+_last_counts_lock = threading.Lock()
+_workers = []
+_workers_lock = threading.Lock()
 
 SUMMARY_PROMPT = (
     'Analise a conversa abaixo e extraia um resumo estruturado em JSON:\n'
@@ -38,16 +59,93 @@ def should_generate_summary(conversation_id, current_message_count):
     """Check if we should generate a new summary based on message count."""
     if current_message_count < SUMMARY_INTERVAL:
         return False
+    return (current_message_count - _last_summary_count(conversation_id)) >= SUMMARY_INTERVAL
+
 
+def _last_summary_count(conversation_id):
+    """Message count at the conversation's last summary; the DB is read once per conversation."""
+    conversation_id = str(conversation_id)
+    with _last_counts_lock:
+        count = _last_counts.get(conversation_id)
+        if count is not None:
+            _last_counts.move_to_end(conversation_id)
+            return count
     last = summaries_db.get_last_summary(conversation_id)
-    last_count = last['message_count_at_summary'] if last else 0
-    return (current_message_count - last_count) >= SUMMARY_INTERVAL
+    count = last['message_count_at_summary'] if last else 0
+    _remember_count(conversation_id, count)
+    return count
+
+
+def _remember_count(conversation_id, count):
+    with _last_counts_lock:
+        _last_counts[str(conversation_id)] = count
+        _last_counts.move_to_end(str(conversation_id))
+        if len(_last_counts) > LAST_COUNT_CACHE_MAX:
+            _last_counts.popitem(last=False)
+
+
+def submit(conversation_id, tenant_id, message_count, api_key=None):
+    """Queue maybe_generate_summary() for the worker pool. Returns False if dropped.
+
+    A conversation already queued or being summarized is skipped; the
+    running job reads the latest history anyway.
+    """
+    _ensure_workers()
+    with _in_flight_lock:
+        if conversation_id in _in_flight:
+            return False
+        _in_flight.add(conversation_id)
+    try:
+        _queue.put_nowait((conversation_id, tenant_id, message_count, api_key))
+        return True
+    except queue.Full:
+        _release(conversation_id)
+        log.warning(f'[SUMMARY] Queue full, skipping summary for {conversation_id}')
+        return False
+
+
+def _release(conversation_id):
+    with _in_flight_lock:
+        _in_flight.discard(conversation_id)
+
+
+def _ensure_workers():
+    if len(_workers) == SUMMARY_WORKERS and all(t.is_alive() for t in _workers):
+        return
+    with _workers_lock:
+        _workers[:] = [t for t in _workers if t.is_alive()]
+        while len(_workers) < SUMMARY_WORKERS:
+            t = threading.Thread(target=_run, name=f'summary-{len(_workers)}', daemon=True)
+            t.start()
+            _workers.append(t)
+
+
+def _run():
+    while True:
+        job = _queue.get()
+        try:
+            maybe_generate_summary(*job)
+        except Exception as e:
+            log.error(f'[SUMMARY] Job failed for {job[0]}: {e}')
+        finally:
+            _release(job[0])
+
+
+def maybe_generate_summary(conversation_id, tenant_id, message_count, api_key=None):
+    """Background entry point: check the interval, then load history and summarize.
+
+    Keeps the summary lookup and the history fetch off the reply path.
+    """
+    if not should_generate_summary(conversation_id, message_count):
+        return None
+    messages = conv_db.get_message_history(conversation_id, limit=SUMMARY_WINDOW)
+    return generate_summary(conversation_id, tenant_id, messages, api_key)
 
 
 def generate_summary(conversation_id, tenant_id, messages, api_key=None):
     """Generate and store a conversation summary.
 
-    This is designed to run in a background thread.
+    Runs on the summary worker pool (see submit()).
     Uses Claude Haiku for minimal cost (~$0.0004 per call).
     """
     if not messages or len(messages) < SUMMARY_INTERVAL:
@@ -81,12 +179,13 @@ def generate_summary(conversation_id, tenant_id, messages, api_key=None):
             if block.get('type') == 'text':
                 text += block.get('text', '')
 
-        # Parse JSON (strip markdown code fences if present)
+        # Parse JSON (strip markdown code fences if present, even unclosed)
         clean = text.strip()
-        if clean.startswith('```'):
-            clean = clean.split('\n', 1)[-1].rsplit('```', 1)[0].strip()
+        fenced = _FENCED_JSON.match(clean)
+        if fenced:
+            clean = fenced.group(1)
 
-        summary_json = json.loads(clean)
+        summary_json = json_loads(clean)
 
         # Save to database
         summaries_db.save_summary(
@@ -95,6 +194,7 @@ def generate_summary(conversation_id, tenant_id, messages, api_key=None):
             summary_json=summary_json,
             message_count=len(messages),
         )
+        _remember_count(conversation_id, len(messages))
 
         # Log consumption
         usage = data.get('usage', {})
@@ -102,7 +202,7 @@ def generate_summary(conversation_id, tenant_id, messages, api_key=None):
         output_t = usage.get('output_tokens', 0)
         cost = estimate_cost(SUMMARY_MODEL, input_t, output_t)
         try:
-            consumption_db.log_usage(
+            consumption_buffer.enqueue(
                 tenant_id=tenant_id,
                 model=SUMMARY_MODEL,
                 input_tokens=input_t,
@@ -116,7 +216,7 @@ def generate_summary(conversation_id, tenant_id, messages, api_key=None):
             log.error(f'[SUMMARY] Cost logging error: {e}')
 
         log.info(f'[SUMMARY] Generated for {conversation_id}: '
-                 f'{json.dumps(summary_json, ensure_ascii=False)[:100]}')
+                 f'{json_dumps(summary_json)[:100]}')
         return summary_json
 
     except json.JSONDecodeError:
@@ -0,0 +1,35 @@
+"""Background worker: cross-process cache invalidation.
+
+Each gunicorn worker memoizes instance -> account lookups in-process
+(tenants.ACCOUNT_CACHE_TTL). Tenant and account edits in the admin panel
+(admin/db.py) publish on ACCOUNT_INVALIDATE_CHANNEL; this listener clears
+the local copy so changes apply immediately instead of after the TTL. Without Redis the TTL alone bounds staleness.
+"""
+
+import time
+import logging
+
+from app.db import tenants as tenants_db
+from app.db.redis_client import get_redis
+
+log = logging.getLogger('workers.cache')
+
+RECONNECT_DELAY = 5  # Seconds before resubscribing after a Redis error
+
+
+def run():
+    """Main loop — runs forever as daemon thread."""
+    while True:
+        r = get_redis()
+        if not r:
+            return
+        try:
+            pubsub = r.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(tenants_db.ACCOUNT_INVALIDATE_CHANNEL)
+            # Anything published while we were disconnected was missed
+            tenants_db.invalidate_account_cache(broadcast=False)
+            for _ in pubsub.listen():
+                tenants_db.invalidate_account_cache(broadcast=False)
+        except Exception as e:
+            log.warning(f'Cache invalidation listener error: {e}')
+        time.sleep(RECONNECT_DELAY)
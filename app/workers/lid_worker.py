@@ -1,13 +1,12 @@
 """Background worker: resolve pending LID JIDs.
 
-Runs every 30 seconds. Picks up unresolved LIDs from message_queue
-and attempts to resolve them using the 7-strategy resolver.
+Fed by queue_worker every poll cycle with the due 'pending_lid' entries
+of message_queue; attempts to resolve them using the 7-strategy resolver.
 """
 
-import time
 import logging
 
-from app.config import config
+from app.db import json_loads
 from app.db import tenants as tenants_db
 from app.db import queue as queue_db
 from app.channels import lid_resolver
@@ -16,30 +15,16 @@ from app.services.message_handler import _deliver_pending_lid_responses
 log = logging.getLogger('workers.lid')
 
 
-def run():
-    """Main loop — runs forever as daemon thread."""
-    while True:
-        try:
-            time.sleep(config.LID_RESOLVE_INTERVAL_SECONDS)
-            _resolve_pending()
-        except Exception as e:
-            log.error(f'LID worker error: {e}', exc_info=True)
-
-
-def _resolve_pending():
-    pending = queue_db.get_pending(queue_type='pending_lid', limit=50)
-    if not pending:
-        return
-
-    # Expire entries older than 24 hours
-    queue_db.expire_old(max_age_hours=24)
-
+def resolve_pending(pending):
+    """Try to resolve the LIDs of due pending_lid entries and deliver their replies."""
+    # Pending items cluster by LID (one per unanswered message): resolve
+    # each (account, LID) once per sweep; delivery then covers all its items
+    resolved = {}  # (account_id, lid_jid) -> phone or None
     for entry in pending:
         entry_id = entry.get('id')
-        metadata = entry.get('metadata', {})
+        metadata = entry.get('metadata') or {}
         if isinstance(metadata, str):
-            import json
-            metadata = json.loads(metadata) if metadata else {}
+            metadata = json_loads(metadata)
 
         lid_jid = metadata.get('lid_jid', '')
         if not lid_jid:
@@ -51,7 +36,13 @@ def _resolve_pending():
         instance_name = entry.get('instance_name', '')
         account_id = str(entry.get('whatsapp_account_id', ''))
 
-        phone = lid_resolver.resolve(account_id, instance_name, lid_jid)
+        key = (account_id, lid_jid)
+        if key in resolved:
+            if resolved[key] is None:
+                queue_db.increment_attempt(entry_id, error='unresolved after 7 strategies')
+            continue
+
+        phone = resolved[key] = lid_resolver.resolve(account_id, instance_name, lid_jid)
         if phone:
             log.info(f'[LID-WORKER] Resolved {lid_jid} -> {phone}')
             account = tenants_db.get_whatsapp_account(account_id)
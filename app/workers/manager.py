@@ -15,16 +15,16 @@ def start_all_workers():
         return
     _started = True
 
-    from app.workers.retry_worker import run as run_retry
+    from app.workers.queue_worker import run as run_queue
     from app.workers.reengagement_worker import run as run_reengage
-    from app.workers.lid_worker import run as run_lid
     from app.workers.health_worker import run as run_health
+    from app.workers.cache_worker import run as run_cache
 
     workers = [
-        ('retry-worker', run_retry),
+        ('queue-worker', run_queue),
         ('reengagement-worker', run_reengage),
-        ('lid-worker', run_lid),
         ('health-monitor', run_health),
+        ('cache-invalidation', run_cache),
     ]
 
     for name, target in workers:
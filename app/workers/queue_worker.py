@@ -0,0 +1,50 @@
+"""Background worker: poll message_queue for failed sends and pending LIDs.
+
+Runs every 30 seconds. One query fetches the due 'failed' and
+'pending_lid' entries (up to QUEUE_POLL_LIMIT of each); they are handed
+to retry_worker and lid_worker, and entries older than 24 hours are
+expired once per cycle.
+"""
+
+import time
+import logging
+
+from app.config import config
+from app.db import queue as queue_db
+from app.workers import lid_worker, retry_worker
+
+log = logging.getLogger('workers.queue')
+
+QUEUE_POLL_LIMIT = 50  # Due entries fetched per queue type per cycle
+
+_HANDLERS = {
+    'failed': retry_worker.process_retries,
+    'pending_lid': lid_worker.resolve_pending,
+}
+
+
+def run():
+    """Main loop — runs forever as daemon thread."""
+    interval = min(config.RETRY_INTERVAL_SECONDS, config.LID_RESOLVE_INTERVAL_SECONDS)
+    while True:
+        try:
+            time.sleep(interval)
+            poll_once()
+        except Exception as e:
+            log.error(f'Queue worker error: {e}', exc_info=True)
+
+
+def poll_once():
+    pending = queue_db.get_pending_multi(tuple(_HANDLERS), limit=QUEUE_POLL_LIMIT)
+    if not any(pending.values()):
+        return
+
+    # Expire entries older than 24 hours
+    queue_db.expire_old(max_age_hours=24)
+
+    for queue_type, handler in _HANDLERS.items():
+        if pending[queue_type]:
+            try:
+                handler(pending[queue_type])
+            except Exception as e:
+                log.error(f'Queue worker {queue_type} error: {e}', exc_info=True)
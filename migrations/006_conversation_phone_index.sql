@@ -0,0 +1,7 @@
+-- ============================================
+-- Migration 006: Conversation lookup by phone
+-- Admin /chat, /send, /reply resolve a conversation by contact phone
+-- ============================================
+
+CREATE INDEX IF NOT EXISTS idx_conversations_tenant_phone
+    ON conversations(tenant_id, contact_phone);
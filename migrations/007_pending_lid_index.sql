@@ -0,0 +1,8 @@
+-- ============================================
+-- Migration 007: Pending LID lookup by JID
+-- LID resolution delivers the pending_lid items of one tenant + lid_jid
+-- ============================================
+
+CREATE INDEX IF NOT EXISTS idx_message_queue_pending_lid
+    ON message_queue(tenant_id, (metadata->>'lid_jid'), created_at)
+    WHERE queue_type = 'pending_lid' AND status = 'pending';
@@ -0,0 +1,8 @@
+-- ============================================
+-- Migration 008: Conversation lookup by phone suffix
+-- Admin commands accept a phone without its country code; the suffix is
+-- matched as a prefix of the reversed phone, which this index serves
+-- ============================================
+
+CREATE INDEX IF NOT EXISTS idx_conversations_tenant_phone_rev
+    ON conversations(tenant_id, reverse(contact_phone) text_pattern_ops);
@@ -0,0 +1,275 @@
+"""Tests for WhatsApp admin control commands."""
+
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import patch, MagicMock
+
+
+def _make_controller():
+    from app.services.admin_control import AdminController
+    r = MagicMock()
+    r.get.return_value = None
+    account = {'id': 'acc-1', 'tenant_id': 'ten-1'}
+    return AdminController('test-inst', account, r), r
+
+
+class TestAdminController(unittest.TestCase):
+
+    def test_takeover_single_pipeline(self):
+        """/takeover writes the chat flag and last chat through one pipeline flush."""
+        controller, r = _make_controller()
+        pipe = r.pipeline.return_value.__enter__.return_value
+        pipe.execute.return_value = [1, {'takeover': '1700003600'}, True]
+
+        response = controller.handle_command('/takeover 5511999999999')
+
+        self.assertIn('TAKEOVER ATIVADO', response)
+        r.set.assert_not_called()
+        key, field, _ = pipe.hset.call_args[0]
+        self.assertEqual((key, field), ('admin:chatflags:test-inst:5511999999999', 'takeover'))
+        pipe.set.assert_called_once()
+        pipe.execute.assert_called_once()
+        # Nothing but the takeover in the hash: it expires with the takeover
+        r.expireat.assert_called_once_with('admin:chatflags:test-inst:5511999999999', 1700003600)
+
+    def test_takeover_keeps_blocked_chat_persistent(self):
+        controller, r = _make_controller()
+        pipe = r.pipeline.return_value.__enter__.return_value
+        pipe.execute.return_value = [1, {'takeover': '1700003600', 'block': '1'}, True]
+
+        controller.handle_command('/takeover 5511999999999')
+
+        r.expireat.assert_not_called()
+
+    def test_restart_clears_flags_in_one_pipeline(self):
+        """/restart drops pause/takeover fields but keeps blocks."""
+        controller, r = _make_controller()
+        pipe = r.pipeline.return_value.__enter__.return_value
+        r.scan_iter.return_value = iter(['admin:chatflags:test-inst:551',
+                                         'admin:chatflags:test-inst:552'])
+
+        controller.handle_command('/restart')
+
+        r.keys.assert_not_called()
+        self.assertEqual(r.scan_iter.call_args[1]['match'], 'admin:chatflags:test-inst:*')
+        self.assertIn('admin:paused:test-inst', pipe.delete.call_args[0])
+        pipe.hdel.assert_any_call('admin:chatflags:test-inst:551', 'takeover', 'paused')
+        self.assertEqual(pipe.hdel.call_count, 2)
+        pipe.execute.assert_called_once()
+
+    @patch('app.services.admin_control.whatsapp')
+    def test_status_scans_and_prunes_expired_takeovers(self, mock_whatsapp):
+        controller, r = _make_controller()
+        pipe = r.pipeline.return_value.__enter__.return_value
+        r.scan_iter.return_value = iter(['admin:chatflags:test-inst:551',
+                                         'admin:chatflags:test-inst:552'])
+        r.llen.return_value = 0
+        pipe.execute.side_effect = [[{'takeover': '100', 'paused': '1'}, {'block': '1'}], [1]]
+
+        response = controller.handle_command('/status')
+
+        r.keys.assert_not_called()
+        self.assertIn('Chats em takeover: 0\n', response)
+        self.assertIn('Chats pausados: 1\n', response)
+        pipe.hdel.assert_called_once_with('admin:chatflags:test-inst:551', 'takeover')
+
+    def test_chat_flags_expire_takeover(self):
+        """Takeover fields past their stored expiry are ignored."""
+        from app.services.admin_control import parse_chat_flags
+        self.assertEqual(parse_chat_flags({'takeover': '100', 'block': '1'}, now=200), {'block'})
+        self.assertEqual(parse_chat_flags({'takeover': '300'}, now=200), {'takeover'})
+        self.assertEqual(parse_chat_flags({}), set())
+
+    @patch('app.services.admin_control._get_redis')
+    def test_migrate_legacy_chat_flags(self, mock_redis):
+        from app.services.admin_control import migrate_legacy_chat_flags
+        r = MagicMock()
+        mock_redis.return_value = r
+        r.scan_iter.side_effect = [[], [], ['block:inst-a:5511']]
+        pipe = r.pipeline.return_value.__enter__.return_value
+
+        self.assertEqual(migrate_legacy_chat_flags(), 1)
+
+        pipe.hset.assert_called_once_with('admin:chatflags:inst-a:5511', 'block', '1')
+        pipe.delete.assert_called_once_with('block:inst-a:5511')
+
+    @patch('app.db.conversations.get_message_history')
+    @patch('app.db.conversations.get_conversation_by_phone')
+    def test_chat_uses_phone_lookup(self, mock_lookup, mock_history):
+        """/chat resolves the conversation with a single indexed lookup."""
+        controller, r = _make_controller()
+        mock_lookup.return_value = {
+            'id': 'conv-1', 'contact_phone': '5511999999999', 'contact_name': 'Ana',
+        }
+        mock_history.return_value = [{'role': 'user', 'content': 'oi', 'created_at': ''}]
+
+        response = controller.handle_command('/chat 11999999999')
+
+        mock_lookup.assert_called_once_with('ten-1', '11999999999')
+        self.assertIn('CHAT: Ana (5511999999999)', response)
+        self.assertIn('CLIENTE: oi', response)
+
+    @patch('app.db.tenants.get_tenant_by_slug')
+    def test_tenant_slug_served_from_cache(self, mock_get):
+        """Cached tenant lookups skip the database."""
+        controller, r = _make_controller()
+        r.get.return_value = '{"id": "ten-2", "slug": "acme", "name": "Acme"}'
+
+        tenant = controller._get_tenant_by_slug('acme')
+
+        mock_get.assert_not_called()
+        self.assertEqual(tenant['id'], 'ten-2')
+
+    @patch('app.db.tenants.get_tenant_by_slug')
+    def test_tenant_slug_cache_miss_populates(self, mock_get):
+        """Cache misses hit the database and store the row with a TTL."""
+        from app.services.admin_control import ADMIN_CACHE_TTL
+        controller, r = _make_controller()
+        mock_get.return_value = {'id': 'ten-2', 'slug': 'acme'}
+
+        controller._get_tenant_by_slug('acme')
+
+        mock_get.assert_called_once_with('acme')
+        r.set.assert_called_once()
+        self.assertEqual(r.set.call_args[0][0], 'cache:tenant_slug:acme')
+        self.assertEqual(r.set.call_args[1]['ex'], ADMIN_CACHE_TTL)
+
+    @patch('app.db.tenants.list_whatsapp_accounts')
+    @patch('app.db.tenants.list_all_whatsapp_accounts')
+    @patch('app.db.tenants.list_tenants')
+    def test_tenants_loads_accounts_once(self, mock_tenants, mock_all, mock_per_tenant):
+        """/tenants groups accounts from one query instead of one per tenant."""
+        controller, r = _make_controller()
+        mock_tenants.return_value = [
+            {'id': 't1', 'slug': 's1', 'name': 'N1', 'status': 'active'},
+            {'id': 't2', 'slug': 's2', 'name': 'N2', 'status': 'inactive'},
+        ]
+        mock_all.return_value = [
+            {'tenant_id': 't1', 'instance_name': 'inst-a', 'status': 'active'},
+            {'tenant_id': 't1', 'instance_name': 'inst-b', 'status': 'active'},
+        ]
+
+        response = controller.handle_command('/tenants')
+
+        mock_all.assert_called_once_with()
+        mock_per_tenant.assert_not_called()
+        self.assertIn('[ON] N1\n   slug: s1 | id: t1\n   instancias: inst-a, inst-b\n', response)
+        self.assertIn('[OFF] N2\n   slug: s2 | id: t2\n', response)
+
+    def test_errors_memoized_briefly(self):
+        """Repeated /errors within the TTL reuse the last LRANGE."""
+        from app.services import admin_control
+        admin_control._errors_cache.clear()
+        controller, r = _make_controller()
+        r.lrange.return_value = ['[10:00:00] boom']
+
+        first = controller.handle_command('/errors')
+        second = controller.handle_command('/logs')
+
+        self.assertEqual(first, second)
+        r.lrange.assert_called_once_with('admin:errors:test-inst', 0, 19)
+
+        controller.handle_command('/clearerrors')
+        r.lrange.return_value = []
+        self.assertEqual(controller.handle_command('/errors'), 'Nenhum erro registrado.')
+
+
+class TestAdminExec(unittest.TestCase):
+    """Shell/file helpers cap how much output they read."""
+
+    def setUp(self):
+        self.controller, _ = _make_controller()
+        self.tmpdir = tempfile.mkdtemp()
+        patcher = patch('app.services.admin_control.PROJECT_DIR', self.tmpdir)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_shell_small_output(self):
+        self.assertEqual(self.controller._exec_shell('echo hello'), 'hello')
+
+    def test_shell_exit_code_when_silent(self):
+        self.assertEqual(self.controller._exec_shell('exit 3'), '(exit code: 3)')
+
+    def test_shell_stops_reading_runaway_output(self):
+        output = self.controller._exec_shell('yes')
+        self.assertTrue(output.endswith('... (truncado)'))
+        self.assertLessEqual(len(output), 2100)
+
+    def test_shell_timeout_kills_command(self):
+        start = time.monotonic()
+        with patch('app.services.admin_control.EXEC_TIMEOUT_SECONDS', 0.3):
+            output = self.controller._exec_shell('sleep 5')
+        self.assertEqual(output, 'Comando excedeu timeout de 0.3s.')
+        self.assertLess(time.monotonic() - start, 3)
+
+    def test_shell_pipes_still_work(self):
+        self.assertEqual(self.controller._exec_shell('echo a b | wc -w'), '2')
+
+    def test_command_argv_split(self):
+        from app.services.admin_control import _command_argv
+        self.assertEqual(_command_argv('docker restart "hub bot"'),
+                         ['docker', 'restart', 'hub bot'])
+        self.assertIsNone(_command_argv('ls | head'))
+        self.assertIsNone(_command_argv('cat *.log'))
+        self.assertIsNone(_command_argv('cd app'))
+        self.assertIsNone(_command_argv('FOO=1 env'))
+        self.assertIsNone(_command_argv('echo "unbalanced'))
+
+    @patch('app.services.admin_control.db_query')
+    def test_sql_table_format(self, mock_query):
+        mock_query.return_value = [{'id': i, 'name': f'n{i}'} for i in range(25)]
+        output = self.controller._exec_sql('SELECT id, name FROM t;')
+        lines = output.split('\n')
+        self.assertEqual(lines[0], 'id | name')
+        self.assertEqual(lines[2], '0 | n0')
+        self.assertEqual(lines[-1], '... (+5 linhas)')
+        self.assertEqual(len(lines), 23)
+
+    @patch('app.services.admin_control.db_query')
+    def test_sql_wide_rows_truncated(self, mock_query):
+        mock_query.return_value = [{f'c{j}': 'v' * 60 for j in range(10)} for _ in range(20)]
+        output = self.controller._exec_sql('SELECT * FROM t')
+        self.assertTrue(output.endswith('... (truncado)'))
+        self.assertLessEqual(len(output), 2000 + len('\n... (truncado)'))
+
+    def test_read_file_truncates(self):
+        path = os.path.join(self.tmpdir, 'big.log')
+        with open(path, 'w') as f:
+            f.write('x' * 100000)
+        output = self.controller._exec_read_file(path)
+        self.assertEqual(output, 'x' * 2000 + '\n... (truncado)')
+
+    def test_edit_file_replaces_first_occurrence(self):
+        path = os.path.join(self.tmpdir, 'conf.py')
+        with open(path, 'w') as f:
+            f.write('a = 1\nb = 1\nc = 1\n')
+        os.chmod(path, 0o640)
+
+        result = self.controller._exec_edit_file(path, '= 1', '= 2')
+
+        self.assertEqual(result, f'Arquivo editado: {path}')
+        with open(path) as f:
+            self.assertEqual(f.read(), 'a = 2\nb = 1\nc = 1\n')
+        self.assertEqual(os.stat(path).st_mode & 0o777, 0o640)
+        self.assertEqual(os.listdir(self.tmpdir), ['conf.py'])
+
+    def test_edit_file_not_found_text(self):
+        path = os.path.join(self.tmpdir, 'conf.py')
+        with open(path, 'w') as f:
+            f.write('a = 1\n')
+        result = self.controller._exec_edit_file(path, 'zzz', 'y')
+        self.assertEqual(result, f'Texto nao encontrado no arquivo {path}')
+        empty = os.path.join(self.tmpdir, 'empty.py')
+        open(empty, 'w').close()
+        self.assertIn('Texto nao encontrado', self.controller._exec_edit_file(empty, 'a', 'b'))
+
+    def test_read_file_empty(self):
+        path = os.path.join(self.tmpdir, 'empty.txt')
+        open(path, 'w').close()
+        self.assertEqual(self.controller._exec_read_file(path), '(arquivo vazio)')
+
+
+if __name__ == '__main__':
+    unittest.main()
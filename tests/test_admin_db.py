@@ -0,0 +1,38 @@
+"""Tests for admin panel writes that affect the bot's caches."""
+
+import unittest
+from unittest.mock import patch, MagicMock
+
+
+class TestAccountCacheBroadcast(unittest.TestCase):
+
+    @patch('admin.db._execute')
+    def test_edits_publish_after_write(self, mock_execute):
+        from admin import db as admin_db
+        calls = []
+        mock_execute.side_effect = lambda *a, **k: calls.append('write') or 1
+        fake_redis = MagicMock()
+        fake_redis.publish.side_effect = lambda *a: calls.append('publish')
+
+        with patch.object(admin_db, '_redis', fake_redis):
+            admin_db.update_tenant('ten-1', status='suspended')
+            admin_db.deactivate_whatsapp_account('acc-1')
+
+        self.assertEqual(calls, ['write', 'publish', 'write', 'publish'])
+        fake_redis.publish.assert_called_with('cache_invalidate:account', '1')
+
+    @patch('admin.db._execute')
+    def test_failed_write_does_not_publish(self, mock_execute):
+        from admin import db as admin_db
+        mock_execute.side_effect = RuntimeError('db down')
+        fake_redis = MagicMock()
+
+        with patch.object(admin_db, '_redis', fake_redis):
+            with self.assertRaises(RuntimeError):
+                admin_db.deactivate_whatsapp_account('acc-1')
+
+        fake_redis.publish.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
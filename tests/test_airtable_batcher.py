@@ -0,0 +1,108 @@
+"""Tests for the coalescing Airtable lead writer."""
+
+import unittest
+from unittest.mock import patch
+
+
+class TestAirtableBatcher(unittest.TestCase):
+
+    def setUp(self):
+        from app.integrations import airtable_batcher
+        airtable_batcher._record_cache.clear()
+        self.addCleanup(airtable_batcher._record_cache.clear)
+
+    def _pending(self, *items):
+        from app.integrations.airtable_batcher import _merge
+        pending = {}
+        for item in items:
+            _merge(pending, item)
+        return pending
+
+    def test_merge_coalesces_per_phone(self):
+        pending = self._pending(
+            ('551', {'Ultima Interacao': 't1'}, {'Nome': 'Ana'},
+             {'Telefone': '551', 'Data Entrada': 't1'}),
+            ('551', {'Ultima Interacao': 't2', 'Status': 'Fechando'}, {}, None),
+            ('551', {'Ultima Interacao': 't3'}, {}, {'Telefone': '551', 'Data Entrada': 't3'}),
+        )
+        self.assertEqual(list(pending), ['551'])
+        entry = pending['551']
+        self.assertEqual(entry['update'], {'Ultima Interacao': 't3', 'Status': 'Fechando'})
+        self.assertEqual(entry['fill'], {'Nome': 'Ana'})
+        self.assertEqual(entry['create']['Data Entrada'], 't1')
+
+    @patch('app.integrations.airtable_batcher.airtable_client')
+    def test_flush_batches_lookup_update_and_create(self, mock_client):
+        mock_client.BATCH_SIZE = 10
+        mock_client.search_records_in.return_value = [
+            {'id': 'rec1', 'Telefone': '551', 'Nome': 'Old'},
+            {'id': 'rec2', 'Telefone': '552'},
+        ]
+        pending = self._pending(
+            ('551', {'Ultima Interacao': 't'}, {'Nome': 'Ana'}, {'Telefone': '551'}),
+            ('552', {'Ultima Interacao': 't'}, {'Nome': 'Bia'}, {'Telefone': '552'}),
+            ('553', {'Ultima Interacao': 't'}, {}, {'Telefone': '553', 'Status': 'Novo'}),
+            ('554', {'Status': 'Fechando'}, {}, None),
+        )
+
+        from app.integrations.airtable_batcher import flush
+        flush(pending)
+
+        mock_client.search_records_in.assert_called_once_with(
+            'Leads', 'Telefone', ['551', '552', '553', '554'])
+        mock_client.update_records.assert_called_once_with('Leads', [
+            {'id': 'rec1', 'fields': {'Ultima Interacao': 't'}},
+            {'id': 'rec2', 'fields': {'Nome': 'Bia', 'Ultima Interacao': 't'}},
+        ])
+        mock_client.upsert_records.assert_called_once_with('Leads', [
+            {'Telefone': '553', 'Status': 'Novo', 'Ultima Interacao': 't'},
+        ], ['Telefone'])
+
+    @patch('app.integrations.airtable_batcher.airtable_client')
+    def test_flush_skips_creates_when_lookup_fails(self, mock_client):
+        """A failed lookup must not create duplicate leads."""
+        mock_client.BATCH_SIZE = 10
+        mock_client.search_records_in.return_value = None
+        pending = self._pending(('551', {'Ultima Interacao': 't'}, {}, {'Telefone': '551'}))
+
+        from app.integrations.airtable_batcher import flush
+        flush(pending)
+
+        mock_client.upsert_records.assert_not_called()
+        mock_client.update_records.assert_not_called()
+
+    @patch('app.integrations.airtable_batcher.airtable_client')
+    def test_known_phone_skips_lookup(self, mock_client):
+        """Cached phone -> record id goes straight to the batch update."""
+        mock_client.BATCH_SIZE = 10
+        mock_client.iter_records.return_value = iter([{'id': 'rec1', 'Telefone': '551'}])
+
+        from app.integrations.airtable_batcher import flush, warm_cache
+        warm_cache()
+        flush(self._pending(('551', {'Ultima Interacao': 't'}, {'Nome': 'Ana'}, {'Telefone': '551'})))
+        flush(self._pending(('551', {'Ultima Interacao': 't2'}, {'Nome': 'Ana'}, {'Telefone': '551'})))
+
+        mock_client.search_records_in.assert_not_called()
+        self.assertEqual(mock_client.iter_records.call_args[1]['max_pages'], 5)
+        self.assertEqual(mock_client.update_records.call_args_list[0][0][1],
+                         [{'id': 'rec1', 'fields': {'Nome': 'Ana', 'Ultima Interacao': 't'}}])
+        self.assertEqual(mock_client.update_records.call_args_list[1][0][1],
+                         [{'id': 'rec1', 'fields': {'Ultima Interacao': 't2'}}])
+
+    @patch('app.integrations.airtable_batcher.airtable_client')
+    def test_created_leads_are_cached(self, mock_client):
+        mock_client.BATCH_SIZE = 10
+        mock_client.search_records_in.return_value = []
+        mock_client.upsert_records.return_value = [{'id': 'rec9', 'Telefone': '559'}]
+
+        from app.integrations.airtable_batcher import flush
+        flush(self._pending(('559', {'Ultima Interacao': 't'}, {}, {'Telefone': '559'})))
+        flush(self._pending(('559', {'Status': 'Fechando'}, {}, None)))
+
+        mock_client.search_records_in.assert_called_once()
+        mock_client.update_records.assert_called_once_with(
+            'Leads', [{'id': 'rec9', 'fields': {'Status': 'Fechando'}}])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+"""Tests for the Airtable client rate limiting."""
+
+import unittest
+from unittest.mock import patch
+
+
+class TestAirtableThrottle(unittest.TestCase):
+
+    def setUp(self):
+        from app.integrations import airtable_client
+        airtable_client._request_times.clear()
+        self.addCleanup(airtable_client._request_times.clear)
+
+    @patch('app.integrations.airtable_client.time')
+    def test_sixth_request_in_a_second_waits(self, mock_time):
+        clock = [100.0]
+        mock_time.monotonic.side_effect = lambda: clock[0]
+
+        def fake_sleep(seconds):
+            clock[0] += seconds
+        mock_time.sleep.side_effect = fake_sleep
+
+        from app.integrations.airtable_client import _throttle
+        for _ in range(5):
+            _throttle()
+        mock_time.sleep.assert_not_called()
+
+        clock[0] += 0.25
+        _throttle()
+        mock_time.sleep.assert_called_once_with(0.75)
+        self.assertEqual(clock[0], 101.0)
+
+    @patch('app.integrations.airtable_client._session.request')
+    @patch('app.integrations.airtable_client._throttle')
+    def test_requests_go_through_throttle(self, mock_throttle, mock_request):
+        from app.integrations import airtable_client
+        with patch.object(airtable_client, '_API_KEY', 'k'), \
+                patch.object(airtable_client, '_BASE_ID', 'b'):
+            airtable_client.delete_record('Leads', 'rec1')
+
+        mock_throttle.assert_called_once_with()
+        self.assertEqual(mock_request.call_args[0][0], 'DELETE')
+
+    @patch('app.integrations.airtable_client._request')
+    def test_iter_records_stops_at_max_pages(self, mock_request):
+        from app.integrations import airtable_client
+        mock_request.return_value.json.side_effect = lambda: {
+            'records': [{'id': 'rec1', 'fields': {'Telefone': '551'}}], 'offset': 'next'}
+        with patch.object(airtable_client, '_API_KEY', 'k'), \
+                patch.object(airtable_client, '_BASE_ID', 'b'):
+            records = list(airtable_client.iter_records(
+                'Leads', sort=[{'field': 'Ultima Interacao', 'direction': 'desc'}],
+                max_pages=2))
+
+        self.assertEqual(len(records), 2)
+        self.assertEqual(mock_request.call_count, 2)
+        params = mock_request.call_args[1]['params']
+        self.assertEqual((params['sort[0][field]'], params['sort[0][direction]']),
+                         ('Ultima Interacao', 'desc'))
+
+
+if __name__ == '__main__':
+    unittest.main()
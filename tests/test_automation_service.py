@@ -0,0 +1,72 @@
+"""Tests for reengagement automation."""
+
+import unittest
+from unittest.mock import patch
+
+
+class TestReengagement(unittest.TestCase):
+
+    @patch('app.services.automation_service.get_redis', return_value=None)
+    @patch('app.services.automation_service.time.sleep')
+    @patch('app.services.automation_service.whatsapp')
+    @patch('app.services.automation_service.conv_db')
+    def test_counts_only_sent(self, mock_conv, mock_whatsapp, mock_sleep, mock_redis):
+        """Every stale conversation is attempted; only successful sends count."""
+        mock_conv.get_stale_conversations.return_value = [
+            {'id': f'conv-{i}', 'instance_name': 'inst', 'contact_phone': f'55119{i}',
+             'contact_name': '', 'language': 'pt'}
+            for i in range(5)
+        ]
+        mock_whatsapp.send_message.side_effect = lambda inst, phone, msg: phone != '551192'
+
+        from app.services.automation_service import run_reengagement
+        sent = run_reengagement('ten-1')
+
+        self.assertEqual(sent, 4)
+        self.assertEqual(mock_whatsapp.send_message.call_count, 5)
+        self.assertEqual(mock_conv.increment_reengagement.call_count, 4)
+
+    @patch('app.services.automation_service.get_redis', return_value=None)
+    @patch('app.services.automation_service.time.sleep')
+    @patch('app.services.automation_service.whatsapp')
+    @patch('app.services.automation_service.conv_db')
+    def test_language_from_last_message(self, mock_conv, mock_whatsapp, mock_sleep, mock_redis):
+        """Reengagement detects language from the row's last message, no history scan."""
+        mock_conv.get_stale_conversations.return_value = [
+            {'id': 'conv-1', 'instance_name': 'inst', 'contact_phone': '551190',
+             'contact_name': '', 'language': 'pt',
+             'last_user_message': 'hello, how much does it cost?'},
+        ]
+        mock_whatsapp.send_message.return_value = True
+
+        from app.services.automation_service import run_reengagement, _REENGAGE_EN
+        run_reengagement('ten-1')
+
+        mock_conv.get_message_history.assert_not_called()
+        sent_msg = mock_whatsapp.send_message.call_args[0][2]
+        expected = {t % {'nome': '', 'nome_ou_oi': 'Hey'} for t in _REENGAGE_EN}
+        self.assertIn(sent_msg, expected)
+
+    @patch('app.services.automation_service.get_redis')
+    def test_template_index_from_redis(self, mock_redis):
+        """Template rotation uses the shared Redis counter."""
+        pipe = mock_redis.return_value.pipeline.return_value.__enter__.return_value
+        pipe.execute.return_value = [4, True]
+
+        from app.services.automation_service import get_reengage_message, _REENGAGE_PT
+        msg = get_reengage_message('', 'pt')
+
+        pipe.incr.assert_called_once_with('reengage:idx')
+        self.assertEqual(msg, _REENGAGE_PT[4 % 3] % {'nome': '', 'nome_ou_oi': 'Oi'})
+
+    @patch('app.services.automation_service.get_redis', return_value=None)
+    def test_reengage_message_uses_first_name(self, mock_redis):
+        from app.services.automation_service import get_reengage_message
+        msg = get_reengage_message('Maria Souza', 'pt')
+        self.assertIn('Maria', msg)
+        self.assertNotIn('Souza', msg)
+        self.assertNotIn('%(', msg)
+
+
+if __name__ == '__main__':
+    unittest.main()
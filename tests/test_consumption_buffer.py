@@ -0,0 +1,39 @@
+"""Tests for buffered consumption logging."""
+
+import queue
+import unittest
+from unittest.mock import patch
+
+
+class TestConsumptionBuffer(unittest.TestCase):
+
+    @patch('app.db.consumption_buffer.execute')
+    def test_bulk_insert_chunks(self, mock_execute):
+        from app.db.consumption_buffer import _insert_rows
+        rows = [('t1', None, 'm', 1, 2, 0.1, 'chat', '{}')] * 150
+
+        _insert_rows(rows)
+
+        self.assertEqual(mock_execute.call_count, 2)
+        sql, params = mock_execute.call_args_list[0][0]
+        self.assertEqual(sql.count('(%s, %s, %s, %s, %s, %s, %s, %s)'), 100)
+        self.assertEqual(len(params), 800)
+        self.assertEqual(len(mock_execute.call_args_list[1][0][1]), 400)
+
+    @patch('app.db.consumption_buffer.consumption_db')
+    @patch('app.db.consumption_buffer._ensure_worker')
+    def test_full_buffer_writes_synchronously(self, mock_worker, mock_consumption):
+        from app.db import consumption_buffer
+        with patch.object(consumption_buffer, '_queue', queue.Queue(maxsize=1)):
+            consumption_buffer.enqueue('t1', 'm', 1, 2, 0.1, conversation_id='c1')
+            mock_consumption.log_usage.assert_not_called()
+            consumption_buffer.enqueue('t1', 'm', 3, 4, 0.2, operation='tts')
+
+            mock_consumption.log_usage.assert_called_once_with(
+                't1', 'm', 3, 4, 0.2, conversation_id=None, operation='tts', metadata=None)
+            self.assertEqual(consumption_buffer._queue.get_nowait(),
+                             ('t1', 'c1', 'm', 1, 2, 0.1, 'chat', '{}'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,36 @@
+"""Tests for the delayed-job scheduler."""
+
+import threading
+import time
+import unittest
+
+
+class TestDelayScheduler(unittest.TestCase):
+
+    def test_runs_jobs_in_due_order(self):
+        from app.services import delay_scheduler
+        ran = []
+        done = threading.Event()
+
+        def job(name):
+            ran.append(name)
+            if len(ran) == 2:
+                done.set()
+
+        start = time.monotonic()
+        delay_scheduler.schedule(0.2, job, 'late')
+        delay_scheduler.schedule(0.05, job, 'early')
+
+        self.assertTrue(done.wait(2))
+        self.assertEqual(ran, ['early', 'late'])
+        self.assertGreaterEqual(time.monotonic() - start, 0.2)
+
+    def test_schedule_returns_immediately(self):
+        from app.services import delay_scheduler
+        start = time.monotonic()
+        delay_scheduler.schedule(5, lambda: None)
+        self.assertLess(time.monotonic() - start, 0.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
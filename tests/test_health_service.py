@@ -0,0 +1,77 @@
+"""Tests for instance health monitoring."""
+
+import unittest
+from unittest.mock import patch, MagicMock
+
+
+class TestHealthService(unittest.TestCase):
+
+    @patch('app.services.health_service.time.time', return_value=1000.0)
+    @patch('app.services.health_service._fetch_instance_health')
+    @patch('app.services.health_service.get_redis')
+    def test_batch_uses_cache_and_checks_misses(self, mock_redis, mock_fetch, mock_time):
+        """Fresh cached instances come from one HMGET; misses and stale hit the API."""
+        r = MagicMock()
+        r.hmget.return_value = ['1:990', None, '0:995', '1:900']
+        mock_redis.return_value = r
+        mock_fetch.return_value = False
+
+        from app.services.health_service import check_instances_health, HEALTH_HASH_KEY
+        result = check_instances_health(['a', 'b', 'c', 'd'])
+
+        self.assertEqual(result, {'a': True, 'b': False, 'c': False, 'd': False})
+        r.hmget.assert_called_once_with(HEALTH_HASH_KEY, ['a', 'b', 'c', 'd'])
+        self.assertEqual(mock_fetch.call_count, 2)
+        pipe = r.pipeline.return_value.__enter__.return_value
+        pipe.hset.assert_called_once_with(
+            HEALTH_HASH_KEY, mapping={'b': '0:1000', 'd': '0:1000'})
+
+    @patch('app.services.health_service.check_instances_health')
+    def test_webhook_health_uses_prefetched(self, mock_batch):
+        from app.services.health_service import check_webhook_health
+        self.assertFalse(check_webhook_health('a', {'a': False}))
+        mock_batch.assert_not_called()
+
+    @patch('app.services.health_service.alert_admin')
+    @patch('app.services.health_service.check_instances_health')
+    @patch('app.services.health_service.get_redis')
+    @patch('app.db.tenants.list_active_accounts')
+    def test_check_all_pipelines_failures(self, mock_accounts, mock_redis,
+                                          mock_health, mock_alert):
+        """Failure counters for all unhealthy instances share one pipeline."""
+        mock_accounts.return_value = [
+            {'tenant_id': 't1', 'instance_name': 'a'},
+            {'tenant_id': 't2', 'instance_name': 'b'},
+            {'tenant_id': 't3', 'instance_name': 'c'},
+        ]
+        mock_health.return_value = {'a': False, 'b': True, 'c': False}
+        r = MagicMock()
+        pipe = r.pipeline.return_value.__enter__.return_value
+        pipe.execute.return_value = [1, True, 5, True]
+        mock_redis.return_value = r
+
+        from app.services.health_service import check_all_instances
+        check_all_instances()
+
+        pipe.execute.assert_called_once()
+        self.assertEqual(pipe.incr.call_count, 2)
+        mock_alert.assert_called_once_with('t3', 'c', 'instance_disconnected')
+
+    @patch('app.services.health_service.config')
+    @patch('app.db.queue.execute')
+    def test_alert_metadata_encoded_once(self, mock_execute, mock_config):
+        """Alert metadata reaches the queue as a JSON object, not a quoted string."""
+        import json
+        mock_config.WEBHOOK_BACKUP_URL = ''
+
+        from app.services.health_service import alert_admin
+        alert_admin('t1', 'inst-a', 'send_failed')
+
+        meta_json = mock_execute.call_args[0][1][5]
+        self.assertEqual(json.loads(meta_json), {
+            'instance': 'inst-a', 'error_type': 'send_failed', 'tenant_id': 't1',
+        })
+
+
+if __name__ == '__main__':
+    unittest.main()
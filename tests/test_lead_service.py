@@ -0,0 +1,33 @@
+"""Tests for the lead service Airtable sync throttle."""
+
+import unittest
+from unittest.mock import patch
+
+
+class TestAirtableTouchThrottle(unittest.TestCase):
+
+    def setUp(self):
+        from app.services import lead_service
+        lead_service._last_touch.clear()
+        self.addCleanup(lead_service._last_touch.clear)
+
+    @patch('app.services.lead_service.airtable_batcher')
+    @patch('app.services.lead_service._AIRTABLE_ENABLED', True)
+    @patch('app.services.lead_service.time')
+    def test_burst_syncs_once_per_interval(self, mock_time, mock_batcher):
+        from app.services.lead_service import _sync_to_airtable
+        mock_time.monotonic.return_value = 100.0
+        for _ in range(20):
+            _sync_to_airtable('5511999', None)
+        self.assertEqual(mock_batcher.enqueue.call_count, 1)
+
+        _sync_to_airtable('5511999', 'Luan')  # new name goes through
+        self.assertEqual(mock_batcher.enqueue.call_count, 2)
+
+        mock_time.monotonic.return_value = 161.0
+        _sync_to_airtable('5511999', 'Luan')
+        self.assertEqual(mock_batcher.enqueue.call_count, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
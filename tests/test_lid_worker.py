@@ -0,0 +1,31 @@
+"""Tests for the pending LID worker."""
+
+import unittest
+from unittest.mock import patch
+
+
+class TestResolvePending(unittest.TestCase):
+
+    @patch('app.workers.lid_worker._deliver_pending_lid_responses')
+    @patch('app.workers.lid_worker.tenants_db')
+    @patch('app.workers.lid_worker.lid_resolver')
+    @patch('app.workers.lid_worker.queue_db')
+    def test_each_lid_resolved_once_per_sweep(self, mock_queue, mock_resolver,
+                                              mock_tenants, mock_deliver):
+        pending = [
+            {'id': i, 'metadata': {'lid_jid': '123@lid'},
+             'whatsapp_account_id': 'acc-1', 'instance_name': 'inst'}
+            for i in range(3)
+        ]
+        mock_resolver.resolve.return_value = None
+
+        from app.workers.lid_worker import resolve_pending
+        resolve_pending(pending)
+
+        mock_resolver.resolve.assert_called_once_with('acc-1', 'inst', '123@lid')
+        self.assertEqual(mock_queue.increment_attempt.call_count, 3)
+        mock_deliver.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -6,16 +6,22 @@ from unittest.mock import patch, MagicMock
 
 class TestMessageHandler(unittest.TestCase):
 
+    @patch('app.services.message_handler._reply_executor')
+    @patch('app.services.message_handler.whatsapp')
+    @patch('app.services.message_handler.delay_scheduler')
     @patch('app.services.message_handler.sender')
-    @patch('app.services.message_handler.supervisor')
+    @patch('app.services.message_handler.process_v60')
     @patch('app.services.message_handler.conv_db')
-    @patch('app.services.message_handler.leads_db')
     @patch('app.services.message_handler.lead_service')
-    @patch('app.services.message_handler.consumption_db')
+    @patch('app.services.message_handler.consumption_buffer')
     @patch('app.services.message_handler.tenants_db')
     def test_happy_path(self, mock_tenants, mock_consumption, mock_lead_svc,
-                        mock_leads, mock_conv, mock_supervisor, mock_sender):
+                        mock_conv, mock_process, mock_sender, mock_delay, mock_whatsapp,
+                        mock_reply_pool):
         """Full happy path: message in -> AI response -> message out."""
+        # Run the reply and the delayed send inline
+        mock_reply_pool.submit.side_effect = lambda fn, *args: fn(*args)
+        mock_delay.schedule.side_effect = lambda delay, fn, *args: fn(*args)
         mock_tenants.get_whatsapp_account_by_instance.return_value = {
             'id': 'acc-1',
             'tenant_id': 'ten-1',
@@ -23,25 +29,26 @@ class TestMessageHandler(unittest.TestCase):
             'config': '{}',
             'tenant_anthropic_key': None,
         }
-        mock_tenants.get_active_agent_config.return_value = {
-            'system_prompt': 'You are Oliver.',
-            'model': 'claude-sonnet-4-20250514',
-            'max_tokens': 150,
-            'max_history_messages': 10,
-            'persona': {},
-            'tools_enabled': '["web_search"]',
-        }
-        mock_conv.get_or_create_conversation.return_value = {
+        mock_conv.record_user_message.return_value = {
             'id': 'conv-1', 'tenant_id': 'ten-1',
             'contact_phone': '5511999', 'contact_name': None,
             'stage': 'new',
         }
-        mock_conv.get_message_history.return_value = [
-            {'role': 'user', 'content': 'oi'},
-        ]
-        mock_leads.get_lead.return_value = None
+        mock_conv.get_message_context.return_value = {
+            'agent_config': {
+                'system_prompt': 'You are Oliver.',
+                'model': 'claude-sonnet-4-20250514',
+                'max_tokens': 150,
+                'max_history_messages': 10,
+                'persona': {},
+                'tools_enabled': '["web_search"]',
+            },
+            'lead': None,
+            'history': [{'role': 'user', 'content': 'oi'}],
+            'message_count': 1,
+        }
 
-        mock_supervisor.process.return_value = {
+        mock_process.return_value = {
             'text': 'Oi! Sou Oliver.',
             'input_tokens': 100, 'output_tokens': 20,
             'model': 'claude-sonnet-4-20250514', 'cost': 0.0006,
@@ -60,12 +67,58 @@ class TestMessageHandler(unittest.TestCase):
             },
         })
 
-        # Verify AI was called
-        mock_supervisor.process.assert_called_once()
-        # Verify message was sent
+        # Verify AI was called with the language detected for the first message
+        mock_process.assert_called_once()
+        self.assertEqual(mock_process.call_args[1]['language'], 'pt')
+        mock_conv.update_conversation.assert_called_once_with('conv-1', tenant_id='ten-1',
+                                                              language='pt')
+        # Verify the reply was saved, then sent
+        self.assertEqual(mock_conv.save_message.call_args[0][:3],
+                         ('conv-1', 'assistant', 'Oi! Sou Oliver.'))
         mock_sender.send_split_messages.assert_called_once()
+        mock_whatsapp.set_typing.assert_called_once_with('test-inst', '5511999', True)
         # Verify consumption was logged
-        mock_consumption.log_usage.assert_called_once()
+        mock_consumption.enqueue.assert_called_once()
+
+    @patch('app.services.message_handler.detect_language')
+    @patch('app.services.message_handler._reply_executor')
+    @patch('app.services.message_handler.whatsapp')
+    @patch('app.services.message_handler.delay_scheduler')
+    @patch('app.services.message_handler.sender')
+    @patch('app.services.message_handler.process_v60')
+    @patch('app.services.message_handler.conv_db')
+    @patch('app.services.message_handler.lead_service')
+    @patch('app.services.message_handler.consumption_buffer')
+    @patch('app.services.message_handler.tenants_db')
+    def test_stored_language_skips_detection(self, mock_tenants, mock_consumption, mock_lead_svc,
+                                             mock_conv, mock_process, mock_sender, mock_delay,
+                                             mock_whatsapp, mock_reply_pool, mock_detect):
+        """Later messages reuse the conversation's locked language without detecting."""
+        mock_reply_pool.submit.side_effect = lambda fn, *args: fn(*args)
+        mock_delay.schedule.side_effect = lambda delay, fn, *args: fn(*args)
+        mock_tenants.get_whatsapp_account_by_instance.return_value = {
+            'id': 'acc-1', 'tenant_id': 'ten-1', 'config': {}}
+        mock_conv.record_user_message.return_value = {
+            'id': 'conv-1', 'tenant_id': 'ten-1', 'language': 'en'}
+        mock_conv.get_message_context.return_value = {
+            'agent_config': None, 'lead': None, 'history': [], 'message_count': 3}
+        mock_process.return_value = {
+            'text': 'Hi!', 'input_tokens': 1, 'output_tokens': 1,
+            'model': 'm', 'cost': 0.0, 'tool_calls': []}
+
+        from app.services.message_handler import handle_webhook
+        handle_webhook({
+            'event': 'messages.upsert',
+            'instance': 'test-inst',
+            'data': {
+                'key': {'remoteJid': '5511999@s.whatsapp.net', 'fromMe': False},
+                'message': {'conversation': 'hola'},
+            },
+        })
+
+        mock_detect.assert_not_called()
+        mock_conv.update_conversation.assert_not_called()
+        self.assertEqual(mock_process.call_args[1]['language'], 'en')
 
     @patch('app.services.message_handler.tenants_db')
     def test_unknown_instance(self, mock_tenants):
@@ -121,6 +174,190 @@ class TestExtractContent(unittest.TestCase):
         self.assertEqual(text, 'Texto transcrito')
         self.assertEqual(source, 'audio')
 
+    @patch('app.services.message_handler.transcriber')
+    def test_audio_uses_started_transcription(self, mock_transcriber):
+        mock_transcriber.transcribe_audio.return_value = 'Texto transcrito'
+        from app.services.message_handler import _extract_content, _start_transcription
+        data = {'message': {'audioMessage': {'seconds': 5}}}
+
+        self.assertIsNone(_start_transcription('inst', {'message': {'conversation': 'oi'}}))
+        future = _start_transcription('inst', data)
+        text, source = _extract_content(data, 'inst', future)
+
+        self.assertEqual((text, source), ('Texto transcrito', 'audio'))
+        mock_transcriber.transcribe_audio.assert_called_once_with('inst', data)
+
+
+class TestIsForwarded(unittest.TestCase):
+
+    def test_context_info_locations(self):
+        from app.services.message_handler import _is_forwarded
+        self.assertTrue(_is_forwarded({'message': {
+            'extendedTextMessage': {'text': 'oi', 'contextInfo': {'isForwarded': True}}}}))
+        self.assertTrue(_is_forwarded({'message': {
+            'imageMessage': {'contextInfo': {'forwardingScore': 2}}}}))
+        self.assertTrue(_is_forwarded({'message': {
+            'conversation': 'oi', 'contextInfo': {'forwardingScore': 1}}}))
+        self.assertFalse(_is_forwarded({'message': {
+            'conversation': 'oi', 'messageContextInfo': {'deviceListMetadata': {}}}}))
+        self.assertFalse(_is_forwarded({'message': None}))
+
+
+class TestBusinessHours(unittest.TestCase):
+
+    def test_pre_parsed_windows(self):
+        from datetime import time
+        from app.services.message_handler import _is_within_business_hours
+        day = (time(9, 0), time(18, 0))
+        overnight = (time(22, 0), time(6, 0))
+        self.assertTrue(_is_within_business_hours(None))
+        self.assertTrue(_is_within_business_hours(day, now=time(12, 0)))
+        self.assertFalse(_is_within_business_hours(day, now=time(20, 0)))
+        self.assertTrue(_is_within_business_hours(overnight, now=time(23, 30)))
+        self.assertTrue(_is_within_business_hours(overnight, now=time(5, 0)))
+        self.assertFalse(_is_within_business_hours(overnight, now=time(12, 0)))
+
+
+class TestGetPhone(unittest.TestCase):
+
+    def test_jid_variants(self):
+        from app.services.message_handler import _get_phone
+        self.assertEqual(_get_phone({'key': {'remoteJid': '5511999@s.whatsapp.net'}}), '5511999')
+        self.assertEqual(_get_phone({'key': {'remoteJid': '123@lid',
+                                             'participant': '5511888@s.whatsapp.net'}}),
+                         '5511888')
+        self.assertEqual(_get_phone({'key': {'remoteJid': '123@lid'}}), '123@lid')
+        self.assertEqual(_get_phone({'key': {'remoteJid': 'grp@g.us',
+                                             'participant': '5511777@s.whatsapp.net'}}),
+                         '5511777')
+        self.assertIsNone(_get_phone({'key': {}}))
+
+
+class TestDeliverPendingLid(unittest.TestCase):
+
+    @patch('app.services.message_handler.delay_scheduler')
+    @patch('app.services.message_handler.whatsapp')
+    @patch('app.services.message_handler.queue_db')
+    def test_multiple_pending_scheduled_not_slept(self, mock_queue, mock_whatsapp, mock_scheduler):
+        mock_queue.get_pending_by_lid.return_value = [
+            {'id': 1, 'content': 'primeira', 'metadata': {'push_name': 'Luan'}},
+            {'id': 2, 'content': 'ultima', 'metadata': {}},
+        ]
+        from app.services.message_handler import _deliver_pending_lid_responses
+        _deliver_pending_lid_responses({'tenant_id': 't1'}, 'inst', '123@lid', '5511999')
+
+        mock_queue.mark_delivered_many.assert_called_once_with([1, 2], 't1')
+        mock_whatsapp.set_typing.assert_called_once_with('inst', '5511999', True)
+        delays = [c[0][0] for c in mock_scheduler.schedule.call_args_list]
+        self.assertEqual(delays, [2.0, 3.5, 5.5])
+        self.assertEqual(mock_scheduler.schedule.call_args_list[-1][0][2:],
+                         ('inst', '5511999', 'ultima'))
+
+
+class TestSaveReply(unittest.TestCase):
+
+    @patch('app.services.message_handler.summary_service')
+    @patch('app.services.message_handler.conv_db')
+    def test_summary_triggered_after_save(self, mock_conv, mock_summary):
+        mock_summary.SUMMARY_INTERVAL = 10
+        from app.services.message_handler import _save_reply
+        _save_reply('conv-1', 'ten-1', 'Oi!', {'model': 'm'}, 10, None)
+
+        mock_conv.save_message.assert_called_once_with('conv-1', 'assistant', 'Oi!', {'model': 'm'})
+        mock_summary.submit.assert_called_once_with('conv-1', 'ten-1', 10, None)
+
+        mock_summary.reset_mock()
+        mock_conv.save_message.side_effect = Exception('db down')
+        _save_reply('conv-1', 'ten-1', 'Oi!', {}, 10, None)
+        mock_summary.submit.assert_not_called()
+
+
+class TestReadDelay(unittest.TestCase):
+
+    def test_audio_replies_skip_read_delay(self):
+        from app.services.message_handler import _read_delay, READ_DELAY_RANGE
+        self.assertEqual(_read_delay('audio'), 0)
+        delay = _read_delay('text')
+        self.assertTrue(READ_DELAY_RANGE[0] <= delay <= READ_DELAY_RANGE[1])
+
+    @patch('app.services.message_handler._send_reply')
+    @patch('app.services.message_handler._save_reply')
+    @patch('app.services.message_handler.delay_scheduler')
+    @patch('app.services.message_handler.process_v60')
+    @patch('app.services.message_handler.conv_db')
+    @patch('app.services.message_handler.time')
+    def test_ai_call_overlaps_read_delay(self, mock_time, mock_conv, mock_process,
+                                         mock_scheduler, mock_save, mock_send):
+        from app.services.message_handler import _reply_to_message, _safe_reply
+        mock_conv.get_message_context.return_value = {
+            'agent_config': None, 'lead': None, 'history': [], 'message_count': 1}
+        mock_process.return_value = {
+            'text': 'Oi!', 'model': 'm', 'input_tokens': 1, 'output_tokens': 1,
+            'cost': 0.0, 'tool_calls': []}
+        account = {'id': 'acc-1', 'tenant_id': 'ten-1'}
+
+        def reply(reply_at):
+            _reply_to_message('inst', account, {'id': 'conv-1'}, 'oi', 'text', 'pt',
+                              False, '5511999', '5511999', '5511999', False, '', None,
+                              reply_at)
+
+        # AI returned 0.5s into a 2s read delay: send is held for the rest
+        mock_time.monotonic.return_value = 100.5
+        reply(102.0)
+        mock_save.assert_called_once()
+        mock_send.assert_not_called()
+        delay, fn, step = mock_scheduler.schedule.call_args[0][:3]
+        self.assertEqual((delay, fn, step), (1.5, _safe_reply, mock_send))
+
+        # AI took longer than the read delay: send right away
+        mock_scheduler.reset_mock()
+        mock_time.monotonic.return_value = 103.0
+        reply(102.0)
+        mock_send.assert_called_once()
+        self.assertEqual(mock_scheduler.schedule.call_count, 1)  # typing indicator only
+
+
+class TestIncomingGate(unittest.TestCase):
+
+    def _redis(self, replies):
+        r = MagicMock()
+        pipe = r.pipeline.return_value.__enter__.return_value
+        pipe.execute.return_value = replies
+        return r, pipe
+
+    @patch('app.services.message_handler.tenants_db')
+    @patch('app.services.message_handler.get_redis')
+    def test_duplicate_and_flags_in_one_round_trip(self, mock_get_redis, mock_tenants):
+        from app.services.message_handler import _process_incoming
+        data = {'key': {'id': 'm1', 'remoteJid': '5511999@s.whatsapp.net'},
+                'message': {'conversation': 'oi'}}
+
+        r, pipe = self._redis([None, None, None, {}])
+        mock_get_redis.return_value = r
+        _process_incoming('inst', data)
+        pipe.execute.assert_called_once_with()
+        pipe.hgetall.assert_called_once_with('admin:chatflags:inst:5511999')
+        pipe.get.assert_any_call('admin:prompt_override:inst')
+        r.set.assert_not_called()
+        mock_tenants.get_whatsapp_account_by_instance.assert_not_called()
+
+        r, pipe = self._redis([True, None, None, {'block': '1'}])
+        mock_get_redis.return_value = r
+        _process_incoming('inst', data)
+        mock_tenants.get_whatsapp_account_by_instance.assert_not_called()
+
+    @patch('app.services.message_handler._start_transcription')
+    @patch('app.services.message_handler.tenants_db')
+    @patch('app.services.message_handler.get_redis')
+    def test_unknown_instance_skips_whisper(self, mock_get_redis, mock_tenants, mock_start):
+        from app.services.message_handler import _process_incoming
+        mock_get_redis.return_value = self._redis([True, None, None, {}])[0]
+        mock_tenants.get_whatsapp_account_by_instance.return_value = None
+
+        _process_incoming('inst', {'key': {'id': 'm1', 'remoteJid': '5511999@s.whatsapp.net'},
+                                   'message': {'audioMessage': {}}})
+        mock_start.assert_not_called()
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,47 @@
+"""Tests for the shared message_queue poller."""
+
+import unittest
+from unittest.mock import Mock, patch
+
+
+class TestPollOnce(unittest.TestCase):
+
+    @patch('app.workers.queue_worker.queue_db')
+    def test_one_query_dispatched_by_type(self, mock_queue):
+        from app.workers import queue_worker
+        failed = [{'id': 1, 'queue_type': 'failed'}]
+        mock_queue.get_pending_multi.return_value = {'failed': failed, 'pending_lid': []}
+        with patch.dict(queue_worker._HANDLERS, {'failed': Mock(),
+                                                 'pending_lid': Mock()}):
+            queue_worker.poll_once()
+
+            queue_worker._HANDLERS['failed'].assert_called_once_with(failed)
+            queue_worker._HANDLERS['pending_lid'].assert_not_called()
+        mock_queue.get_pending_multi.assert_called_once_with(
+            ('failed', 'pending_lid'), limit=queue_worker.QUEUE_POLL_LIMIT)
+        mock_queue.expire_old.assert_called_once_with(max_age_hours=24)
+
+    @patch('app.workers.queue_worker.queue_db')
+    def test_idle_cycle_is_one_query(self, mock_queue):
+        from app.workers import queue_worker
+        mock_queue.get_pending_multi.return_value = {'failed': [], 'pending_lid': []}
+        queue_worker.poll_once()
+        mock_queue.expire_old.assert_not_called()
+
+    @patch('app.db.queue.query')
+    def test_rows_grouped_per_type(self, mock_query):
+        from app.db.queue import get_pending_multi
+        mock_query.return_value = [{'id': 1, 'queue_type': 'pending_lid'},
+                                   {'id': 2, 'queue_type': 'failed'}]
+
+        pending = get_pending_multi(limit=10)
+
+        self.assertEqual(pending, {'failed': [{'id': 2, 'queue_type': 'failed'}],
+                                   'pending_lid': [{'id': 1, 'queue_type': 'pending_lid'}]})
+        sql, params = mock_query.call_args[0]
+        self.assertIn('PARTITION BY mq.queue_type', sql)
+        self.assertEqual(params, (['failed', 'pending_lid'], 10))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,7 @@
 """Tests for message splitting logic."""
 
 import unittest
+from unittest.mock import patch
 
 
 class TestSplitMessage(unittest.TestCase):
@@ -46,5 +47,43 @@ class TestSplitMessage(unittest.TestCase):
             self.assertIn(word, rejoined)
 
 
+class TestSendSplitMessages(unittest.TestCase):
+
+    @patch('app.channels.sender.time')
+    @patch('app.channels.sender.delay_scheduler')
+    @patch('app.channels.sender.whatsapp')
+    def test_later_chunks_chained_on_scheduler(self, mock_whatsapp, mock_scheduler, mock_time):
+        mock_scheduler.schedule.side_effect = lambda delay, fn, *args: fn(*args)
+        mock_whatsapp.send_message.return_value = True
+        from app.channels import sender
+        with patch.object(sender, 'split_message', return_value=['um', 'dois', 'tres']):
+            self.assertTrue(sender.send_split_messages('inst', '5511999', 'texto'))
+
+        self.assertEqual([c[0][2] for c in mock_whatsapp.send_message.call_args_list],
+                         ['um', 'dois', 'tres'])
+        mock_time.sleep.assert_called_once()
+        self.assertEqual(mock_scheduler.schedule.call_count, 4)
+
+    @patch('app.channels.sender.health_service')
+    @patch('app.channels.sender.queue_db')
+    @patch('app.channels.sender.time')
+    @patch('app.channels.sender.delay_scheduler')
+    @patch('app.channels.sender.whatsapp')
+    def test_failed_chunk_queues_the_rest(self, mock_whatsapp, mock_scheduler, mock_time,
+                                          mock_queue, mock_health):
+        mock_scheduler.schedule.side_effect = lambda delay, fn, *args: fn(*args)
+        mock_whatsapp.send_message.side_effect = [True, False]
+        from app.channels import sender
+        with patch.object(sender, 'split_message', return_value=['um', 'dois', 'tres', 'quatro']):
+            sender.send_split_messages('inst', '5511999', 'texto',
+                                       tenant_id='t1', whatsapp_account_id='a1')
+
+        contents = [c[1]['content'] for c in mock_queue.enqueue.call_args_list]
+        self.assertEqual(contents, ['dois', 'tres quatro'])
+        self.assertEqual(mock_whatsapp.send_message.call_count, 2)
+        # The caller only saw the first chunk succeed, so the failure is reported here
+        mock_health.record_send_failure.assert_called_once_with('t1', 'inst')
+
+
 if __name__ == '__main__':
     unittest.main()
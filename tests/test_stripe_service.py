@@ -0,0 +1,106 @@
+"""Tests for Stripe usage batching and billing lookups."""
+
+import unittest
+from unittest.mock import patch
+
+
+class TestUsageBuffer(unittest.TestCase):
+
+    @patch('app.services.stripe_service.report_usage')
+    @patch('app.services.stripe_service._ensure_usage_worker')
+    def test_usage_reported_once_per_tenant(self, mock_worker, mock_report):
+        from app.services import stripe_service
+        with patch.object(stripe_service.config, 'STRIPE_API_KEY', 'sk_test'):
+            for tenant_id in ('t1', 't1', 't2', 't1'):
+                stripe_service.record_usage(tenant_id)
+            mock_report.assert_not_called()
+
+            stripe_service.flush_usage()
+
+        self.assertEqual(mock_report.call_count, 2)
+        self.assertEqual({c[0][0]: c[1]['quantity'] for c in mock_report.call_args_list},
+                         {'t1': 3, 't2': 1})
+        mock_report.reset_mock()
+        stripe_service.flush_usage()
+        mock_report.assert_not_called()
+
+    @patch('app.services.stripe_service.report_usage')
+    @patch('app.services.stripe_service._ensure_usage_worker')
+    def test_failed_report_retried_next_flush(self, mock_worker, mock_report):
+        from app.services import stripe_service
+        with patch.object(stripe_service.config, 'STRIPE_API_KEY', 'sk_test'):
+            stripe_service.record_usage('t1', quantity=4)
+            mock_report.return_value = False
+            stripe_service.flush_usage()
+            stripe_service.record_usage('t1')
+
+            mock_report.return_value = True
+            stripe_service.flush_usage()
+
+        mock_report.assert_called_with('t1', quantity=5)
+        self.assertNotIn('t1', stripe_service._pending_usage)
+
+    @patch('app.services.stripe_service._ensure_usage_worker')
+    def test_no_op_without_stripe_key(self, mock_worker):
+        from app.services import stripe_service
+        with patch.object(stripe_service.config, 'STRIPE_API_KEY', None):
+            stripe_service.record_usage('t1')
+        mock_worker.assert_not_called()
+        self.assertNotIn('t1', stripe_service._pending_usage)
+
+
+class TestSubscriptionItemCache(unittest.TestCase):
+
+    def setUp(self):
+        from app.services import stripe_service
+        stripe_service._subscription_items.clear()
+        self.addCleanup(stripe_service._subscription_items.clear)
+
+    @patch('app.services.stripe_service.query')
+    @patch('app.services.stripe_service._get_stripe')
+    def test_item_resolved_once_across_flushes(self, mock_get_stripe, mock_query):
+        from app.services import stripe_service
+        stripe = mock_get_stripe.return_value
+        stripe.Subscription.retrieve.return_value = {'items': {'data': [{'id': 'si_1'}]}}
+        mock_query.return_value = {'stripe_subscription_id': 'sub_1'}
+
+        stripe_service.report_usage('t1', quantity=3)
+        stripe_service.report_usage('t1', quantity=2)
+
+        mock_query.assert_called_once()
+        stripe.Subscription.retrieve.assert_called_once_with('sub_1')
+        self.assertEqual(stripe.SubscriptionItem.create_usage_record.call_count, 2)
+        stripe.SubscriptionItem.create_usage_record.assert_called_with(
+            'si_1', quantity=2, action='increment')
+
+        # A failed report drops the entry so the item is looked up again
+        stripe.SubscriptionItem.create_usage_record.side_effect = Exception('no such item')
+        stripe_service.report_usage('t1')
+        self.assertNotIn('t1', stripe_service._subscription_items)
+
+
+class TestBillingStatusCache(unittest.TestCase):
+
+    def setUp(self):
+        from app.services import stripe_service
+        stripe_service._billing_status_cache.clear()
+        self.addCleanup(stripe_service._billing_status_cache.clear)
+
+    @patch('app.services.stripe_service.execute')
+    @patch('app.services.stripe_service.query')
+    def test_status_memoized_until_suspend(self, mock_query, mock_execute):
+        from app.services import stripe_service
+        mock_query.return_value = {'billing_status': 'active'}
+        with patch.object(stripe_service.config, 'STRIPE_API_KEY', 'sk_test'):
+            self.assertTrue(stripe_service.check_tenant_billing('t1'))
+            self.assertTrue(stripe_service.check_tenant_billing('t1'))
+            mock_query.assert_called_once()
+
+            stripe_service.suspend_tenant('t1')
+            mock_query.return_value = {'billing_status': 'suspended'}
+            self.assertFalse(stripe_service.check_tenant_billing('t1'))
+            self.assertEqual(mock_query.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
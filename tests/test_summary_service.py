@@ -0,0 +1,77 @@
+"""Tests for the summary job queue."""
+
+import queue
+import unittest
+from unittest.mock import patch
+
+
+class TestSummarySubmit(unittest.TestCase):
+
+    def setUp(self):
+        from app.services import summary_service
+        summary_service._in_flight.clear()
+        summary_service._last_counts.clear()
+        self.addCleanup(summary_service._in_flight.clear)
+        self.addCleanup(summary_service._last_counts.clear)
+
+    @patch('app.services.summary_service._ensure_workers')
+    def test_full_queue_drops_job(self, mock_workers):
+        from app.services import summary_service
+        with patch.object(summary_service, '_queue', queue.Queue(maxsize=1)):
+            self.assertTrue(summary_service.submit('c1', 't1', 6))
+            self.assertFalse(summary_service.submit('c2', 't1', 6))
+            self.assertEqual(summary_service._queue.get_nowait(), ('c1', 't1', 6, None))
+            self.assertNotIn('c2', summary_service._in_flight)
+
+    @patch('app.services.summary_service._ensure_workers')
+    def test_conversation_already_queued_is_skipped(self, mock_workers):
+        from app.services import summary_service
+        with patch.object(summary_service, '_queue', queue.Queue(maxsize=10)):
+            self.assertTrue(summary_service.submit('c1', 't1', 6))
+            self.assertFalse(summary_service.submit('c1', 't1', 7))
+            self.assertEqual(summary_service._queue.qsize(), 1)
+
+            summary_service._release('c1')
+            self.assertTrue(summary_service.submit('c1', 't1', 8))
+
+    @patch('app.services.summary_service.conv_db')
+    @patch('app.services.summary_service.summaries_db')
+    def test_history_loaded_only_when_due(self, mock_summaries, mock_conv):
+        from app.services import summary_service
+        mock_summaries.get_last_summary.return_value = {'message_count_at_summary': 6}
+
+        self.assertIsNone(summary_service.maybe_generate_summary('c1', 't1', 8))
+        mock_conv.get_message_history.assert_not_called()
+
+    @patch('app.services.summary_service.summaries_db')
+    def test_last_count_read_once_per_conversation(self, mock_summaries):
+        from app.services import summary_service
+        mock_summaries.get_last_summary.return_value = {'message_count_at_summary': 6}
+
+        self.assertFalse(summary_service.should_generate_summary('c1', 8))
+        self.assertFalse(summary_service.should_generate_summary('c1', 10))
+        self.assertTrue(summary_service.should_generate_summary('c1', 12))
+        mock_summaries.get_last_summary.assert_called_once_with('c1')
+
+        summary_service._remember_count('c1', 12)
+        self.assertFalse(summary_service.should_generate_summary('c1', 14))
+
+
+class TestGenerateSummary(unittest.TestCase):
+
+    @patch('app.services.summary_service.consumption_buffer')
+    @patch('app.services.summary_service.summaries_db')
+    @patch('app.services.summary_service.call_api')
+    def test_fenced_json_parsed(self, mock_call_api, mock_summaries, mock_consumption):
+        from app.services import summary_service
+        messages = [{'role': 'user', 'content': 'oi'}] * 6
+        for text in ('```json\n{"nome": "Ana"}\n```', '```json {"nome": "Ana"}',
+                     '{"nome": "Ana"}'):
+            mock_call_api.return_value = {'content': [{'type': 'text', 'text': text}],
+                                          'usage': {}}
+            self.assertEqual(summary_service.generate_summary('c1', 't1', messages),
+                             {'nome': 'Ana'})
+
+
+if __name__ == '__main__':
+    unittest.main()
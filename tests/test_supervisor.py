@@ -52,6 +52,31 @@ class TestSupervisor(unittest.TestCase):
         self.assertEqual(result['model'], 'claude-sonnet-4-20250514')
         self.assertEqual(len(result['tool_calls']), 0)
 
+    @patch('app.ai.supervisor.call_api')
+    def test_tools_disabled_with_empty_list(self, mock_api):
+        """tools_enabled=[] turns tools off instead of falling back to the defaults."""
+        mock_api.return_value = {
+            'content': [{'type': 'text', 'text': 'Oi!'}],
+            'stop_reason': 'end_turn',
+            'usage': {'input_tokens': 10, 'output_tokens': 2},
+        }
+        from app.ai import supervisor
+        for tools_enabled in ([], '[]'):
+            agent_config = dict(self._make_agent_config(), tools_enabled=tools_enabled)
+            with patch.object(supervisor, 'get_tool_definitions',
+                              wraps=supervisor.get_tool_definitions) as mock_defs:
+                supervisor.process(self._make_conversation(), agent_config)
+
+            mock_defs.assert_called_once_with([])
+            # Empty tool_defs: the API call goes out without tools
+            self.assertIsNone(mock_api.call_args[1]['tools'])
+
+        agent_config = self._make_agent_config()
+        del agent_config['tools_enabled']
+        with patch.object(supervisor, 'get_tool_definitions', return_value=[]) as mock_defs:
+            supervisor.process(self._make_conversation(), agent_config)
+        mock_defs.assert_called_once_with(supervisor.DEFAULT_TOOLS)
+
     @patch('app.ai.supervisor.execute_tool')
     @patch('app.ai.supervisor.call_api')
     def test_tool_use_then_response(self, mock_api, mock_tool):
@@ -97,6 +97,171 @@ class TestTenantIsolation(unittest.TestCase):
         self.assertEqual(detect_language('oi tudo bem'), 'pt')
         self.assertEqual(detect_language('hello how are you'), 'en')
         self.assertEqual(detect_language('hola como estas'), 'es')
+        self.assertEqual(detect_language('Oi! Preciso de AJUDA, por favor'), 'pt')
+        self.assertEqual(detect_language('Hola, necesito ayuda por favor'), 'es')
+        self.assertEqual(detect_language('123 ???'), 'pt')
+
+    @patch('app.db.conversations.query')
+    def test_message_context_scoped(self, mock_query):
+        """Agent config and lead in the combined context query are tenant-scoped."""
+        mock_query.return_value = {'agent_config': None, 'lead': None, 'history': None,
+                                   'message_count': 3}
+
+        from app.db.conversations import get_message_context
+        ctx = get_message_context('conv-1', 'ten-a', '5511999')
+
+        self.assertEqual(ctx, {'agent_config': None, 'lead': None, 'history': [],
+                               'message_count': 3})
+        sql, params = mock_query.call_args[0]
+        self.assertEqual(params, ('ten-a', 'default', 'ten-a', '5511999', 'conv-1', 'conv-1', 50))
+        self.assertIn('l.tenant_id = %s', sql)
+
+    @patch('app.db.conversations.execute')
+    def test_user_message_lead_upsert_scoped(self, mock_execute):
+        """The conversation and lead written with the user message stay in the tenant."""
+        from app.db.conversations import record_user_message
+        record_user_message('ten-a', 'acc-1', '5511999', 'oi', contact_name='Ana')
+
+        sql, params = mock_execute.call_args[0]
+        self.assertIn('INSERT INTO leads_v2', sql)
+        self.assertIn("COALESCE(conversations.metadata, '{}')", sql)
+        self.assertIn('''VALUES (%s, %s, %s, %s, '{"reengagement_count": 0}')''', sql)
+        self.assertIn('WHERE conversations.tenant_id = EXCLUDED.tenant_id', sql)
+        self.assertIn('SELECT tenant_id, contact_phone, %s, id', sql)
+        self.assertEqual(params, ('ten-a', 'acc-1', '5511999', 'Ana',
+                                  'Ana', 'oi', '{}'))
+        self.assertEqual(sql.count('%s'), len(params))
+
+    @patch('app.db.conversations.query')
+    def test_conversation_by_phone_suffix_scoped(self, mock_query):
+        """Phone lookup stays in the tenant and matches a suffix without a leading wildcard."""
+        from app.db.conversations import get_conversation_by_phone
+        get_conversation_by_phone('ten-a', '11999')
+
+        sql, params = mock_query.call_args[0]
+        self.assertIn('c.tenant_id = %s', sql)
+        self.assertIn('reverse(c.contact_phone) LIKE %s', sql)
+        self.assertEqual(params, ('ten-a', '99911%', '11999'))
+
+    @patch('app.db.queue.query')
+    def test_pending_lid_filtered_in_sql(self, mock_query):
+        """Pending LID lookup filters by tenant and lid_jid in the query."""
+        from app.db.queue import get_pending_by_lid
+        get_pending_by_lid('ten-a', '123@lid')
+
+        sql, params = mock_query.call_args[0]
+        self.assertIn("metadata->>'lid_jid' = %s", sql)
+        self.assertNotIn('JOIN', sql)
+        self.assertEqual(params, ('ten-a', '123@lid', 50))
+
+    @patch('app.db.tenants.query')
+    def test_account_cache_keyed_by_instance(self, mock_query):
+        """Memoized account lookups never cross instances and come back parsed."""
+        from app.db import tenants
+        tenants.invalidate_account_cache()
+        self.addCleanup(tenants.invalidate_account_cache)
+        mock_query.side_effect = [
+            {'tenant_id': 'ten-a', 'config': '{"x": 1}', 'tenant_settings': None},
+            {'tenant_id': 'ten-b', 'config': {}, 'tenant_settings': {'y': 2}},
+        ]
+
+        a = tenants.get_whatsapp_account_by_instance('inst-a')
+        b = tenants.get_whatsapp_account_by_instance('inst-b')
+        self.assertIs(tenants.get_whatsapp_account_by_instance('inst-a'), a)
+
+        self.assertEqual(mock_query.call_count, 2)
+        self.assertEqual((a['tenant_id'], a['config'], a['tenant_settings']), ('ten-a', {'x': 1}, {}))
+        self.assertEqual(b['tenant_id'], 'ten-b')
+
+    @patch('app.db.tenants.query')
+    def test_account_cache_single_flight(self, mock_query):
+        """Concurrent misses for one instance share a single query."""
+        import threading
+        import time
+        from app.db import tenants
+        tenants.invalidate_account_cache()
+        self.addCleanup(tenants.invalidate_account_cache)
+
+        def slow_query(*args, **kwargs):
+            time.sleep(0.05)
+            return {'tenant_id': 'ten-a', 'config': {}, 'tenant_settings': {}}
+        mock_query.side_effect = slow_query
+
+        results = []
+        threads = [threading.Thread(
+            target=lambda: results.append(tenants.get_whatsapp_account_by_instance('inst-a')))
+            for _ in range(5)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(mock_query.call_count, 1)
+        self.assertEqual(len(results), 5)
+        self.assertTrue(all(r is results[0] for r in results))
+        self.assertEqual(tenants._account_load_locks, {})
+
+    @patch('app.db.tenants.query')
+    def test_unknown_instances_leave_no_load_locks(self, mock_query):
+        """Misses are not cached and must not leave a lock per instance name behind."""
+        from app.db import tenants
+        mock_query.return_value = None
+
+        for i in range(3):
+            self.assertIsNone(tenants.get_whatsapp_account_by_instance(f'unknown-{i}'))
+
+        self.assertEqual(tenants._account_load_locks, {})
+
+    @patch('app.db.tenants.query')
+    def test_account_business_hours_parsed_once(self, mock_query):
+        """Business hours come back as time objects on the cached account."""
+        from datetime import time
+        from app.db import tenants
+        tenants.invalidate_account_cache()
+        self.addCleanup(tenants.invalidate_account_cache)
+        mock_query.side_effect = [
+            {'tenant_id': 'ten-a', 'tenant_settings': None,
+             'config': {'business_hours_start': '09:00:00', 'business_hours_end': '18:30'}},
+            {'tenant_id': 'ten-b', 'tenant_settings': None,
+             'config': {'business_hours_start': '', 'business_hours_end': ''}},
+        ]
+
+        a = tenants.get_whatsapp_account_by_instance('inst-a')
+        b = tenants.get_whatsapp_account_by_instance('inst-b')
+
+        self.assertEqual(a['business_hours'], (time(9, 0), time(18, 30)))
+        self.assertIsNone(b['business_hours'])
+
+    @patch('app.db.tenants.get_redis')
+    def test_account_cache_invalidation_broadcast(self, mock_get_redis):
+        """Edits clear the local cache and notify the other processes."""
+        from app.db import tenants
+        tenants._account_cache['inst-a'] = (0, {'tenant_id': 'ten-a'})
+
+        tenants.invalidate_account_cache()
+
+        self.assertEqual(tenants._account_cache, {})
+        mock_get_redis.return_value.publish.assert_called_once_with(
+            tenants.ACCOUNT_INVALIDATE_CHANNEL, '1')
+
+    @patch('app.db.tenants.invalidate_account_cache')
+    @patch('app.db.tenants.execute')
+    def test_account_cache_invalidated_after_write(self, mock_execute, mock_invalidate):
+        """The cache is cleared only once the edit is written, never before."""
+        from app.db import tenants
+        calls = []
+        mock_execute.side_effect = lambda *a, **k: calls.append('write')
+        mock_invalidate.side_effect = lambda: calls.append('invalidate')
+
+        tenants.update_tenant('ten-a', status='suspended')
+        tenants.delete_whatsapp_account('acc-1')
+        self.assertEqual(calls, ['write', 'invalidate', 'write', 'invalidate'])
+
+        calls.clear()
+        mock_execute.side_effect = RuntimeError('db down')
+        with self.assertRaises(RuntimeError):
+            tenants.update_whatsapp_account('acc-1', status='inactive')
+        self.assertEqual(calls, [])
 
 
 if __name__ == '__main__':
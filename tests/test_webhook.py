@@ -0,0 +1,58 @@
+"""Tests for the webhook endpoint edge filtering and dedup."""
+
+import unittest
+from unittest.mock import patch
+
+
+class TestEdgeDedup(unittest.TestCase):
+
+    def setUp(self):
+        from app.api import webhook
+        webhook._recent_ids.clear()
+        self.addCleanup(webhook._recent_ids.clear)
+
+    def _payload(self, message_id, from_me=False):
+        return {'event': 'messages.upsert', 'instance': 'inst',
+                'data': {'key': {'id': message_id, 'fromMe': from_me}}}
+
+    def test_retry_dropped_before_dispatch(self):
+        from app.api.webhook import _is_duplicate
+        self.assertFalse(_is_duplicate(self._payload('m1')))
+        self.assertTrue(_is_duplicate(self._payload('m1')))
+        self.assertFalse(_is_duplicate(self._payload('m2')))
+
+    def test_outgoing_and_other_events_not_deduped(self):
+        from app.api.webhook import _is_duplicate
+        for _ in range(2):
+            self.assertFalse(_is_duplicate(self._payload('m1', from_me=True)))
+            self.assertFalse(_is_duplicate({'event': 'contacts.upsert', 'data': {}}))
+
+    def test_bounded(self):
+        from app.api import webhook
+        with patch.object(webhook, 'EDGE_DEDUP_MAX', 2):
+            for message_id in ('m1', 'm2', 'm3'):
+                webhook._is_duplicate(self._payload(message_id))
+            self.assertEqual(list(webhook._recent_ids), [('inst', 'm2'), ('inst', 'm3')])
+
+
+class TestEventFilter(unittest.TestCase):
+
+    def setUp(self):
+        from flask import Flask
+        from app.api.webhook import webhook_bp
+        app = Flask(__name__)
+        app.register_blueprint(webhook_bp)
+        self.client = app.test_client()
+
+    @patch('app.api.webhook._executor')
+    def test_unhandled_events_not_dispatched(self, mock_executor):
+        resp = self.client.post('/webhook', json={'event': 'messages.update', 'data': {}})
+        self.assertEqual(resp.get_json(), {'ok': True, 'ignored': True})
+        mock_executor.submit.assert_not_called()
+
+        self.client.post('/webhook', json={'event': 'contacts.update', 'data': {}})
+        mock_executor.submit.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()